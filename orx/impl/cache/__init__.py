@@ -0,0 +1,12 @@
+from .cache import Cache
+from .members import MemberStore
+from .records import CachedChannel, CachedGuild, CachedMember, CachedRole
+
+__all__ = (
+    "Cache",
+    "CachedChannel",
+    "CachedGuild",
+    "CachedMember",
+    "CachedRole",
+    "MemberStore",
+)
@@ -0,0 +1,357 @@
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Iterator, Optional, TypeVar
+
+from orx.impl.gateway.event import GatewayEvent
+from orx.proto.gateway import GatewayClientProto
+
+from .members import MemberStore
+from .records import CachedChannel, CachedGuild, CachedMember, CachedRole
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class _LRU(Generic[K, V]):
+    __slots__ = (
+        "_items",
+        "_max_size",
+        "_on_evict",
+    )
+
+    def __init__(self, max_size: Optional[int], on_evict: Optional[Callable[[K, V], None]] = None) -> None:
+        self._items: OrderedDict[K, V] = OrderedDict()
+        self._max_size = max_size
+        self._on_evict = on_evict
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[V]:
+        return iter(self._items.values())
+
+    def get(self, key: K) -> Optional[V]:
+        item = self._items.get(key)
+
+        if item is not None and self._max_size is not None:
+            self._items.move_to_end(key)
+
+        return item
+
+    def set(self, key: K, value: V) -> None:
+        self._items[key] = value
+
+        if self._max_size is not None:
+            self._items.move_to_end(key)
+
+            while len(self._items) > self._max_size:
+                evicted = self._items.popitem(last=False)
+
+                if self._on_evict:
+                    self._on_evict(*evicted)
+
+    def pop(self, key: K) -> Optional[V]:
+        return self._items.pop(key, None)
+
+
+class Cache:
+    __slots__ = (
+        "_guilds",
+        "_channels",
+        "_roles",
+        "_members",
+        "_max_members",
+        "_columnar",
+        "_cache_guilds",
+        "_cache_channels",
+        "_cache_roles",
+        "_cache_members",
+    )
+
+    def __init__(
+        self,
+        *,
+        guilds: bool = True,
+        channels: bool = True,
+        roles: bool = True,
+        members: bool = True,
+        max_guilds: Optional[int] = None,
+        max_channels: Optional[int] = None,
+        max_roles: Optional[int] = None,
+        max_members: Optional[int] = None,
+        columnar_members: bool = False,
+    ) -> None:
+        """An in-memory cache of guilds, channels, roles and members, kept up to date from gateway events.
+
+        Entities are keyed by their snowflake as an int. Each entity type can be disabled, and limited to
+        a maximum size, past which the least recently used entities are evicted. A guild's channels and roles
+        are only cached while the guild itself is, so they are dropped along with it (as are its members when
+        it is evicted), and are not cached at all when guilds are disabled.
+
+        Args:
+            guilds (bool, optional): Whether to cache guilds. Defaults to True.
+            channels (bool, optional): Whether to cache channels. Defaults to True.
+            roles (bool, optional): Whether to cache roles. Defaults to True.
+            members (bool, optional): Whether to cache members. Defaults to True.
+            max_guilds (Optional[int], optional): The maximum number of guilds to cache. Defaults to None.
+            max_channels (Optional[int], optional): The maximum number of channels to cache. Defaults to None.
+            max_roles (Optional[int], optional): The maximum number of roles to cache. Defaults to None.
+            max_members (Optional[int], optional): The maximum number of members to cache per guild. Defaults to None.
+            columnar_members (bool, optional): Whether to pack members into a MemberStore per guild, which uses\
+                tens of bytes per member instead of hundreds, but cannot evict members. Defaults to False.
+
+        Raises:
+            ValueError: max_members was set with columnar_members.
+        """
+
+        if columnar_members and max_members is not None:
+            raise ValueError("max_members cannot be used with columnar_members")
+
+        self._guilds: _LRU[int, CachedGuild] = _LRU(max_guilds, self._drop_guild)
+        self._channels: _LRU[int, CachedChannel] = _LRU(max_channels)
+        self._roles: _LRU[int, CachedRole] = _LRU(max_roles)
+        self._members: dict[int, _LRU[int, CachedMember] | MemberStore] = {}
+        self._max_members = max_members
+        self._columnar = columnar_members
+
+        self._cache_guilds = guilds
+        self._cache_channels = channels
+        self._cache_roles = roles
+        self._cache_members = members
+
+    def attach(self, client: GatewayClientProto) -> None:
+        """Keep the cache up to date from a gateway client's events.
+
+        The cache's hooks are synchronous, so they run inline as events are read, before any async hooks.
+
+        Args:
+            client (GatewayClientProto): The client to add the cache's dispatch hooks to.
+        """
+
+        handlers: dict[str, Callable[[dict[str, Any]], None]] = {
+            "GUILD_CREATE": self._guild_create,
+            "GUILD_UPDATE": self._guild_update,
+            "GUILD_DELETE": self._guild_delete,
+        }
+
+        if self._cache_channels:
+            handlers["CHANNEL_CREATE"] = self._channel_set
+            handlers["CHANNEL_UPDATE"] = self._channel_set
+            handlers["CHANNEL_DELETE"] = self._channel_delete
+
+        if self._cache_roles:
+            handlers["GUILD_ROLE_CREATE"] = self._role_set
+            handlers["GUILD_ROLE_UPDATE"] = self._role_set
+            handlers["GUILD_ROLE_DELETE"] = self._role_delete
+
+        if self._cache_members:
+            handlers["GUILD_MEMBER_ADD"] = self._member_set
+            handlers["GUILD_MEMBER_UPDATE"] = self._member_set
+            handlers["GUILD_MEMBER_REMOVE"] = self._member_remove
+            handlers["GUILD_MEMBERS_CHUNK"] = self._members_chunk
+
+        for event, handler in handlers.items():
+            client.add_dispatch_hook(event, self._hook(handler))
+
+    @staticmethod
+    def _hook(handler: Callable[[dict[str, Any]], None]) -> Callable[[GatewayEvent], None]:
+        def hook(event: GatewayEvent) -> None:
+            handler(event.d)
+
+        return hook
+
+    def get_guild(self, id: int) -> Optional[CachedGuild]:
+        """Get a cached guild.
+
+        Args:
+            id (int): The ID of the guild.
+
+        Returns:
+            Optional[CachedGuild]: The guild, or None if it is not cached.
+        """
+
+        return self._guilds.get(id)
+
+    def get_channel(self, id: int) -> Optional[CachedChannel]:
+        """Get a cached channel.
+
+        Args:
+            id (int): The ID of the channel.
+
+        Returns:
+            Optional[CachedChannel]: The channel, or None if it is not cached.
+        """
+
+        return self._channels.get(id)
+
+    def get_role(self, id: int) -> Optional[CachedRole]:
+        """Get a cached role.
+
+        Args:
+            id (int): The ID of the role.
+
+        Returns:
+            Optional[CachedRole]: The role, or None if it is not cached.
+        """
+
+        return self._roles.get(id)
+
+    def get_member(self, guild_id: int, user_id: int) -> Optional[CachedMember]:
+        """Get a cached member.
+
+        Args:
+            guild_id (int): The ID of the member's guild.
+            user_id (int): The ID of the member's user.
+
+        Returns:
+            Optional[CachedMember]: The member, or None if it is not cached.
+        """
+
+        if members := self._members.get(guild_id):
+            return members.get(user_id)
+
+        return None
+
+    def get_guild_channels(self, guild_id: int) -> list[CachedChannel]:
+        """Get the cached channels in a guild.
+
+        Args:
+            guild_id (int): The ID of the guild.
+
+        Returns:
+            list[CachedChannel]: The channels.
+        """
+
+        if not (guild := self._guilds.get(guild_id)):
+            return []
+
+        return [channel for id in guild.channel_ids if (channel := self._channels.get(id))]
+
+    def get_guild_roles(self, guild_id: int) -> list[CachedRole]:
+        """Get the cached roles in a guild.
+
+        Args:
+            guild_id (int): The ID of the guild.
+
+        Returns:
+            list[CachedRole]: The roles.
+        """
+
+        if not (guild := self._guilds.get(guild_id)):
+            return []
+
+        return [role for id in guild.role_ids if (role := self._roles.get(id))]
+
+    def get_guild_members(self, guild_id: int) -> list[CachedMember]:
+        """Get the cached members of a guild.
+
+        Args:
+            guild_id (int): The ID of the guild.
+
+        Returns:
+            list[CachedMember]: The members.
+        """
+
+        return list(self._members.get(guild_id, ()))
+
+    def _guild_create(self, data: dict[str, Any]) -> None:
+        guild_id = int(data["id"])
+
+        if self._cache_guilds:
+            if not (guild := self._guilds.get(guild_id)):
+                guild = CachedGuild(guild_id)
+                self._guilds.set(guild_id, guild)
+
+            guild.update(data)
+
+        for channel in data.get("channels", ()) if self._cache_channels else ():
+            self._channel_set(channel, guild_id)
+
+        for role in data.get("roles", ()) if self._cache_roles else ():
+            self._role_set({"guild_id": guild_id, "role": role})
+
+        for member in data.get("members", ()) if self._cache_members else ():
+            self._member_set(member, guild_id)
+
+    def _guild_update(self, data: dict[str, Any]) -> None:
+        if guild := self._guilds.get(int(data["id"])):
+            guild.update(data)
+
+        for role in data.get("roles", ()) if self._cache_roles else ():
+            self._role_set({"guild_id": data["id"], "role": role})
+
+    def _guild_delete(self, data: dict[str, Any]) -> None:
+        guild_id = int(data["id"])
+
+        if data.get("unavailable"):
+            # The guild is in an outage, not gone, so its entities are kept for when it is available again.
+            if guild := self._guilds.get(guild_id):
+                guild.unavailable = True
+            return
+
+        self._members.pop(guild_id, None)
+
+        if guild := self._guilds.pop(guild_id):
+            self._drop_guild(guild_id, guild)
+
+    def _drop_guild(self, guild_id: int, guild: CachedGuild) -> None:
+        self._members.pop(guild_id, None)
+
+        for id in guild.channel_ids:
+            self._channels.pop(id)
+
+        for id in guild.role_ids:
+            self._roles.pop(id)
+
+    def _channel_set(self, data: dict[str, Any], guild_id: Optional[int] = None) -> None:
+        channel = CachedChannel.from_data(data, guild_id)
+
+        if channel.guild_id:
+            # Guild channels are only cached alongside their guild, which removes them when it goes.
+            if not (guild := self._guilds.get(channel.guild_id)):
+                return
+
+            guild.channel_ids.add(channel.id)
+
+        self._channels.set(channel.id, channel)
+
+    def _channel_delete(self, data: dict[str, Any]) -> None:
+        if (channel := self._channels.pop(int(data["id"]))) and channel.guild_id:
+            if guild := self._guilds.get(channel.guild_id):
+                guild.channel_ids.discard(channel.id)
+
+    def _role_set(self, data: dict[str, Any]) -> None:
+        role = CachedRole.from_data(data["role"], int(data["guild_id"]))
+
+        if not (guild := self._guilds.get(role.guild_id)):
+            return
+
+        guild.role_ids.add(role.id)
+        self._roles.set(role.id, role)
+
+    def _role_delete(self, data: dict[str, Any]) -> None:
+        role_id = int(data["role_id"])
+        self._roles.pop(role_id)
+
+        if guild := self._guilds.get(int(data["guild_id"])):
+            guild.role_ids.discard(role_id)
+
+    def _member_set(self, data: dict[str, Any], guild_id: Optional[int] = None) -> None:
+        member = CachedMember.from_data(data, guild_id or int(data["guild_id"]))
+
+        if (members := self._members.get(member.guild_id)) is None:
+            if self._columnar:
+                members = self._members[member.guild_id] = MemberStore(member.guild_id)
+            else:
+                members = self._members[member.guild_id] = _LRU(self._max_members)
+
+        members.set(member.user_id, member)
+
+    def _member_remove(self, data: dict[str, Any]) -> None:
+        if members := self._members.get(int(data["guild_id"])):
+            members.pop(int(data["user"]["id"]))
+
+    def _members_chunk(self, data: dict[str, Any]) -> None:
+        guild_id = int(data["guild_id"])
+
+        for member in data["members"]:
+            self._member_set(member, guild_id)
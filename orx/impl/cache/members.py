@@ -0,0 +1,174 @@
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+from heapq import merge
+from typing import Final, Iterator, Optional
+
+from .records import CachedMember
+
+# Pending members are merged into the sorted columns once there are at least this many,
+# or an eighth of the stored members, whichever is more.
+MERGE_MIN: Final = 256
+
+
+def _timestamp(joined_at: Optional[str]) -> int:
+    return int(datetime.fromisoformat(joined_at).timestamp()) if joined_at else 0
+
+
+def _isoformat(timestamp: int) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat() if timestamp else None
+
+
+class MemberStore:
+    __slots__ = (
+        "guild_id",
+        "_ids",
+        "_roles",
+        "_flags",
+        "_joined",
+        "_pending",
+        "_nicks",
+        "_role_sets",
+        "_role_index",
+    )
+
+    def __init__(self, guild_id: int) -> None:
+        """A compact store of a guild's members, packed into array-backed columns.
+
+        Each member takes 20 bytes: its user ID, an index into the guild's interned role lists, its flags
+        and its join time to the second. Nicknames are stored sparsely. New members are buffered and merged
+        into the ID-sorted columns in batches, and members are returned as CachedMember records on access.
+
+        Args:
+            guild_id (int): The ID of the guild.
+        """
+
+        self.guild_id = guild_id
+
+        self._ids = array("Q")
+        self._roles = array("I")
+        self._flags = array("I")
+        self._joined = array("I")
+
+        self._pending: dict[int, tuple[int, int, int]] = {}
+        self._nicks: dict[int, str] = {}
+
+        self._role_sets: list[tuple[int, ...]] = []
+        self._role_index: dict[tuple[int, ...], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._pending)
+
+    def __iter__(self) -> Iterator[CachedMember]:
+        for i, user_id in enumerate(self._ids):
+            yield self._view(user_id, self._roles[i], self._flags[i], self._joined[i])
+
+        for user_id, row in list(self._pending.items()):
+            yield self._view(user_id, *row)
+
+    def _view(self, user_id: int, roles: int, flags: int, joined: int) -> CachedMember:
+        return CachedMember(
+            self.guild_id, user_id, self._nicks.get(user_id), self._role_sets[roles], _isoformat(joined), flags
+        )
+
+    def _intern(self, roles: tuple[int, ...]) -> int:
+        roles = tuple(sorted(roles))
+
+        if (index := self._role_index.get(roles)) is None:
+            index = self._role_index[roles] = len(self._role_sets)
+            self._role_sets.append(roles)
+
+        return index
+
+    def _find(self, user_id: int) -> int:
+        i = bisect_left(self._ids, user_id)
+
+        if i < len(self._ids) and self._ids[i] == user_id:
+            return i
+
+        return -1
+
+    def _merge(self) -> None:
+        ids, roles, flags, joined = array("Q"), array("I"), array("I"), array("I")
+        pending = sorted((user_id, *row) for user_id, row in self._pending.items())
+
+        for row in merge(zip(self._ids, self._roles, self._flags, self._joined), pending):
+            ids.append(row[0])
+            roles.append(row[1])
+            flags.append(row[2])
+            joined.append(row[3])
+
+        self._ids, self._roles, self._flags, self._joined = ids, roles, flags, joined
+        self._pending.clear()
+
+    def get(self, user_id: int) -> Optional[CachedMember]:
+        """Get a member.
+
+        Args:
+            user_id (int): The ID of the member's user.
+
+        Returns:
+            Optional[CachedMember]: The member, or None if it is not stored.
+        """
+
+        if row := self._pending.get(user_id):
+            return self._view(user_id, *row)
+
+        if (i := self._find(user_id)) < 0:
+            return None
+
+        return self._view(user_id, self._roles[i], self._flags[i], self._joined[i])
+
+    def set(self, user_id: int, member: CachedMember) -> None:
+        """Store a member, replacing it if it is already stored.
+
+        Args:
+            user_id (int): The ID of the member's user.
+            member (CachedMember): The member.
+        """
+
+        roles = self._intern(member.roles)
+        joined = _timestamp(member.joined_at)
+
+        if member.nick:
+            self._nicks[user_id] = member.nick
+        else:
+            self._nicks.pop(user_id, None)
+
+        if user_id not in self._pending and (i := self._find(user_id)) >= 0:
+            self._roles[i] = roles
+            self._flags[i] = member.flags
+            self._joined[i] = joined
+            return
+
+        self._pending[user_id] = (roles, member.flags, joined)
+
+        if len(self._pending) >= max(MERGE_MIN, len(self._ids) // 8):
+            self._merge()
+
+    def pop(self, user_id: int) -> Optional[CachedMember]:
+        """Remove a member.
+
+        Args:
+            user_id (int): The ID of the member's user.
+
+        Returns:
+            Optional[CachedMember]: The member, or None if it was not stored.
+        """
+
+        member = self.get(user_id)
+
+        if member is None:
+            return None
+
+        self._nicks.pop(user_id, None)
+
+        if self._pending.pop(user_id, None) is None:
+            i = self._find(user_id)
+
+            del self._ids[i]
+            del self._roles[i]
+            del self._flags[i]
+            del self._joined[i]
+
+        return member
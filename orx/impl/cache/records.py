@@ -0,0 +1,94 @@
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+
+def _snowflake(value: Any) -> Optional[int]:
+    return int(value) if value is not None else None
+
+
+@dataclass(slots=True)
+class CachedGuild:
+    """A cached guild, with the IDs of its cached channels and roles."""
+
+    id: int
+    name: Optional[str] = None
+    owner_id: Optional[int] = None
+    member_count: Optional[int] = None
+    unavailable: bool = False
+    channel_ids: set[int] = field(default_factory=set[int])
+    role_ids: set[int] = field(default_factory=set[int])
+
+    def update(self, data: dict[str, Any]) -> None:
+        self.name = data.get("name", self.name)
+        self.owner_id = _snowflake(data.get("owner_id", self.owner_id))
+        self.member_count = data.get("member_count", self.member_count)
+        self.unavailable = data.get("unavailable", False)
+
+
+@dataclass(slots=True)
+class CachedChannel:
+    """A cached channel."""
+
+    id: int
+    type: int
+    guild_id: Optional[int] = None
+    name: Optional[str] = None
+    position: Optional[int] = None
+    parent_id: Optional[int] = None
+
+    @classmethod
+    def from_data(cls, data: dict[str, Any], guild_id: Optional[int] = None) -> "CachedChannel":
+        return cls(
+            int(data["id"]),
+            data["type"],
+            _snowflake(data.get("guild_id")) or guild_id,
+            data.get("name"),
+            data.get("position"),
+            _snowflake(data.get("parent_id")),
+        )
+
+
+@dataclass(slots=True)
+class CachedRole:
+    """A cached role."""
+
+    id: int
+    guild_id: int
+    name: str
+    permissions: int
+    position: int
+    color: int
+
+    @classmethod
+    def from_data(cls, data: dict[str, Any], guild_id: int) -> "CachedRole":
+        return cls(
+            int(data["id"]),
+            guild_id,
+            data["name"],
+            int(data["permissions"]),
+            data["position"],
+            data["color"],
+        )
+
+
+@dataclass(slots=True)
+class CachedMember:
+    """A cached guild member."""
+
+    guild_id: int
+    user_id: int
+    nick: Optional[str] = None
+    roles: tuple[int, ...] = ()
+    joined_at: Optional[str] = None
+    flags: int = 0
+
+    @classmethod
+    def from_data(cls, data: dict[str, Any], guild_id: int) -> "CachedMember":
+        return cls(
+            guild_id,
+            int(data["user"]["id"]),
+            data.get("nick"),
+            tuple(map(int, data.get("roles", ()))),
+            data.get("joined_at"),
+            data.get("flags", 0),
+        )
@@ -0,0 +1,36 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Final
+
+
+@dataclass(frozen=True, slots=True)
+class JSONCodec:
+    """A pair of functions used to decode and encode JSON."""
+
+    loads: Callable[[str | bytes], Any]
+    dumps: Callable[[Any], str]
+
+
+def _get_default_codec() -> JSONCodec:
+    try:
+        import orjson  # type: ignore
+
+        return JSONCodec(orjson.loads, lambda obj: orjson.dumps(obj).decode())  # type: ignore
+    except ImportError:
+        pass
+
+    try:
+        import msgspec  # type: ignore
+
+        encoder = msgspec.json.Encoder()  # type: ignore
+        decoder = msgspec.json.Decoder()  # type: ignore
+
+        return JSONCodec(decoder.decode, lambda obj: encoder.encode(obj).decode())  # type: ignore
+    except ImportError:
+        pass
+
+    from json import dumps, loads
+
+    return JSONCodec(loads, lambda obj: dumps(obj, separators=(",", ":")))
+
+
+DEFAULT_CODEC: Final[JSONCodec] = _get_default_codec()
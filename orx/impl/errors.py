@@ -1,4 +1,9 @@
-from aiohttp import ClientResponse
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from orx.proto.http import ResponseProto
+else:
+    ResponseProto = Any
 
 
 class OrxError(Exception):
@@ -14,7 +19,7 @@ class HTTPError(OrxError):
     Base class for all HTTP errors.
     """
 
-    def __init__(self, response: ClientResponse, *args: object) -> None:
+    def __init__(self, response: ResponseProto, *args: object) -> None:
         self.response = response
         self.status = response.status
 
@@ -65,6 +70,14 @@ class GatewayTimeout(ServerError):
     pass
 
 
+class RequestShed(OrxError):
+    """
+    Raised when a request waits on a ratelimit past its priority's deadline, and is dropped without being sent.
+    """
+
+    pass
+
+
 class GatewayReconnect(OrxError):
     """
     Raised when a shard needs to reconnect to the gateway.
@@ -73,6 +86,14 @@ class GatewayReconnect(OrxError):
     pass
 
 
+class ETFError(OrxError):
+    """
+    Raised when a payload cannot be encoded to or decoded from Erlang's external term format.
+    """
+
+    pass
+
+
 class GatewayCriticalError(OrxError):
     """
     Raised when a shard encounters a critical error.
@@ -1,9 +1,22 @@
 from .client import GatewayClient
-from .ratelimiter import GatewayRatelimiter
+from .cluster import Cluster, ClusterIdentifyRatelimiter
+from .dispatcher import Dispatcher, GuildLaneDispatcher
+from .ratelimiter import GatewayRatelimiter, IdentifyRatelimiter
+from .router import DispatchHook, Router
+from .session import FileSessionStore, MemorySessionStore
 from .shard import Shard
 
 __all__ = (
+    "Cluster",
+    "ClusterIdentifyRatelimiter",
+    "DispatchHook",
+    "Dispatcher",
+    "FileSessionStore",
     "GatewayClient",
     "GatewayRatelimiter",
+    "GuildLaneDispatcher",
+    "IdentifyRatelimiter",
+    "MemorySessionStore",
+    "Router",
     "Shard",
 )
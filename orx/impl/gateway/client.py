@@ -1,13 +1,39 @@
-from asyncio import Future, Task, create_task
-from typing import Any, Callable, Coroutine, Optional, Type, TypedDict
-
+from asyncio import FIRST_COMPLETED, Future, Queue, Task, create_task, gather
+from asyncio import wait as wait_tasks
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Collection,
+    Coroutine,
+    Final,
+    Iterable,
+    Literal,
+    Optional,
+    Type,
+    TypedDict,
+)
+
+from orx.impl.codec import DEFAULT_CODEC, JSONCodec
 from orx.impl.http import Route
-from orx.proto.gateway import GatewayRatelimiterProto, ShardProto
+from orx.proto.gateway import (
+    DispatcherProto,
+    GatewayRatelimiterProto,
+    IdentifyRatelimiterProto,
+    RouterProto,
+    SessionSnapshot,
+    SessionStoreProto,
+    ShardProto,
+)
 from orx.proto.http import HTTPClientProto
 
-from .ratelimiter import GatewayRatelimiter
+from .ratelimiter import GatewayRatelimiter, IdentifyRatelimiter
+from .router import Router
 from .shard import Shard
 
+# How many requested members may be buffered before request_members stops reading chunks.
+MEMBER_BUFFER: Final = 1000
+
 
 class _SessionStartLimit(TypedDict):
     total: int
@@ -28,12 +54,19 @@ class GatewayClient:
         "_shard_tasks",
         "_shard_ids",
         "_shard_count",
-        "_hooks",
+        "_router",
         "_token",
         "_intents",
         "_http",
         "_ratelimiter_cls",
         "_shard_cls",
+        "_compress",
+        "_codec",
+        "_encoding",
+        "_lazy",
+        "_identify_ratelimiter",
+        "_session_store",
+        "_dispatcher",
         "_done",
     )
 
@@ -46,6 +79,15 @@ class GatewayClient:
         shard_cls: Optional[Type[ShardProto]] = None,
         shard_ids: Optional[list[int]] = None,
         shard_count: Optional[int] = None,
+        *,
+        compress: bool = False,
+        codec: Optional[JSONCodec] = None,
+        encoding: Literal["json", "etf"] = "json",
+        lazy: bool = False,
+        identify_ratelimiter: Optional[IdentifyRatelimiterProto] = None,
+        session_store: Optional[SessionStoreProto] = None,
+        dispatcher: Optional[DispatcherProto] = None,
+        router: Optional[RouterProto] = None,
     ) -> None:
         """A gateway client to connect to the Discord gateway.
 
@@ -57,6 +99,18 @@ class GatewayClient:
             shard_cls (Optional[Type[ShardProto]], optional): The shard class to use. Defaults to None.
             shard_ids (Optional[list[int]], optional): The shard IDs to connect on. Defaults to None.
             shard_count (Optional[int], optional): The shard count to connect with. Defaults to None.
+            compress (bool, optional): Whether shards should use zlib-stream transport compression. Defaults to False.
+            codec (Optional[JSONCodec], optional): The JSON codec shards should use. Defaults to the fastest one installed.
+            encoding (Literal["json", "etf"], optional): The gateway payload encoding shards should use. Defaults to "json".
+            lazy (bool, optional): Whether shards should decode dispatch bodies lazily. Defaults to False.
+            identify_ratelimiter (Optional[IdentifyRatelimiterProto], optional): The ratelimiter to gate identifies with,\
+                for sharing identify concurrency with other processes. Defaults to one built from the session start limit.
+            session_store (Optional[SessionStoreProto], optional): The store to save shard sessions to on close and\
+                resume them from on start, so restarts do not re-identify. Defaults to None.
+            dispatcher (Optional[DispatcherProto], optional): A dispatcher for all shards to run callbacks on.\
+                Defaults to a Dispatcher per shard.
+            router (Optional[RouterProto], optional): The routing table of dispatch hooks, shared by all shards.\
+                Defaults to an empty Router.
 
         Raises:
             ValueError: shard_ids was set but shard_count was not.
@@ -71,7 +125,7 @@ class GatewayClient:
         if shard_ids and not shard_count:
             raise ValueError("shard_count must be set if shard_ids is set")
 
-        self._hooks: dict[str, list[Callable[..., Coroutine[Any, Any, None]]]] = {}
+        self._router = router or Router()
 
         self._token = token
         self._intents = intents
@@ -79,29 +133,43 @@ class GatewayClient:
 
         self._ratelimiter_cls = ratelimiter_cls or GatewayRatelimiter
         self._shard_cls = shard_cls or Shard
+        self._compress = compress
+        self._codec = codec or DEFAULT_CODEC
+        self._encoding: Literal["json", "etf"] = encoding
+        self._lazy = lazy
+        self._identify_ratelimiter = identify_ratelimiter
+        self._session_store = session_store
+        self._dispatcher = dispatcher
 
         self._done = Future[None]()
 
     async def _get_gateway(self) -> _GetGatewayBot:
-        route = Route("GET", "/gateway/bot")
-        response = await self._http.request(route)
-
-        data = await response.json()
+        return await self._http.request_json(Route("GET", "/gateway/bot"))
 
-        return data
-
-    def add_dispatch_hook(self, event: str, hook: Callable[..., Coroutine[Any, Any, None]]) -> None:
+    def add_dispatch_hook(
+        self,
+        event: str,
+        hook: Callable[..., Optional[Coroutine[Any, Any, None]]],
+        *,
+        guild_ids: Optional[Collection[int | str]] = None,
+        channel_ids: Optional[Collection[int | str]] = None,
+        predicate: Optional[Callable[[Any], bool]] = None,
+    ) -> None:
         """Add a dispatch hook to be called on gateway events.
 
+        Hooks are shared by all shards, so hooks added after start() apply to running shards too.
+
         Args:
             event (str): The event to listen to.
-            hook (Callable[..., Coroutine[Any, Any, None]]): The callback.
+            hook (Callable[..., Optional[Coroutine[Any, Any, None]]]): The callback. Synchronous callbacks are called inline.
+            guild_ids (Optional[Collection[int | str]], optional): Only call the hook for events in these guilds. Defaults to None.
+            channel_ids (Optional[Collection[int | str]], optional): Only call the hook for events in these channels.\
+                Defaults to None.
+            predicate (Optional[Callable[[Any], bool]], optional): Only call the hook for events whose `d` it returns\
+                True for. Defaults to None.
         """
 
-        if event not in self._hooks:
-            self._hooks[event] = [hook]
-            return
-        self._hooks[event].append(hook)
+        self._router.add(event, hook, guild_ids=guild_ids, channel_ids=channel_ids, predicate=predicate)
 
     def get_shard(self, id: int) -> ShardProto:
         """Get a specific shard.
@@ -115,9 +183,97 @@ class GatewayClient:
 
         return self.shards[id]
 
+    def get_guild_shard(self, guild_id: int | str) -> ShardProto:
+        """Get the shard a guild's events are received on.
+
+        Args:
+            guild_id (int | str): The ID of the guild.
+
+        Raises:
+            RuntimeError: The client has not been started.
+            KeyError: The guild's shard is not run by this client.
+
+        Returns:
+            ShardProto: The shard.
+        """
+
+        if not self._shard_count:
+            raise RuntimeError("Cannot find a guild's shard before the client is started")
+
+        return self.shards[(int(guild_id) >> 22) % self._shard_count]
+
+    async def request_members(
+        self,
+        guild_ids: Iterable[int | str],
+        *,
+        concurrency: int = 8,
+        limit: int = 0,
+        timeout: float = 30,
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """Request the members of many guilds, yielding them as their chunks arrive.
+
+        Requests are made on each guild's shard, with up to `concurrency` guilds in flight at once.
+
+        Args:
+            guild_ids (Iterable[int | str]): The IDs of the guilds.
+            concurrency (int, optional): The number of guilds to request at once. Defaults to 8.
+            limit (int, optional): The maximum number of members to request per guild. Defaults to 0, for no limit.
+            timeout (float, optional): How long to wait for each chunk. Defaults to 30.
+
+        Raises:
+            TimeoutError: A chunk did not arrive in time.
+
+        Yields:
+            tuple[str, Any]: The ID of each member's guild, and the member object.
+        """
+
+        guilds = iter(guild_ids)
+        results: Queue[Optional[tuple[str, Any] | Exception]] = Queue(MEMBER_BUFFER)
+
+        async def worker() -> None:
+            # Workers share the iterator, so each guild is requested once.
+            for guild_id in guilds:
+                shard = self.get_guild_shard(guild_id)
+
+                async for member in shard.request_members(guild_id, limit=limit, timeout=timeout):
+                    await results.put((str(guild_id), member))
+
+        async def run() -> None:
+            try:
+                await gather(*(worker() for _ in range(concurrency)))
+            except Exception as e:
+                await results.put(e)
+            else:
+                await results.put(None)
+
+        task = create_task(run())
+
+        try:
+            while (result := await results.get()) is not None:
+                if isinstance(result, Exception):
+                    raise result
+
+                yield result
+        finally:
+            task.cancel()
+
+    async def _start_bucket(self, shards: list[ShardProto], url: str) -> None:
+        for shard in shards:
+            task = self._shard_tasks[shard.id] = create_task(shard.connect(url, self._http))
+            identified = create_task(shard.identified.wait())
+
+            # Shards in the same bucket must identify one at a time, but a shard that dies or keeps
+            # reconnecting before READY must not hold up the rest of its bucket, so the bucket moves on
+            # once the identify has been sent. The identify ratelimiter spaces out the identifies.
+            await wait_tasks((task, identified), return_when=FIRST_COMPLETED)
+            identified.cancel()
+
     async def start(self, *, fail_early: bool = False, wait: bool = True) -> None:
         """Start the connection to the gateway.
 
+        Shards are grouped into identify buckets by shard_id % max_concurrency. Buckets start in
+        parallel, while the shards within a bucket identify one after another at least 5 seconds apart.
+
         Args:
             fail_early (bool, optional): Whether to fail if there are insufficient\
                 remaining indentify calls for the number of shards given. Defaults to False.
@@ -144,8 +300,10 @@ class GatewayClient:
         if not self._shard_count:
             raise RuntimeError("shard_count is not set while starting shards")
 
-        limiter = self._ratelimiter_cls(session_limits["max_concurrency"], 5)
-        last_shard: Optional[ShardProto] = None
+        max_concurrency = session_limits["max_concurrency"]
+        limiter = self._identify_ratelimiter or IdentifyRatelimiter(max_concurrency, 5)
+        snapshots = await self._session_store.load() if self._session_store else {}
+        buckets: dict[int, list[ShardProto]] = {}
 
         for shard_id in self._shard_ids:
             shard = self._shard_cls(
@@ -154,28 +312,45 @@ class GatewayClient:
                 self._token,
                 self._intents,
                 self._ratelimiter_cls,
+                compress=self._compress,
+                codec=self._codec,
+                encoding=self._encoding,
+                lazy=self._lazy,
+                identify_ratelimiter=limiter,
+                dispatcher=self._dispatcher,
+                router=self._router,
             )
 
-            shard.callbacks.update(self._hooks)
-            self.shards[shard_id] = shard
-
-            await limiter.acquire()
+            # Sessions belong to a shard layout, so they are only resumed if the shard count is unchanged.
+            if (snapshot := snapshots.get(shard_id)) and snapshot.get("shard_count") == self._shard_count:
+                shard.restore(snapshot)
 
-            if last_shard:
-                await last_shard.ready.wait()
+            self.shards[shard_id] = shard
 
-            last_shard = shard
+            buckets.setdefault(shard_id % max_concurrency, []).append(shard)
 
-            self._shard_tasks[shard.id] = create_task(shard.connect(gateway["url"], self._http))
+        await gather(*(self._start_bucket(shards, gateway["url"]) for shards in buckets.values()))
 
         if wait:
             await self._done
 
     async def close(self) -> None:
-        """Close the gateway client."""
+        """Close the gateway client, saving shard sessions to the session store if there is one."""
+
+        resumable = self._session_store is not None
+        snapshots: dict[int, SessionSnapshot] = {}
 
         for shard in self.shards.values():
-            await shard.close()
+            await shard.close(resumable=resumable)
+
+            if snapshot := shard.snapshot():
+                snapshots[shard.id] = snapshot
+
+        if self._session_store:
+            await self._session_store.save(snapshots)
+
+        if self._dispatcher:
+            await self._dispatcher.close()
 
         self._done.set_result(None)
 
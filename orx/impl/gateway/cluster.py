@@ -0,0 +1,349 @@
+from asyncio import AbstractEventLoop, Future, get_running_loop
+from asyncio import run as run_async
+from dataclasses import dataclass
+from functools import partial
+from heapq import heappop, heappush
+from itertools import count
+from multiprocessing import get_context
+from multiprocessing.connection import Connection, wait
+from multiprocessing.process import BaseProcess
+from os import cpu_count
+from threading import Lock, Thread
+from time import monotonic
+from typing import Any, Callable, Coroutine, Final, Literal, Optional
+
+from orx.impl.http import HTTPClient, Route
+from orx.impl.http.ratelimiter import Ratelimiter
+from orx.proto.http import RatelimiterProto
+
+from .client import GatewayClient
+
+IDENTIFY_INTERVAL: Final = 5
+POLL_INTERVAL: Final = 1
+GLOBAL_RATE: Final = 50
+
+
+class ClusterIdentifyRatelimiter:
+    __slots__ = (
+        "_conn",
+        "_ids",
+        "_futures",
+        "_lock",
+        "_reader",
+    )
+
+    def __init__(self, conn: Connection) -> None:
+        """An identify ratelimiter for cluster workers, which asks the supervisor before each identify.
+
+        Args:
+            conn (Connection): The worker's end of the pipe to the supervisor.
+        """
+
+        self._conn = conn
+        self._ids = count()
+        self._futures: dict[int, tuple[AbstractEventLoop, Future[None]]] = {}
+        self._lock = Lock()
+        self._reader: Optional[Thread] = None
+
+    def _read(self) -> None:
+        while True:
+            try:
+                request = self._conn.recv()
+            except (EOFError, OSError):
+                break
+
+            loop, future = self._futures.pop(request)
+            loop.call_soon_threadsafe(_resolve, future, None)
+
+        while self._futures:
+            _, (loop, future) = self._futures.popitem()
+            loop.call_soon_threadsafe(_resolve, future, ConnectionError("Lost connection to the cluster supervisor"))
+
+    async def acquire(self, shard_id: int) -> None:
+        """Wait until the supervisor allows a shard to identify.
+
+        Args:
+            shard_id (int): The ID of the shard identifying.
+        """
+
+        loop = get_running_loop()
+        future = loop.create_future()
+        request = next(self._ids)
+
+        self._futures[request] = (loop, future)
+
+        if self._reader is None:
+            self._reader = Thread(target=self._read, daemon=True)
+            self._reader.start()
+
+        with self._lock:
+            self._conn.send((request, shard_id))
+
+        await future
+
+
+def _resolve(future: Future[None], exc: Optional[BaseException]) -> None:
+    if future.done():
+        return
+
+    if exc:
+        future.set_exception(exc)
+    else:
+        future.set_result(None)
+
+
+async def _run_worker(
+    token: str,
+    intents: int,
+    shard_ids: list[int],
+    shard_count: int,
+    setup: Optional[Callable[[GatewayClient], Coroutine[Any, Any, None]]],
+    conn: Connection,
+    ratelimiter: Callable[[], RatelimiterProto],
+    options: dict[str, Any],
+) -> None:
+    async with HTTPClient(token, ratelimiter=ratelimiter()) as http:
+        client = GatewayClient(
+            token,
+            intents,
+            http,
+            shard_ids=shard_ids,
+            shard_count=shard_count,
+            identify_ratelimiter=ClusterIdentifyRatelimiter(conn),
+            **options,
+        )
+
+        if setup:
+            await setup(client)
+
+        await client.start()
+
+
+def _worker_main(*args: Any) -> None:
+    run_async(_run_worker(*args))
+
+
+async def _get_gateway(token: str) -> dict[str, Any]:
+    async with HTTPClient(token) as http:
+        return await http.request_json(Route("GET", "/gateway/bot"))
+
+
+@dataclass(slots=True)
+class _Worker:
+    shard_ids: list[int]
+    process: Optional[BaseProcess] = None
+    conn: Optional[Connection] = None
+    restart_at: Optional[float] = None
+    restarts: int = 0
+
+
+class Cluster:
+    __slots__ = (
+        "_workers",
+        "_token",
+        "_intents",
+        "_setup",
+        "_worker_count",
+        "_shard_count",
+        "_max_concurrency",
+        "_restart_delay",
+        "_ratelimiter",
+        "_options",
+        "_context",
+        "_running",
+    )
+
+    def __init__(
+        self,
+        token: str,
+        intents: int,
+        setup: Optional[Callable[[GatewayClient], Coroutine[Any, Any, None]]] = None,
+        *,
+        workers: Optional[int] = None,
+        shard_count: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        restart_delay: float = 5,
+        ratelimiter: Optional[Callable[[], RatelimiterProto]] = None,
+        compress: bool = False,
+        encoding: Literal["json", "etf"] = "json",
+        lazy: bool = False,
+    ) -> None:
+        """A supervisor which runs a bot's shards across several worker processes.
+
+        Each worker runs a GatewayClient over a contiguous slice of the shards, and identifies through the
+        supervisor so that identify buckets are shared across processes. Workers which exit are restarted.
+
+        Args:
+            token (str): The token to connect with.
+            intents (int): The gateway intents to connect with.
+            setup (Optional[Callable[[GatewayClient], Coroutine[Any, Any, None]]], optional): A coroutine function\
+                called with each worker's client before it starts, to add hooks. Must be picklable. Defaults to None.
+            workers (Optional[int], optional): The number of worker processes. Defaults to the CPU count.
+            shard_count (Optional[int], optional): The shard count to connect with. Defaults to the recommended count.
+            max_concurrency (Optional[int], optional): The identify max_concurrency. Defaults to the session start limit.
+            restart_delay (float, optional): How long to wait before restarting a worker which exited. Defaults to 5.
+            ratelimiter (Optional[Callable[[], RatelimiterProto]], optional): A function called in each worker to build\
+                its HTTP ratelimiter, such as one returning a DistributedRatelimiter on a shared RedisStore. Must be\
+                picklable. Defaults to a Ratelimiter per worker with an equal share of the global ratelimit.
+            compress (bool, optional): Whether shards should use zlib-stream transport compression. Defaults to False.
+            encoding (Literal["json", "etf"], optional): The gateway payload encoding shards should use. Defaults to "json".
+            lazy (bool, optional): Whether shards should decode dispatch bodies lazily. Defaults to False.
+        """
+
+        self._workers: list[_Worker] = []
+
+        self._token = token
+        self._intents = intents
+        self._setup = setup
+        self._worker_count = workers or cpu_count() or 1
+        self._shard_count = shard_count
+        self._max_concurrency = max_concurrency
+        self._restart_delay = restart_delay
+        self._ratelimiter = ratelimiter
+        self._options: dict[str, Any] = {"compress": compress, "encoding": encoding, "lazy": lazy}
+        self._context = get_context("spawn")
+        self._running = False
+
+    def _worker_ratelimiter(self) -> Callable[[], RatelimiterProto]:
+        if self._ratelimiter:
+            return self._ratelimiter
+
+        # Each worker has its own HTTP client, so without a shared ratelimiter the global limit is split between them.
+        return partial(Ratelimiter, global_rate=max(GLOBAL_RATE // len(self._workers), 1))
+
+    def _spawn(self, worker: _Worker) -> None:
+        assert self._shard_count
+
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(
+                self._token,
+                self._intents,
+                worker.shard_ids,
+                self._shard_count,
+                self._setup,
+                child_conn,
+                self._worker_ratelimiter(),
+                self._options,
+            ),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+
+        worker.process = process
+        worker.conn = conn
+        worker.restart_at = None
+
+    def run(self) -> None:
+        """Start the worker processes and supervise them until stop() is called or the process is interrupted.
+
+        Workers are spawned rather than forked, so this must be called from under an `if __name__ == "__main__":` guard.
+        """
+
+        if self._shard_count is None or self._max_concurrency is None:
+            gateway = run_async(_get_gateway(self._token))
+
+            self._shard_count = self._shard_count or gateway["shards"]
+            self._max_concurrency = self._max_concurrency or gateway["session_start_limit"]["max_concurrency"]
+
+        assert self._shard_count and self._max_concurrency
+
+        worker_count = min(self._worker_count, self._shard_count)
+        shard_ids = list(range(self._shard_count))
+
+        self._workers = [
+            _Worker(shard_ids[i * self._shard_count // worker_count : (i + 1) * self._shard_count // worker_count])
+            for i in range(worker_count)
+        ]
+
+        self._running = True
+
+        try:
+            for worker in self._workers:
+                self._spawn(worker)
+
+            self._supervise(self._max_concurrency)
+        finally:
+            self._running = False
+
+            for worker in self._workers:
+                if worker.process and worker.process.is_alive():
+                    worker.process.terminate()
+
+            for worker in self._workers:
+                if worker.process:
+                    worker.process.join()
+                if worker.conn:
+                    worker.conn.close()
+
+    def stop(self) -> None:
+        """Stop supervising and terminate the worker processes."""
+
+        self._running = False
+
+    def _supervise(self, max_concurrency: int) -> None:
+        # Identify grants are (when, seq, conn, request), ordered by when they may be sent.
+        grants: list[tuple[float, int, Connection, int]] = []
+        next_identify: dict[int, float] = {}
+        seq = count()
+
+        while self._running:
+            now = monotonic()
+            timeout: float = POLL_INTERVAL
+
+            if grants:
+                timeout = min(timeout, grants[0][0] - now)
+
+            for worker in self._workers:
+                if worker.restart_at is not None:
+                    timeout = min(timeout, worker.restart_at - now)
+
+            conns = {worker.conn: worker for worker in self._workers if worker.conn}
+            sentinels = {worker.process.sentinel: worker for worker in self._workers if worker.process}
+
+            for ready in wait([*conns, *sentinels], max(timeout, 0)):
+                if isinstance(ready, int):
+                    worker = sentinels[ready]
+
+                    # The process has exited, so this only reaps it.
+                    if worker.process:
+                        worker.process.join()
+
+                    worker.process = None
+                    worker.restart_at = monotonic() + self._restart_delay
+                    continue
+
+                assert isinstance(ready, Connection)
+
+                try:
+                    request, shard_id = ready.recv()
+                except (EOFError, OSError):
+                    conns[ready].conn = None
+                    ready.close()
+                    continue
+
+                key = shard_id % max_concurrency
+                at = max(monotonic(), next_identify.get(key, 0))
+                next_identify[key] = at + IDENTIFY_INTERVAL
+
+                heappush(grants, (at, next(seq), ready, request))
+
+            now = monotonic()
+
+            while grants and grants[0][0] <= now:
+                _, _, conn, request = heappop(grants)
+
+                try:
+                    conn.send(request)
+                except OSError:
+                    pass
+
+            for worker in self._workers:
+                if worker.restart_at is not None and worker.restart_at <= now:
+                    if worker.conn:
+                        worker.conn.close()
+
+                    worker.restarts += 1
+                    self._spawn(worker)
@@ -0,0 +1,250 @@
+from asyncio import (
+    Queue,
+    Semaphore,
+    Task,
+    create_task,
+    current_task,
+    gather,
+    get_running_loop,
+    iscoroutine,
+)
+from collections import deque
+from typing import Any, Callable, Collection, Coroutine, Literal, Optional, Sequence
+
+from .event import GatewayEvent
+
+
+def _report(e: Exception) -> None:
+    get_running_loop().call_exception_handler({"message": "Error in dispatch callback", "exception": e})
+
+
+def _call(callback: Callable[..., Any], event: GatewayEvent) -> Optional[Coroutine[Any, Any, Any]]:
+    try:
+        result = callback(event)
+    except Exception as e:
+        _report(e)
+        return None
+
+    return result if iscoroutine(result) else None
+
+
+class Dispatcher:
+    __slots__ = (
+        "dropped",
+        "_workers",
+        "_policy",
+        "_drop_types",
+        "_queue",
+        "_tasks",
+    )
+
+    def __init__(
+        self,
+        workers: int = 16,
+        max_queue: int = 1024,
+        *,
+        policy: Literal["block", "drop_oldest", "drop_type"] = "block",
+        drop_types: Collection[str] = (),
+    ) -> None:
+        """A dispatcher which runs event callbacks on a fixed pool of workers.
+
+        Callbacks are called inline as events are read. Synchronous callbacks finish there, and the
+        coroutines of async callbacks are queued for the workers, so no task is created per callback.
+
+        Args:
+            workers (int, optional): The number of coroutines to run at once. Defaults to 16.
+            max_queue (int, optional): The number of coroutines to queue before applying the policy. Defaults to 1024.
+            policy (Literal["block", "drop_oldest", "drop_type"], optional): What to do when the queue is full.\
+                "block" waits for space, which stops the shard reading. "drop_oldest" discards the oldest queued\
+                coroutine. "drop_type" discards new events with a type in drop_types and blocks for the rest.\
+                Defaults to "block".
+            drop_types (Collection[str], optional): The event types the "drop_type" policy may discard. Defaults to ().
+
+        Raises:
+            ValueError: An unknown policy was given.
+        """
+
+        if policy not in ("block", "drop_oldest", "drop_type"):
+            raise ValueError(f"Unknown backpressure policy {policy!r}")
+
+        self.dropped = 0
+
+        self._workers = workers
+        self._policy = policy
+        self._drop_types = frozenset(drop_types)
+        self._queue: Queue[Coroutine[Any, Any, Any]] = Queue(max_queue)
+        self._tasks: list[Task[None]] = []
+
+    async def _work(self) -> None:
+        while True:
+            coro = await self._queue.get()
+
+            try:
+                await coro
+            except Exception as e:
+                _report(e)
+
+    async def _put(self, event: GatewayEvent, coro: Coroutine[Any, Any, Any]) -> None:
+        if not self._tasks:
+            self._tasks = [create_task(self._work()) for _ in range(self._workers)]
+
+        if self._queue.full():
+            if self._policy == "drop_oldest":
+                self._queue.get_nowait().close()
+                self.dropped += 1
+            elif self._policy == "drop_type" and event.t in self._drop_types:
+                coro.close()
+                self.dropped += 1
+                return
+
+        await self._queue.put(coro)
+
+    async def dispatch(self, callbacks: Sequence[Callable[..., Any]], event: GatewayEvent) -> None:
+        """Dispatch an event to its callbacks.
+
+        Args:
+            callbacks (Sequence[Callable[..., Any]]): The callbacks to call with the event.
+            event (GatewayEvent): The event to dispatch.
+        """
+
+        for callback in callbacks:
+            if coro := _call(callback, event):
+                await self._put(event, coro)
+
+    async def close(self) -> None:
+        """Stop the workers, discarding any queued callbacks."""
+
+        for task in self._tasks:
+            task.cancel()
+
+        self._tasks = []
+
+        while not self._queue.empty():
+            self._queue.get_nowait().close()
+
+
+class GuildLaneDispatcher:
+    __slots__ = (
+        "dropped",
+        "_workers",
+        "_policy",
+        "_drop_types",
+        "_lanes",
+        "_ready",
+        "_slots",
+        "_tasks",
+    )
+
+    def __init__(
+        self,
+        workers: int = 16,
+        max_queue: int = 1024,
+        *,
+        policy: Literal["block", "drop_type"] = "block",
+        drop_types: Collection[str] = (),
+    ) -> None:
+        """A dispatcher which runs each guild's callbacks in order, and different guilds' callbacks in parallel.
+
+        Events are partitioned into lanes by guild ID, with events that have no guild sharing one lane.
+        Each lane runs its coroutines one at a time, in the order their events were read, and up to
+        `workers` lanes run at once. Synchronous callbacks are still called inline.
+
+        Args:
+            workers (int, optional): The number of lanes to run at once. Defaults to 16.
+            max_queue (int, optional): The number of coroutines to queue across all lanes before applying\
+                the policy. Defaults to 1024.
+            policy (Literal["block", "drop_type"], optional): What to do when the queue is full. "block" waits\
+                for space, which stops the shard reading. "drop_type" discards new events with a type in\
+                drop_types and blocks for the rest. Defaults to "block".
+            drop_types (Collection[str], optional): The event types the "drop_type" policy may discard. Defaults to ().
+
+        Raises:
+            ValueError: An unknown policy was given.
+        """
+
+        if policy not in ("block", "drop_type"):
+            raise ValueError(f"Unknown backpressure policy {policy!r}")
+
+        self.dropped = 0
+
+        self._workers = workers
+        self._policy = policy
+        self._drop_types = frozenset(drop_types)
+        self._lanes: dict[Optional[str], deque[Coroutine[Any, Any, Any]]] = {}
+        self._ready: Queue[Optional[str]] = Queue()
+        self._slots = Semaphore(max_queue)
+        self._tasks: list[Task[None]] = []
+
+    async def _work(self) -> None:
+        while True:
+            key = await self._ready.get()
+            lane = self._lanes[key]
+
+            try:
+                await lane.popleft()
+            except Exception as e:
+                _report(e)
+            finally:
+                self._slots.release()
+
+            # A lane is only ever queued once, so its next coroutine cannot start before this one finished.
+            if lane:
+                self._ready.put_nowait(key)
+            else:
+                del self._lanes[key]
+
+    async def _put(self, key: Optional[str], event: GatewayEvent, coro: Coroutine[Any, Any, Any]) -> None:
+        if not self._tasks:
+            self._tasks = [create_task(self._work()) for _ in range(self._workers)]
+
+        if self._slots.locked() and self._policy == "drop_type" and event.t in self._drop_types:
+            coro.close()
+            self.dropped += 1
+            return
+
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            # Nothing will run the coroutine if the dispatch is cancelled while waiting for space.
+            coro.close()
+            raise
+
+        if (lane := self._lanes.get(key)) is None:
+            lane = self._lanes[key] = deque()
+            self._ready.put_nowait(key)
+
+        lane.append(coro)
+
+    async def dispatch(self, callbacks: Sequence[Callable[..., Any]], event: GatewayEvent) -> None:
+        """Dispatch an event to its callbacks, on its guild's lane.
+
+        Args:
+            callbacks (Sequence[Callable[..., Any]]): The callbacks to call with the event.
+            event (GatewayEvent): The event to dispatch.
+        """
+
+        key = event.guild_id
+
+        for callback in callbacks:
+            if coro := _call(callback, event):
+                await self._put(key, event, coro)
+
+    async def close(self) -> None:
+        """Stop the workers, discarding any queued callbacks."""
+
+        tasks, self._tasks = self._tasks, []
+
+        for task in tasks:
+            task.cancel()
+
+        # Workers release the slot of the coroutine they were running as they are cancelled, and the slots
+        # of the queued coroutines are released here, so the semaphore is kept and stays balanced.
+        for lane in self._lanes.values():
+            for coro in lane:
+                coro.close()
+                self._slots.release()
+
+        self._lanes.clear()
+        self._ready = Queue()
+
+        await gather(*(task for task in tasks if task is not current_task()), return_exceptions=True)
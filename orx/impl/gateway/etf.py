@@ -0,0 +1,264 @@
+from struct import Struct
+from struct import error as StructError
+from typing import Any, Final
+from zlib import decompress
+from zlib import error as ZlibError
+
+from orx.impl.errors import ETFError
+
+VERSION: Final[int] = 131
+
+NEW_FLOAT_EXT: Final[int] = 70
+COMPRESSED: Final[int] = 80
+SMALL_INTEGER_EXT: Final[int] = 97
+INTEGER_EXT: Final[int] = 98
+FLOAT_EXT: Final[int] = 99
+ATOM_EXT: Final[int] = 100
+SMALL_TUPLE_EXT: Final[int] = 104
+LARGE_TUPLE_EXT: Final[int] = 105
+NIL_EXT: Final[int] = 106
+STRING_EXT: Final[int] = 107
+LIST_EXT: Final[int] = 108
+BINARY_EXT: Final[int] = 109
+SMALL_BIG_EXT: Final[int] = 110
+LARGE_BIG_EXT: Final[int] = 111
+SMALL_ATOM_EXT: Final[int] = 115
+MAP_EXT: Final[int] = 116
+ATOM_UTF8_EXT: Final[int] = 118
+SMALL_ATOM_UTF8_EXT: Final[int] = 119
+
+_u16 = Struct(">H")
+_u32 = Struct(">I")
+_i32 = Struct(">i")
+_f64 = Struct(">d")
+
+_ATOMS: Final[dict[str, Any]] = {"nil": None, "true": True, "false": False}
+
+
+def _atom(name: str) -> Any:
+    return _ATOMS.get(name, name)
+
+
+def _decode(data: bytes, i: int) -> tuple[Any, int]:
+    tag = data[i]
+    i += 1
+
+    if tag == SMALL_INTEGER_EXT:
+        return data[i], i + 1
+
+    if tag == INTEGER_EXT:
+        return _i32.unpack_from(data, i)[0], i + 4
+
+    if tag == BINARY_EXT:
+        length = _u32.unpack_from(data, i)[0]
+        i += 4
+        raw = data[i : i + length]
+
+        try:
+            return raw.decode(), i + length
+        except UnicodeDecodeError:
+            return raw, i + length
+
+    if tag == MAP_EXT:
+        arity = _u32.unpack_from(data, i)[0]
+        i += 4
+        result: dict[Any, Any] = {}
+
+        for _ in range(arity):
+            key, i = _decode(data, i)
+            result[key], i = _decode(data, i)
+
+        return result, i
+
+    if tag == LIST_EXT:
+        length = _u32.unpack_from(data, i)[0]
+        i += 4
+        items: list[Any] = []
+
+        for _ in range(length):
+            item, i = _decode(data, i)
+            items.append(item)
+
+        # Proper lists end with NIL_EXT; anything else is an improper tail, which is dropped.
+        _, i = _decode(data, i)
+
+        return items, i
+
+    if tag == NIL_EXT:
+        return [], i
+
+    if tag == SMALL_ATOM_UTF8_EXT or tag == SMALL_ATOM_EXT:
+        length = data[i]
+        i += 1
+        return _atom(data[i : i + length].decode("utf-8" if tag == SMALL_ATOM_UTF8_EXT else "latin-1")), i + length
+
+    if tag == ATOM_UTF8_EXT or tag == ATOM_EXT:
+        length = _u16.unpack_from(data, i)[0]
+        i += 2
+        return _atom(data[i : i + length].decode("utf-8" if tag == ATOM_UTF8_EXT else "latin-1")), i + length
+
+    if tag == SMALL_BIG_EXT or tag == LARGE_BIG_EXT:
+        if tag == SMALL_BIG_EXT:
+            length = data[i]
+            i += 1
+        else:
+            length = _u32.unpack_from(data, i)[0]
+            i += 4
+
+        sign = data[i]
+        value = int.from_bytes(data[i + 1 : i + 1 + length], "little")
+
+        return -value if sign else value, i + 1 + length
+
+    if tag == NEW_FLOAT_EXT:
+        return _f64.unpack_from(data, i)[0], i + 8
+
+    if tag == FLOAT_EXT:
+        return float(data[i : i + 31].rstrip(b"\x00")), i + 31
+
+    if tag == STRING_EXT:
+        length = _u16.unpack_from(data, i)[0]
+        i += 2
+        return list(data[i : i + length]), i + length
+
+    if tag == SMALL_TUPLE_EXT or tag == LARGE_TUPLE_EXT:
+        if tag == SMALL_TUPLE_EXT:
+            arity = data[i]
+            i += 1
+        else:
+            arity = _u32.unpack_from(data, i)[0]
+            i += 4
+
+        elements: list[Any] = []
+
+        for _ in range(arity):
+            element, i = _decode(data, i)
+            elements.append(element)
+
+        return tuple(elements), i
+
+    raise ETFError(f"Unsupported ETF tag {tag} at offset {i - 1}")
+
+
+def loads(data: bytes | bytearray | memoryview) -> Any:
+    """Decode an external term format payload.
+
+    Atoms are decoded to strings, except nil, true and false which become None, True and False.
+    Binaries are decoded to strings where they are valid UTF-8.
+
+    Args:
+        data (bytes | bytearray | memoryview): The payload to decode.
+
+    Raises:
+        ETFError: The payload is not valid external term format.
+
+    Returns:
+        Any: The decoded term.
+    """
+
+    data = bytes(data)
+
+    if not data or data[0] != VERSION:
+        raise ETFError("Payload does not start with the ETF version byte")
+
+    try:
+        if data[1] == COMPRESSED:
+            data = decompress(data[6:])
+            term, end = _decode(data, 0)
+        else:
+            term, end = _decode(data, 1)
+    except (IndexError, StructError, ZlibError) as e:
+        raise ETFError("Payload is truncated or malformed") from e
+
+    # Slices past the end of the payload are silently short, so a truncated final term only shows in its end offset.
+    if end > len(data):
+        raise ETFError("Payload is truncated or malformed")
+
+    return term
+
+
+def _encode_atom(buffer: bytearray, name: str) -> None:
+    raw = name.encode()
+    buffer.append(SMALL_ATOM_UTF8_EXT)
+    buffer.append(len(raw))
+    buffer += raw
+
+
+def _encode(buffer: bytearray, obj: Any) -> None:
+    if obj is None:
+        _encode_atom(buffer, "nil")
+    elif obj is True:
+        _encode_atom(buffer, "true")
+    elif obj is False:
+        _encode_atom(buffer, "false")
+    elif isinstance(obj, int):
+        if 0 <= obj <= 255:
+            buffer.append(SMALL_INTEGER_EXT)
+            buffer.append(obj)
+        elif -(2**31) <= obj < 2**31:
+            buffer.append(INTEGER_EXT)
+            buffer += _i32.pack(obj)
+        else:
+            magnitude = abs(obj)
+            raw = magnitude.to_bytes((magnitude.bit_length() + 7) // 8, "little")
+
+            if len(raw) > 255:
+                buffer.append(LARGE_BIG_EXT)
+                buffer += _u32.pack(len(raw))
+            else:
+                buffer.append(SMALL_BIG_EXT)
+                buffer.append(len(raw))
+
+            buffer.append(1 if obj < 0 else 0)
+            buffer += raw
+    elif isinstance(obj, str):
+        raw = obj.encode()
+        buffer.append(BINARY_EXT)
+        buffer += _u32.pack(len(raw))
+        buffer += raw
+    elif isinstance(obj, dict):
+        buffer.append(MAP_EXT)
+        buffer += _u32.pack(len(obj))  # type: ignore
+
+        for key, value in obj.items():  # type: ignore
+            _encode(buffer, key)
+            _encode(buffer, value)
+    elif isinstance(obj, (list, tuple)):
+        if obj:
+            buffer.append(LIST_EXT)
+            buffer += _u32.pack(len(obj))  # type: ignore
+
+            for item in obj:  # type: ignore
+                _encode(buffer, item)
+
+        buffer.append(NIL_EXT)
+    elif isinstance(obj, float):
+        buffer.append(NEW_FLOAT_EXT)
+        buffer += _f64.pack(obj)
+    elif isinstance(obj, (bytes, bytearray)):
+        buffer.append(BINARY_EXT)
+        buffer += _u32.pack(len(obj))
+        buffer += obj
+    else:
+        raise ETFError(f"Cannot encode object of type {type(obj).__name__} as ETF")
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode an object as an external term format payload.
+
+    Strings are encoded as binaries, lists and tuples as lists, and None, True and False as atoms.
+
+    Args:
+        obj (Any): The object to encode.
+
+    Raises:
+        ETFError: The object contains a type that cannot be encoded.
+
+    Returns:
+        bytes: The encoded payload.
+    """
+
+    buffer = bytearray((VERSION,))
+    _encode(buffer, obj)
+
+    return bytes(buffer)
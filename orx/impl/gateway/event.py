@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Any, Optional
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
 
 from discord_typings.gateway import GatewayEvent as GatewayEventType
 
@@ -8,18 +8,58 @@ from orx.proto.gateway import ShardProto
 
 @dataclass(frozen=True, slots=True)
 class GatewayEvent:
-    """A generic gateway event."""
+    """A generic gateway event.
+
+    Events read with lazy decoding only carry their raw `d` payload, which is
+    decoded and stored in `data` the first time `d` is accessed.
+    """
 
     shard: ShardProto
     op: int
     data: Optional[GatewayEventType] = None
     s: Optional[int] = None
     t: Optional[str] = None
+    raw_d: Optional[str | bytes] = field(default=None, repr=False, compare=False)
+    loads: Optional[Callable[[str | bytes], Any]] = field(default=None, repr=False, compare=False)
 
     @property
     def d(self) -> Any:
+        if self.data is None and self.raw_d is not None and self.loads:
+            data = {"op": self.op, "s": self.s, "t": self.t, "d": self.loads(self.raw_d)}
+            object.__setattr__(self, "data", data)
+
         return self.data["d"]  # type: ignore
 
+    @property
+    def guild_id(self) -> Optional[str]:
+        """The ID of the guild the event is for, decoding the body if it is lazy.
+
+        IDs are returned as strings whichever encoding the event was received in.
+        """
+
+        if not self.t or not isinstance(d := self.d, dict):
+            return None
+
+        # GUILD_CREATE, GUILD_UPDATE and GUILD_DELETE carry the guild itself.
+        guild_id = d.get("guild_id") or (d.get("id") if self.t.startswith("GUILD_") else None)  # type: ignore
+
+        return str(guild_id) if guild_id else None  # type: ignore
+
+    @property
+    def channel_id(self) -> Optional[str]:
+        """The ID of the channel the event is for, decoding the body if it is lazy.
+
+        IDs are returned as strings whichever encoding the event was received in.
+        """
+
+        if not self.t or not isinstance(d := self.d, dict):
+            return None
+
+        # CHANNEL_CREATE, CHANNEL_UPDATE and CHANNEL_DELETE carry the channel itself.
+        channel_id = d.get("channel_id") or (d.get("id") if self.t.startswith("CHANNEL_") else None)  # type: ignore
+
+        return str(channel_id) if channel_id else None  # type: ignore
+
     @property
     def dispatch_name(self) -> str:
         if self.t:
@@ -1,4 +1,6 @@
-from asyncio import Semaphore, create_task, sleep
+from asyncio import Semaphore
+
+from orx.impl.scheduler import get_scheduler
 
 
 class GatewayRatelimiter:
@@ -18,13 +20,43 @@ class GatewayRatelimiter:
         self._per = per
         self._lock = Semaphore(rate)
 
-    async def _release(self, after: float) -> None:
-        await sleep(after)
-        self._lock.release()
-
     async def acquire(self) -> None:
         """Acquire a ratelimit lock."""
 
         await self._lock.acquire()
 
-        create_task(self._release(self._per))
+        get_scheduler().call_later(self._per, self._lock.release)
+
+
+class IdentifyRatelimiter:
+    __slots__ = (
+        "_max_concurrency",
+        "_per",
+        "_buckets",
+    )
+
+    def __init__(self, max_concurrency: int, per: int = 5) -> None:
+        """A ratelimiter for shard identifies, keyed by identify bucket (shard_id % max_concurrency).
+
+        Args:
+            max_concurrency (int): The max_concurrency from the session start limit.
+            per (int, optional): The interval between identifies in the same bucket. Defaults to 5.
+        """
+
+        self._max_concurrency = max_concurrency
+        self._per = per
+        self._buckets: dict[int, GatewayRatelimiter] = {}
+
+    async def acquire(self, shard_id: int) -> None:
+        """Wait until a shard may identify.
+
+        Args:
+            shard_id (int): The ID of the shard identifying.
+        """
+
+        key = shard_id % self._max_concurrency
+
+        if key not in self._buckets:
+            self._buckets[key] = GatewayRatelimiter(1, self._per)
+
+        await self._buckets[key].acquire()
@@ -0,0 +1,149 @@
+from asyncio import get_running_loop
+from dataclasses import dataclass
+from typing import Any, Callable, Collection, Optional, Sequence
+
+from .event import GatewayEvent
+
+
+def _report(e: Exception) -> None:
+    get_running_loop().call_exception_handler({"message": "Error in dispatch hook predicate", "exception": e})
+
+
+@dataclass(frozen=True, slots=True)
+class DispatchHook:
+    """A dispatch hook and the filters an event must pass to be routed to it."""
+
+    callback: Callable[..., Any]
+    guild_ids: Optional[frozenset[str]] = None
+    channel_ids: Optional[frozenset[str]] = None
+    predicate: Optional[Callable[[Any], bool]] = None
+
+    @property
+    def filtered(self) -> bool:
+        return self.guild_ids is not None or self.channel_ids is not None or self.predicate is not None
+
+    def matches(self, event: GatewayEvent) -> bool:
+        if self.guild_ids is not None and event.guild_id not in self.guild_ids:
+            return False
+
+        if self.channel_ids is not None and event.channel_id not in self.channel_ids:
+            return False
+
+        return self.predicate is None or self.predicate(event.d)
+
+
+@dataclass(frozen=True, slots=True)
+class _Route:
+    hooks: tuple[DispatchHook, ...]
+    callbacks: tuple[Callable[..., Any], ...]
+    filtered: bool
+
+
+_EMPTY = _Route((), (), False)
+
+
+class Router:
+    __slots__ = (
+        "_hooks",
+        "_table",
+        "_default",
+    )
+
+    def __init__(self) -> None:
+        """A routing table from events to their dispatch hooks.
+
+        The table is compiled when hooks are added, so routing an event is a single lookup, and events
+        are only decoded when a hook for them has filters to evaluate.
+        """
+
+        self._hooks: dict[str, list[DispatchHook]] = {}
+        self._table: dict[str, _Route] = {}
+        self._default = _EMPTY
+
+    def _compile(self) -> None:
+        wildcard = self._hooks.get("*", [])
+        table: dict[str, _Route] = {}
+
+        for event, hooks in self._hooks.items():
+            if event == "*":
+                continue
+
+            table[event] = self._route([*hooks, *wildcard])
+
+        self._table = table
+        self._default = self._route(wildcard)
+
+    @staticmethod
+    def _route(hooks: list[DispatchHook]) -> _Route:
+        if not hooks:
+            return _EMPTY
+
+        return _Route(tuple(hooks), tuple(hook.callback for hook in hooks), any(hook.filtered for hook in hooks))
+
+    def add(
+        self,
+        event: str,
+        hook: Callable[..., Any],
+        *,
+        guild_ids: Optional[Collection[int | str]] = None,
+        channel_ids: Optional[Collection[int | str]] = None,
+        predicate: Optional[Callable[[Any], bool]] = None,
+    ) -> None:
+        """Add a dispatch hook.
+
+        Args:
+            event (str): The event to route to the hook, or "*" for all events.
+            hook (Callable[..., Any]): The callback.
+            guild_ids (Optional[Collection[int | str]], optional): Only route events for these guilds. Defaults to None.
+            channel_ids (Optional[Collection[int | str]], optional): Only route events for these channels. Defaults to None.
+            predicate (Optional[Callable[[Any], bool]], optional): Only route events whose `d` it returns True for.\
+                Defaults to None.
+        """
+
+        entry = DispatchHook(
+            hook,
+            frozenset(map(str, guild_ids)) if guild_ids is not None else None,
+            frozenset(map(str, channel_ids)) if channel_ids is not None else None,
+            predicate,
+        )
+
+        self._hooks.setdefault(event.upper(), []).append(entry)
+        self._compile()
+
+    def wants(self, event: Optional[str]) -> bool:
+        """Check whether any hook may want an event, without decoding it.
+
+        Args:
+            event (Optional[str]): The event's type.
+
+        Returns:
+            bool: Whether any hook is routed the event type.
+        """
+
+        return bool(self._table.get(event or "", self._default).hooks)
+
+    def route(self, event: GatewayEvent) -> Sequence[Callable[..., Any]]:
+        """Get the callbacks an event should be dispatched to.
+
+        Args:
+            event (GatewayEvent): The event to route.
+
+        Returns:
+            Sequence[Callable[..., Any]]: The callbacks, in the order their hooks were added.
+        """
+
+        route = self._table.get(event.t or f"OP_{event.op}", self._default)
+
+        if not route.filtered:
+            return route.callbacks
+
+        return [hook.callback for hook in route.hooks if not hook.filtered or self._matches(hook, event)]
+
+    @staticmethod
+    def _matches(hook: DispatchHook, event: GatewayEvent) -> bool:
+        try:
+            return hook.matches(event)
+        except Exception as e:
+            # A predicate which raises is reported like a callback which raises, and its hook is skipped.
+            _report(e)
+            return False
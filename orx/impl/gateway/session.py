@@ -0,0 +1,113 @@
+from asyncio import to_thread
+from os import replace
+from pathlib import Path
+from typing import Any, Optional, cast
+
+from orx.impl.codec import DEFAULT_CODEC, JSONCodec
+from orx.proto.gateway import SessionSnapshot
+
+
+class MemorySessionStore:
+    __slots__ = ("_snapshots",)
+
+    def __init__(self) -> None:
+        """A session store which keeps snapshots in memory, for reusing sessions within a process."""
+
+        self._snapshots: dict[int, SessionSnapshot] = {}
+
+    async def load(self) -> dict[int, SessionSnapshot]:
+        """Load the saved session snapshots.
+
+        Returns:
+            dict[int, SessionSnapshot]: The snapshots, keyed by shard ID.
+        """
+
+        return dict(self._snapshots)
+
+    async def save(self, snapshots: dict[int, SessionSnapshot]) -> None:
+        """Replace the saved session snapshots.
+
+        Args:
+            snapshots (dict[int, SessionSnapshot]): The snapshots, keyed by shard ID.
+        """
+
+        self._snapshots = dict(snapshots)
+
+
+def _valid(snapshot: Any) -> bool:
+    if not isinstance(snapshot, dict):
+        return False
+
+    fields = cast(dict[str, Any], snapshot)
+
+    return (
+        isinstance(fields.get("session_id"), str)
+        and isinstance(fields.get("sequence"), int)
+        and isinstance(fields.get("resume_url"), (str, type(None)))
+        and isinstance(fields.get("shard_count"), int)
+    )
+
+
+class FileSessionStore:
+    __slots__ = (
+        "_path",
+        "_codec",
+    )
+
+    def __init__(self, path: str | Path, *, codec: Optional[JSONCodec] = None) -> None:
+        """A session store which keeps snapshots in a JSON file, for resuming sessions across restarts.
+
+        Each process should use its own file, as saving replaces the whole file.
+
+        Args:
+            path (str | Path): The path of the file.
+            codec (Optional[JSONCodec], optional): The JSON codec to use. Defaults to the fastest one installed.
+        """
+
+        self._path = Path(path)
+        self._codec = codec or DEFAULT_CODEC
+
+    def _read(self) -> dict[int, SessionSnapshot]:
+        try:
+            raw = self._path.read_bytes()
+        except FileNotFoundError:
+            return {}
+
+        # A corrupt or malformed snapshot only costs an identify, so it is treated as missing.
+        try:
+            data = self._codec.loads(raw)
+        except Exception:
+            return {}
+
+        if not isinstance(data, dict) or not all(
+            isinstance(shard_id, str) and shard_id.isdigit() and _valid(snapshot)
+            for shard_id, snapshot in data.items()  # type: ignore
+        ):
+            return {}
+
+        return {int(shard_id): snapshot for shard_id, snapshot in data.items()}  # type: ignore
+
+    def _write(self, snapshots: dict[int, SessionSnapshot]) -> None:
+        temp = self._path.with_name(self._path.name + ".tmp")
+        temp.write_text(self._codec.dumps({str(shard_id): snapshot for shard_id, snapshot in snapshots.items()}))
+
+        # Replacing the file is atomic, so a crash while saving never leaves a partial file behind.
+        replace(temp, self._path)
+
+    async def load(self) -> dict[int, SessionSnapshot]:
+        """Load the saved session snapshots.
+
+        Returns:
+            dict[int, SessionSnapshot]: The snapshots, keyed by shard ID. Empty if the file is missing or invalid.
+        """
+
+        return await to_thread(self._read)
+
+    async def save(self, snapshots: dict[int, SessionSnapshot]) -> None:
+        """Replace the saved session snapshots.
+
+        Args:
+            snapshots (dict[int, SessionSnapshot]): The snapshots, keyed by shard ID.
+        """
+
+        await to_thread(self._write, snapshots)
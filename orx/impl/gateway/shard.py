@@ -1,9 +1,21 @@
-from asyncio import Event, Task, create_task, sleep
-from random import randrange
+from asyncio import (
+    CancelledError,
+    Event,
+    Queue,
+    Task,
+    TimeoutError,
+    create_task,
+    sleep,
+    wait_for,
+)
+from itertools import count
+from random import uniform
+from re import compile
 from time import time
-from typing import Any, Callable, Coroutine, Optional, Type, cast
+from typing import Any, AsyncIterator, Final, Literal, Optional, Type, cast
+from zlib import decompressobj
 
-from aiohttp import ClientWebSocketResponse, WSMsgType
+from aiohttp import ClientError, ClientWebSocketResponse, WSMsgType
 from discord_typings.gateway import GatewayEvent as GatewayEventType
 from discord_typings.gateway import (
     HeartbeatCommand,
@@ -11,16 +23,30 @@ from discord_typings.gateway import (
     IdentifyCommand,
     IdentifyConnectionProperties,
     IdentifyData,
+    InvalidSessionEvent,
+    ReadyEvent,
+    RequestGuildMembersCommand,
     ResumeCommand,
     ResumeData,
 )
 
+from orx.impl.codec import DEFAULT_CODEC, JSONCodec
 from orx.impl.errors import GatewayCriticalError, GatewayReconnect
-from orx.proto.gateway import Command, GatewayRatelimiterProto
+from orx.proto.gateway import (
+    Command,
+    DispatcherProto,
+    GatewayRatelimiterProto,
+    IdentifyRatelimiterProto,
+    RouterProto,
+    SessionSnapshot,
+)
 from orx.proto.http import HTTPClientProto
 
+from . import etf
+from .dispatcher import Dispatcher
 from .enums import GatewayCloseCodes, GatewayOps
 from .event import GatewayEvent
+from .router import Router
 
 CRITICAL = [
     GatewayCloseCodes.NOT_AUTHENTICATED,
@@ -28,6 +54,8 @@ CRITICAL = [
     GatewayCloseCodes.INVALID_API_VERSION,
     GatewayCloseCodes.INVALID_INTENTS,
     GatewayCloseCodes.DISALLOWED_INTENTS,
+    GatewayCloseCodes.INVALID_SHARD,
+    GatewayCloseCodes.SHARDING_REQUIRED,
 ]
 
 NONCRITICAL = [
@@ -36,25 +64,57 @@ NONCRITICAL = [
     GatewayCloseCodes.SESSION_TIMEOUT,
 ]
 
+# Reconnect delays back off exponentially from RECONNECT_BASE up to RECONNECT_MAX seconds,
+# with full jitter so that shards dropped together do not reconnect together.
+RECONNECT_BASE: Final[float] = 1
+RECONNECT_MAX: Final[float] = 60
+
+# Closing with 1000 or 1001 invalidates the session, so connections which should be resumed close with this.
+RESUMABLE_CLOSE: Final[int] = 4000
+
+ZLIB_SUFFIX: Final[bytes] = b"\x00\x00\xff\xff"
+
+# Discord serialises dispatch envelopes in this order, with `d` last, which lets
+# lazy decoding read the envelope without parsing the body.
+ENVELOPE = compile(r'\{"t":"([A-Z0-9_]+)","s":(\d+),"op":0,"d":')
+ENVELOPE_BYTES = compile(rb'\{"t":"([A-Z0-9_]+)","s":(\d+),"op":0,"d":')
+
+# Dispatches the shard itself needs to read, so they are always decoded eagerly.
+EAGER_DISPATCHES: Final[frozenset[str]] = frozenset({"READY", "RESUMED"})
+
 
 class Shard:
     __slots__ = (
-        "callbacks",
+        "router",
         "id",
         "latency",
         "ready",
+        "identified",
         "_count",
         "_http",
         "_token",
         "_intents",
         "_ratelimiter",
+        "_identify_ratelimiter",
         "_session",
         "_sequence",
+        "_resume_url",
         "_socket",
         "_pacemaker",
         "_last_hb",
         "_last_ack",
         "_closing",
+        "_identify_wait",
+        "_compress",
+        "_inflator",
+        "_buffer",
+        "_codec",
+        "_etf",
+        "_lazy",
+        "_dispatcher",
+        "_owns_dispatcher",
+        "_nonces",
+        "_chunk_requests",
     )
 
     def __init__(
@@ -64,6 +124,14 @@ class Shard:
         token: str,
         intents: int,
         ratelimiter_cls: Type[GatewayRatelimiterProto],
+        *,
+        compress: bool = False,
+        codec: Optional[JSONCodec] = None,
+        encoding: Literal["json", "etf"] = "json",
+        lazy: bool = False,
+        identify_ratelimiter: Optional[IdentifyRatelimiterProto] = None,
+        dispatcher: Optional[DispatcherProto] = None,
+        router: Optional[RouterProto] = None,
     ) -> None:
         """A Discord gateay shard representation.
 
@@ -73,22 +141,43 @@ class Shard:
             token (str): The token to connect with.
             intents (int): The intents to connect with.
             ratelimiter_cls (Type[GatewayRatelimiterProto]): The gateway ratelimiter class.
+            compress (bool, optional): Whether to use zlib-stream transport compression. Defaults to False.
+            codec (Optional[JSONCodec], optional): The JSON codec to use. Defaults to the fastest one installed.
+            encoding (Literal["json", "etf"], optional): The gateway payload encoding. Defaults to "json".
+            lazy (bool, optional): Whether to only decode the body of JSON dispatches when it is accessed,\
+                dropping dispatches without callbacks undecoded. Defaults to False.
+            identify_ratelimiter (Optional[IdentifyRatelimiterProto], optional): The ratelimiter to wait on before\
+                each identify, shared with the other shards. Defaults to None.
+            dispatcher (Optional[DispatcherProto], optional): The dispatcher to run callbacks on, which may be shared\
+                with other shards. Defaults to a Dispatcher owned by the shard.
+            router (Optional[RouterProto], optional): The routing table of dispatch hooks, which may be shared with\
+                other shards. Defaults to an empty Router.
+
+        Raises:
+            ValueError: An unsupported encoding was given.
         """
 
+        if encoding not in ("json", "etf"):
+            raise ValueError(f"Unsupported gateway encoding {encoding!r}")
+
         self.id = id
-        self.callbacks: dict[str, list[Callable[..., Coroutine[Any, Any, None]]]] = {}
+        self.router = router or Router()
 
         self.ready = Event()
         self.ready.clear()
 
+        self.identified = Event()
+
         self._count = shard_count
         self._token = token
         self._intents = intents
 
         self._ratelimiter = ratelimiter_cls(120, 60)
+        self._identify_ratelimiter = identify_ratelimiter
 
         self._session: Optional[str] = None
         self._sequence: Optional[int] = None
+        self._resume_url: Optional[str] = None
 
         self._socket: Optional[ClientWebSocketResponse] = None
 
@@ -97,12 +186,31 @@ class Shard:
         self._last_ack: Optional[float] = None
 
         self._closing: bool = False
+        self._identify_wait: Optional[Task[None]] = None
+
+        self._compress = compress
+        self._inflator = decompressobj()
+        self._buffer = bytearray()
+
+        self._codec = codec or DEFAULT_CODEC
+        self._etf = encoding == "etf"
+        self._lazy = lazy
+
+        self._dispatcher = dispatcher or Dispatcher()
+        self._owns_dispatcher = dispatcher is None
+
+        self._nonces = count()
+        self._chunk_requests: dict[str, Queue[dict[str, Any]]] = {}
 
         self.latency: Optional[float] = None
 
     def __repr__(self) -> str:
         return f"<Shard id={self.id} seq={self._sequence}>"
 
+    @property
+    def _can_resume(self) -> bool:
+        return bool(self._session and self._sequence)
+
     async def _resume(self) -> None:
         if not (self._session and self._sequence):
             raise RuntimeError("Cannot resume shard with no session or sequence.")
@@ -138,6 +246,9 @@ class Shard:
         )
 
     def _task_error(self, task: Task[None]) -> None:
+        if task.cancelled():
+            return
+
         exc = task.exception()
 
         if not exc:
@@ -145,35 +256,47 @@ class Shard:
 
         raise exc
 
-    def _callback(self, event: GatewayEvent) -> None:
-        for callback in self.callbacks.get(event.dispatch_name, []):
-            task = create_task(callback(event))
-            task.add_done_callback(self._task_error)
+    async def _callback(self, event: GatewayEvent) -> None:
+        if callbacks := self.router.route(event):
+            await self._dispatcher.dispatch(callbacks, event)
 
-        for callback in self.callbacks.get("*", []):
-            task = create_task(callback(event))
-            task.add_done_callback(self._task_error)
-
-    async def _dispatch(self, data: GatewayEventType) -> None:
-        event = GatewayEvent(self, data["op"], data, data.get("s"), data.get("t"))
-
-        try:
-            self._callback(event)
-        except Exception as e:
-            print(f"Error in callback: {e}")
+    async def _dispatch(self, event: GatewayEvent) -> None:
+        await self._callback(event)
 
         if event.op == GatewayOps.HELLO:
             data = cast(HelloEvent, event.data)
-            self._pacemaker = create_task(self._heartbeat(data["d"]["heartbeat_interval"]))
+            self._pacemaker = create_task(self._heartbeat(data["d"]["heartbeat_interval"] / 1000))
             self._pacemaker.add_done_callback(self._task_error)
-            await self._identify()
+
+            if self._can_resume:
+                await self._resume()
+            else:
+                await self._identify()
+
+            self.identified.set()
         elif event.op == GatewayOps.ACK:
             self._last_ack = time()
         elif event.op == GatewayOps.RECONNECT:
-            await self.close()
+            await self._disconnect()
+            raise GatewayReconnect()
+        elif event.op == GatewayOps.INVALID_SESSION:
+            if not cast(InvalidSessionEvent, event.data)["d"]:
+                self._session = None
+                self._sequence = None
+                self._resume_url = None
+
+            await self._disconnect()
             raise GatewayReconnect()
         elif event.t == "READY":
+            ready: dict[str, Any] = cast(ReadyEvent, event.data)["d"]  # type: ignore
+            self._session = ready["session_id"]
+            self._resume_url = ready.get("resume_gateway_url")
             self.ready.set()
+        elif event.t == "RESUMED":
+            self.ready.set()
+        elif event.t == "GUILD_MEMBERS_CHUNK" and self._chunk_requests:
+            if queue := self._chunk_requests.get(event.d.get("nonce")):
+                queue.put_nowait(event.d)
 
     async def _handle_disconnect(self, code: int) -> None:
         if code in CRITICAL:
@@ -182,41 +305,151 @@ class Shard:
         if code in NONCRITICAL:
             self._session = None
             self._sequence = None
+            self._resume_url = None
 
-        await self.close()
+        await self._disconnect()
 
         raise GatewayReconnect()
 
     async def _heartbeat(self, delay: float) -> None:
-        await sleep(randrange(0, int(delay)))
+        await sleep(uniform(0, delay))
 
         while not self._closing:
-            if self._last_ack and time() - self._last_ack >= delay:
-                return await self.close()
+            if self._last_hb and (not self._last_ack or self._last_ack < self._last_hb):
+                # The last heartbeat was never acknowledged, so the connection is a zombie.
+                return await self._disconnect()
+
+            try:
+                await self.send(HeartbeatCommand(op=1, d=self._sequence))
+            except GatewayReconnect:
+                return
 
-            await self.send(HeartbeatCommand(op=1, d=self._sequence))
             self._last_hb = time()
 
             await sleep(delay)
 
+    def _decode_lazy(self, payload: str | bytes) -> Optional[GatewayEvent]:
+        if isinstance(payload, str):
+            match = ENVELOPE.match(payload)
+            end = payload.endswith("}")
+        else:
+            match = ENVELOPE_BYTES.match(payload)
+            end = payload.endswith(b"}")
+
+        if not (match and end):
+            return None
+
+        t = match.group(1)
+        t = t if isinstance(t, str) else t.decode()
+
+        if t in EAGER_DISPATCHES:
+            return None
+
+        return GatewayEvent(
+            self, GatewayOps.DISPATCH, None, int(match.group(2)), t, payload[match.end() : -1], self._codec.loads
+        )
+
+    def _decode(self, payload: str | bytes) -> GatewayEvent:
+        if self._etf:
+            data: GatewayEventType = etf.loads(payload)  # type: ignore
+        else:
+            if self._lazy and (event := self._decode_lazy(payload)):
+                return event
+
+            data = self._codec.loads(payload)
+
+        return GatewayEvent(self, data["op"], data, data.get("s"), data.get("t"))
+
+    def _wants_chunk(self, event: GatewayEvent) -> bool:
+        return event.t == "GUILD_MEMBERS_CHUNK" and bool(self._chunk_requests)
+
     async def _read(self) -> None:
-        if not self._socket or self._socket.closed:
+        if not self._socket:
             raise RuntimeError("Shard is not connected")
 
+        if self._socket.closed:
+            raise GatewayReconnect()
+
         async for message in self._socket:
             if message.type == WSMsgType.TEXT:  # type: ignore
-                data: GatewayEventType = message.json()
+                payload = message.data
+            elif message.type == WSMsgType.BINARY:  # type: ignore
+                if self._compress:
+                    self._buffer.extend(message.data)
+
+                    # With zlib-stream a payload may span several frames, and is only
+                    # complete once the buffer ends with the Z_SYNC_FLUSH suffix.
+                    if not self._buffer.endswith(ZLIB_SUFFIX):
+                        continue
+
+                    payload = self._inflator.decompress(self._buffer)
+                    self._buffer.clear()
+                else:
+                    payload = message.data
+            else:
+                continue
+
+            event = self._decode(payload)
 
-                if sequence := data.get("s"):
-                    if (not self._sequence) or self._sequence < sequence:
-                        self._sequence = sequence
+            if sequence := event.s:
+                if (not self._sequence) or self._sequence < sequence:
+                    self._sequence = sequence
 
-                await self._dispatch(data)
+            if event.data is None and not self.router.wants(event.t) and not self._wants_chunk(event):
+                # Nothing listens for this lazily decoded dispatch, so its body is never parsed.
+                continue
+
+            await self._dispatch(event)
 
         await self._handle_disconnect(self._socket.close_code or 1000)
 
+    async def _connect(self, url: str, http: HTTPClientProto) -> None:
+        query = "?v=10&encoding=etf" if self._etf else "?v=10&encoding=json"
+
+        if self._compress:
+            # The zlib context spans the whole connection, so every new connection needs a fresh one.
+            self._inflator = decompressobj()
+            self._buffer.clear()
+            query += "&compress=zlib-stream"
+
+        self._last_hb = None
+        self._last_ack = None
+        self.ready.clear()
+
+        if not self._can_resume and self._identify_ratelimiter:
+            # The identify slot is waited for before connecting, since the gateway times out
+            # connections which wait in the read loop without heartbeating.
+            self._identify_wait = create_task(self._identify_ratelimiter.acquire(self.id))
+
+            try:
+                await self._identify_wait
+            except CancelledError:
+                # close() cancels the wait, so that a closed shard does not connect once its slot comes up.
+                if not self._closing:
+                    raise
+                return
+            finally:
+                self._identify_wait = None
+
+        if self._closing:
+            return
+
+        self._socket = await http.spawn_websocket(url + query)
+
+        if self._closing:
+            # The shard was closed while the connection opened, and nothing has been sent on it yet.
+            await self._disconnect()
+            return
+
+        try:
+            await self._read()
+        except GatewayReconnect:
+            pass
+
     async def connect(self, url: str, http: HTTPClientProto) -> None:
-        """Connect to the gateway.
+        """Connect to the gateway, reconnecting until the shard is closed.
+
+        Reconnects resume the session on its resume_gateway_url where there is one, and identify otherwise.
 
         Args:
             url (str): The URL to connect to.
@@ -224,35 +457,137 @@ class Shard:
 
         Raises:
             RuntimeError: The shard is already connected.
+            GatewayCriticalError: The gateway closed the connection with a code that cannot be reconnected from.
         """
 
         if self._socket and not self._socket.closed:
             raise RuntimeError("Shard is already connected")
 
-        self._socket = await http.spawn_websocket(url + "?v=10")
-
-        if self._session:
-            await self._resume()
+        self._closing = False
+        failures = 0
 
-        try:
-            await self._read()
-        except GatewayReconnect:
-            pass
+        while not self._closing:
+            try:
+                await self._connect(self._resume_url if self._session and self._resume_url else url, http)
+            except (ClientError, OSError, TimeoutError):
+                pass
 
-        if self._closing:
-            return
+            if self._closing:
+                break
 
-    async def close(self) -> None:
-        """Close the shard's connection to the gateway."""
+            failures = 0 if self.ready.is_set() else failures + 1
 
-        self._closing = True
+            await sleep(uniform(0, min(RECONNECT_MAX, RECONNECT_BASE * 2**failures)))
 
+    async def _disconnect(self, code: int = RESUMABLE_CLOSE) -> None:
         if self._socket and not self._socket.closed:
-            await self._socket.close()
+            await self._socket.close(code=code)
 
-        if self._pacemaker and not self._pacemaker.cancelled():
+        if self._pacemaker and not self._pacemaker.done():
             self._pacemaker.cancel()
 
+    async def close(self, *, resumable: bool = False) -> None:
+        """Close the shard's connection to the gateway.
+
+        Args:
+            resumable (bool, optional): Whether to keep the session resumable, for resuming from a snapshot\
+                after a restart. Defaults to False.
+        """
+
+        self._closing = True
+
+        if self._identify_wait:
+            self._identify_wait.cancel()
+
+        await self._disconnect(RESUMABLE_CLOSE if resumable else 1000)
+
+        if self._owns_dispatcher:
+            await self._dispatcher.close()
+
+    def snapshot(self) -> Optional[SessionSnapshot]:
+        """Get the state needed to resume the shard's session.
+
+        Returns:
+            Optional[SessionSnapshot]: The snapshot, or None if there is no session to resume.
+        """
+
+        if not (self._session and self._sequence):
+            return None
+
+        return SessionSnapshot(
+            session_id=self._session,
+            sequence=self._sequence,
+            resume_url=self._resume_url,
+            shard_count=self._count,
+        )
+
+    def restore(self, snapshot: SessionSnapshot) -> None:
+        """Restore a session snapshot, so that the next connection resumes it instead of identifying.
+
+        Args:
+            snapshot (SessionSnapshot): The snapshot to restore.
+        """
+
+        self._session = snapshot["session_id"]
+        self._sequence = snapshot["sequence"]
+        self._resume_url = snapshot["resume_url"]
+
+    async def request_members(
+        self,
+        guild_id: int | str,
+        *,
+        query: str = "",
+        limit: int = 0,
+        user_ids: Optional[list[int | str]] = None,
+        timeout: float = 30,
+    ) -> AsyncIterator[Any]:
+        """Request a guild's members, yielding them as their GUILD_MEMBERS_CHUNK events arrive.
+
+        The request is sent through the shard's gateway ratelimiter, and its chunks are matched by nonce.
+
+        Args:
+            guild_id (int | str): The ID of the guild, which must be on this shard.
+            query (str, optional): Only request members whose username starts with this. Defaults to "", for all members.
+            limit (int, optional): The maximum number of members to request. Defaults to 0, for no limit.
+            user_ids (Optional[list[int | str]], optional): Request these members instead of querying. Defaults to None.
+            timeout (float, optional): How long to wait for each chunk. Defaults to 30.
+
+        Raises:
+            TimeoutError: A chunk did not arrive in time.
+
+        Yields:
+            Any: The guild member objects.
+        """
+
+        nonce = f"{self.id}:{next(self._nonces)}"
+        queue: Queue[dict[str, Any]] = Queue()
+
+        self._chunk_requests[nonce] = queue
+
+        data: dict[str, Any] = {"guild_id": str(guild_id), "limit": limit, "nonce": nonce}
+
+        if user_ids is not None:
+            data["user_ids"] = [str(user_id) for user_id in user_ids]
+        else:
+            data["query"] = query
+
+        try:
+            await self.send(RequestGuildMembersCommand(op=GatewayOps.REQUEST_GUILD_MEMBERS, d=data))  # type: ignore
+
+            received = 0
+
+            while True:
+                chunk = await wait_for(queue.get(), timeout)
+                received += 1
+
+                for member in chunk["members"]:
+                    yield member
+
+                if received >= chunk["chunk_count"]:
+                    return
+        finally:
+            del self._chunk_requests[nonce]
+
     async def send(self, data: Command) -> None:
         """Send a command to the gateway.
 
@@ -260,18 +595,25 @@ class Shard:
             data (Command): The command data to send.
 
         Raises:
-            RuntimeError: The shard is not connected to the gateway.
+            RuntimeError: The shard has not connected to the gateway.
+            GatewayReconnect: The connection has closed, and the shard will reconnect.
         """
 
-        if not self._socket or self._socket.closed:
+        if not self._socket:
             raise RuntimeError("Shard is not connected")
 
+        if self._socket.closed:
+            raise GatewayReconnect()
+
         await self._ratelimiter.acquire()
 
         try:
-            await self._socket.send_json(data)
+            if self._etf:
+                await self._socket.send_bytes(etf.dumps(data))
+            else:
+                await self._socket.send_str(self._codec.dumps(data))
         except OSError:
-            await self.close()
+            await self._disconnect()
         except Exception:
-            await self.close()
+            await self._disconnect()
             raise
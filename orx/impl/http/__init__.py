@@ -1,9 +1,20 @@
+from .cache import CachedResponse, ResponseCache
 from .client import HTTPClient
+from .distributed import DistributedRatelimiter, MemoryStore, RedisStore
 from .file import File
+from .h2 import H2Transport
 from .route import Route
+from .transport import AiohttpTransport
 
 __all__ = (
     "HTTPClient",
     "Route",
     "File",
+    "AiohttpTransport",
+    "H2Transport",
+    "ResponseCache",
+    "CachedResponse",
+    "DistributedRatelimiter",
+    "RedisStore",
+    "MemoryStore",
 )
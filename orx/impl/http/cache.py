@@ -0,0 +1,178 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import monotonic
+from typing import Mapping, Optional
+
+from orx.proto.http import RouteProto
+
+_Key = tuple[str, tuple[tuple[str, str | int], ...]]
+
+
+@dataclass(slots=True)
+class CachedResponse:
+    body: bytes
+    etag: Optional[str]
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return monotonic() < self.expires_at
+
+
+class ResponseCache:
+    __slots__ = (
+        "_ttls",
+        "_default_ttl",
+        "_max_size",
+        "_entries",
+        "_urls",
+        "_generation",
+        "_invalidated",
+        "_floor",
+    )
+
+    def __init__(
+        self, ttls: Optional[Mapping[str, float]] = None, *, default_ttl: float = 0, max_size: int = 1024
+    ) -> None:
+        """An LRU cache of GET response bodies, keyed by URL and query parameters.
+
+        Each route's TTL is looked up by its path, such as "/guilds/{guild_id}/roles", and routes with no TTL are
+        not cached. Expired entries with an ETag are kept so that they can be revalidated with If-None-Match.
+
+        Args:
+            ttls (Optional[Mapping[str, float]], optional): How long to cache responses for, by route path. Defaults to {}.
+            default_ttl (float, optional): How long to cache responses for on routes not in ttls. Defaults to 0.
+            max_size (int, optional): The maximum number of responses to cache. Defaults to 1024.
+        """
+
+        self._ttls = ttls or {}
+        self._default_ttl = default_ttl
+        self._max_size = max_size
+
+        self._entries: OrderedDict[_Key, CachedResponse] = OrderedDict()
+        self._urls: dict[str, set[_Key]] = {}
+
+        # The generation each recently invalidated URL was last invalidated at. Older URLs are forgotten,
+        # and treated as invalidated at the newest generation forgotten so far.
+        self._generation = 0
+        self._invalidated: OrderedDict[str, int] = OrderedDict()
+        self._floor = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(route: RouteProto, query_params: dict[str, str | int]) -> _Key:
+        return route.url, tuple(sorted(query_params.items()))
+
+    def _pop(self, key: _Key) -> None:
+        self._entries.pop(key, None)
+
+        if keys := self._urls.get(key[0]):
+            keys.discard(key)
+
+            if not keys:
+                del self._urls[key[0]]
+
+    def get(self, route: RouteProto, query_params: dict[str, str | int]) -> Optional[CachedResponse]:
+        """Get a cached response. Expired responses are only returned if they can be revalidated.
+
+        Args:
+            route (RouteProto): The route requested.
+            query_params (dict[str, str | int]): The query parameters requested.
+
+        Returns:
+            Optional[CachedResponse]: The cached response, or None if it is not cached.
+        """
+
+        key = self._key(route, query_params)
+
+        if not (entry := self._entries.get(key)):
+            return None
+
+        if not entry.fresh and not entry.etag:
+            self._pop(key)
+            return None
+
+        self._entries.move_to_end(key)
+
+        return entry
+
+    def generation(self) -> int:
+        """Get the current invalidation generation, to pass to set() for a request made now.
+
+        Returns:
+            int: The generation.
+        """
+
+        return self._generation
+
+    def set(
+        self,
+        route: RouteProto,
+        query_params: dict[str, str | int],
+        body: bytes,
+        etag: Optional[str],
+        generation: Optional[int] = None,
+    ) -> None:
+        """Cache a response, if its route has a TTL.
+
+        Args:
+            route (RouteProto): The route requested.
+            query_params (dict[str, str | int]): The query parameters requested.
+            body (bytes): The response body.
+            etag (Optional[str]): The response's ETag, if it had one.
+            generation (Optional[int], optional): The generation from before the request was made. If the URL has\
+                been invalidated since, the response may be stale and is not cached. Defaults to None.
+        """
+
+        ttl = self._ttls.get(route.path, self._default_ttl)
+
+        if ttl <= 0:
+            return
+
+        if generation is not None and max(self._invalidated.get(route.url, 0), self._floor) > generation:
+            return
+
+        key = self._key(route, query_params)
+
+        self._entries[key] = CachedResponse(body, etag, monotonic() + ttl)
+        self._entries.move_to_end(key)
+        self._urls.setdefault(key[0], set()).add(key)
+
+        while len(self._entries) > self._max_size:
+            self._pop(next(iter(self._entries)))
+
+    def invalidate(self, url: str) -> None:
+        """Remove the cached responses for a URL and the URLs above it.
+
+        A change to "/guilds/1/roles/2" invalidates "/guilds/1/roles/2", "/guilds/1/roles" and "/guilds/1",
+        with any query parameters.
+
+        Args:
+            url (str): The URL that was changed.
+        """
+
+        self._generation += 1
+
+        while url:
+            for key in list(self._urls.get(url, ())):
+                self._pop(key)
+
+            self._invalidated[url] = self._generation
+            self._invalidated.move_to_end(url)
+
+            url = url.rpartition("/")[0]
+
+        while len(self._invalidated) > self._max_size:
+            self._floor = max(self._floor, self._invalidated.popitem(last=False)[1])
+
+    def clear(self) -> None:
+        """Remove all cached responses."""
+
+        self._entries.clear()
+        self._urls.clear()
+
+        self._generation += 1
+        self._invalidated.clear()
+        self._floor = self._generation
@@ -1,11 +1,11 @@
-from asyncio import sleep
+from asyncio import Task, create_task, shield, sleep
 from collections import defaultdict
 from dataclasses import dataclass
-from json import dumps
-from typing import Any, Final, Mapping, Optional, Type
+from typing import Any, AsyncIterator, Final, Mapping, Optional, Type
 
-from aiohttp import ClientResponse, ClientSession, ClientWebSocketResponse, FormData
+from aiohttp import ClientSession, ClientWebSocketResponse, FormData, TCPConnector
 
+from orx.impl.codec import DEFAULT_CODEC, JSONCodec
 from orx.impl.errors import (
     BadGateway,
     BadRequest,
@@ -22,13 +22,21 @@ from orx.impl.errors import (
     UnprocessableEntity,
 )
 from orx.impl.types import UNSET, UnsetOr
-from orx.proto.http import RatelimiterProto, RouteProto
+from orx.proto.http import (
+    RatelimiterProto,
+    ResponseCacheProto,
+    ResponseProto,
+    RouteProto,
+    TransportProto,
+)
 
 from .file import File
 from .ratelimiter import Ratelimiter
+from .transport import AiohttpTransport
 
 API_URL: Final[str] = "https://discord.com/api/v10"
 MAX_RETRIES: Final[int] = 3
+CHUNK_SIZE: Final[int] = 64 * 1024
 
 
 @dataclass(slots=True)
@@ -44,6 +52,15 @@ class HTTPClient:
         "_default_headers",
         "_max_retries",
         "_ratelimiter",
+        "_codec",
+        "_limit",
+        "_limit_per_host",
+        "_keepalive_timeout",
+        "_dns_cache_ttl",
+        "_transport",
+        "_coalesce",
+        "_inflight",
+        "_cache",
         "__session",
     )
 
@@ -72,15 +89,40 @@ class HTTPClient:
         default_headers: Optional[dict[str, str]] = None,
         max_retries: Optional[int] = None,
         ratelimiter: Optional[RatelimiterProto] = None,
+        codec: Optional[JSONCodec] = None,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 30,
+        dns_cache_ttl: Optional[int] = 300,
+        transport: Optional[TransportProto] = None,
+        coalesce: bool = False,
+        cache: Optional[ResponseCacheProto] = None,
     ) -> None:
         """The default HTTP client implementation for Orx.
 
+        Requests are sent on a transport, which defaults to HTTP/1.1 on the client's aiohttp session. Its
+        connections are pooled by a TCPConnector configured from the connection arguments, and TCP_NODELAY
+        is always set on them by aiohttp. An H2Transport can be passed instead to multiplex requests over
+        a single HTTP/2 connection.
+
         Args:
             token (Optional[str], optional): Your bot token. Defaults to None.
             api_url (Optional[str], optional): The base URL to use for requests. Defaults to "https://discord.com/api/v10".
             default_headers (Optional[dict[str, str]], optional): The default headers to send on requests. Defaults to {}.
             max_retries (Optional[int], optional): The maximum number of retries per request. Defaults to 3.
             ratelimiter (Optional[RatelimiterProto], optional): The ratelimiter class to use for request. Defaults to orx.http.Ratelimiter.
+            codec (Optional[JSONCodec], optional): The JSON codec to use. Defaults to the fastest one installed.
+            limit (int, optional): The maximum number of open connections, or 0 for no limit. Defaults to 100.
+            limit_per_host (int, optional): The maximum number of open connections per host, or 0 for no limit. Defaults to 0.
+            keepalive_timeout (float, optional): How long to keep idle connections open for reuse. Defaults to 30.
+            dns_cache_ttl (Optional[int], optional): How long to cache DNS lookups for, or None to cache them forever.\
+                Defaults to 300.
+            transport (Optional[TransportProto], optional): The transport to send requests on.\
+                Defaults to an AiohttpTransport on the client's session.
+            coalesce (bool, optional): Whether request_json shares one in-flight request between concurrent identical\
+                GET requests by default. Defaults to False.
+            cache (Optional[ResponseCacheProto], optional): A cache for GET responses read with request_json.\
+                Successful requests with other methods invalidate it for their URL. Defaults to None.
         """
 
         self._token = token
@@ -88,6 +130,15 @@ class HTTPClient:
         self._default_headers = default_headers or {}
         self._max_retries = max_retries or 3
         self._ratelimiter = ratelimiter or Ratelimiter()
+        self._codec = codec or DEFAULT_CODEC
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._keepalive_timeout = keepalive_timeout
+        self._dns_cache_ttl = dns_cache_ttl
+        self._transport: TransportProto = transport or AiohttpTransport(lambda: self._session)
+        self._coalesce = coalesce
+        self._inflight: dict[tuple[Any, ...], Task[Any]] = {}
+        self._cache = cache
 
         self.__session: Optional[ClientSession] = None
 
@@ -100,12 +151,20 @@ class HTTPClient:
     @property
     def _session(self) -> ClientSession:
         if self.__session is None or self.__session.closed:
-            self.__session = ClientSession(headers=self._default_headers)
+            connector = TCPConnector(
+                limit=self._limit,
+                limit_per_host=self._limit_per_host,
+                keepalive_timeout=self._keepalive_timeout,
+                ttl_dns_cache=self._dns_cache_ttl,
+            )
+
+            self.__session = ClientSession(headers=self._default_headers, connector=connector)
 
         return self.__session
 
-    @staticmethod
-    def _prepare_data(attempt: int, files: UnsetOr[list[File]] = UNSET, json: UnsetOr[Any] = UNSET) -> _RequestData:
+    def _prepare_data(
+        self, attempt: int, files: UnsetOr[list[File]] = UNSET, json: UnsetOr[Any] = UNSET
+    ) -> _RequestData:
         if not files:
             return _RequestData(None, json)
 
@@ -117,13 +176,15 @@ class HTTPClient:
             data.add_field(f"file_{i}", file.fp, filename=file.filename)
 
         if json is not UNSET:
-            data.add_field("payload_json", dumps(json), content_type="application/json")
+            data.add_field("payload_json", self._codec.dumps(json), content_type="application/json")
 
         return _RequestData(data, UNSET)
 
     async def close(self) -> None:
         """Close the HTTP client."""
 
+        await self._transport.close()
+
         if self.__session and not self.__session.closed:
             await self.__session.close()
 
@@ -149,7 +210,8 @@ class HTTPClient:
         files: UnsetOr[list[File]] = UNSET,
         json: UnsetOr[Any] = UNSET,
         reason: Optional[str] = None,
-    ) -> ClientResponse:
+        priority: int = 0,
+    ) -> ResponseProto:
         """Make a request to the Discord API.
 
         Args:
@@ -160,18 +222,21 @@ class HTTPClient:
             files (UnsetOr[list[File]], optional): Files to send with the request. Defaults to UNSET.
             json (UnsetOr[Any], optional): JSON data to send with the request. Defaults to UNSET.
             reason (Optional[str], optional): An audit log reason for this request. Defaults to None.
+            priority (int, optional): The priority of the request while waiting on ratelimits; higher priorities are\
+                served first. Defaults to 0.
 
         Raises:
             TooManyRequests: A ratelimit was hit that could not be handled (Cloudflare limited).
             HTTPError: Another 4XX HTTP error was raised.
+            RequestShed: The request waited on ratelimits for longer than its priority's deadline.
             OrxError: After all retries the server still errored.
 
         Returns:
-            ClientResponse: The response from the API.
+            ResponseProto: The response from the API.
         """
 
         query_params = query_params or {}
-        headers = headers or {}
+        headers = {**self._default_headers, **(headers or {})}
         max_retries = max_retries or self._max_retries
 
         if self._token:
@@ -190,10 +255,11 @@ class HTTPClient:
             if data.data:
                 kwargs["data"] = data.data
             elif data.json is not UNSET:
-                kwargs["json"] = data.json
+                kwargs["data"] = self._codec.dumps(data.json)
+                headers["Content-Type"] = "application/json"
 
-            async with await self._ratelimiter.acquire(route.bucket) as bucket:
-                response = await self._session.request(
+            async with await self._ratelimiter.acquire(route, priority=priority) as bucket:
+                response = await self._transport.request(
                     route.method,
                     f"{self._api_url}{route.url}",
                     params=query_params,
@@ -201,14 +267,30 @@ class HTTPClient:
                     **kwargs,
                 )
 
-                rl_reset_after = float(response.headers.get("X-RateLimit-Reset-After", 0))
-                rl_bucket_remaining = int(response.headers.get("X-RateLimit-Remaining", 1))
+                if bucket_hash := response.headers.get("X-RateLimit-Bucket"):
+                    await self._ratelimiter.set_bucket_hash(route, bucket_hash)
+
+                if "X-RateLimit-Limit" in response.headers:
+                    await bucket.update(
+                        int(response.headers["X-RateLimit-Limit"]),
+                        int(response.headers.get("X-RateLimit-Remaining", 0)),
+                        float(response.headers.get("X-RateLimit-Reset-After", 0)),
+                    )
 
                 if 200 <= response.status < 300:
-                    if rl_bucket_remaining == 0:
-                        await bucket.defer(rl_reset_after)
+                    if self._cache is not None and route.method != "GET":
+                        self._cache.invalidate(route.url)
+
+                    return response
+
+                if response.status == 304 and "If-None-Match" in headers:
                     return response
 
+                if response.status >= 500:
+                    # The response is retried, so release its connection back to the pool now.
+                    response.release()
+                    continue
+
                 if response.status == 429:
                     if "Via" not in response.headers:
                         # When a request goes through Discord's servers, and thus Google's
@@ -218,7 +300,7 @@ class HTTPClient:
 
                         raise TooManyRequests(response)
 
-                    response_json: dict[str, Any] = await response.json()
+                    response_json: dict[str, Any] = await response.json(loads=self._codec.loads)
 
                     is_global = response_json.get("global", False)
                     retry_after = response_json["retry_after"]
@@ -227,7 +309,170 @@ class HTTPClient:
                         await self._ratelimiter.set_global_lock(retry_after)
                     else:
                         await bucket.defer(retry_after)
-                elif response.status < 500:
+                else:
+                    # Read the body so the connection is released, while keeping it available on the error.
+                    await response.read()
                     raise self._status_codes[response.status](response)
 
         raise OrxError(f"Failed to make request on route {route.method} {route.url} after {max_retries} attempts.")
+
+    async def _request_json(
+        self,
+        route: RouteProto,
+        query_params: Optional[dict[str, str | int]],
+        headers: Optional[dict[str, str]],
+        *,
+        max_retries: Optional[int],
+        files: UnsetOr[list[File]],
+        json: UnsetOr[Any],
+        reason: Optional[str],
+        priority: int,
+    ) -> Any:
+        cache = self._cache if route.method == "GET" else None
+        cached = cache.get(route, query_params or {}) if cache is not None else None
+
+        if cached and cached.fresh:
+            return self._codec.loads(cached.body) if cached.body else None
+
+        if cached and cached.etag:
+            headers = {**(headers or {}), "If-None-Match": cached.etag}
+
+        # A write to the route while this request is in flight may leave its response stale.
+        generation = cache.generation() if cache is not None else None
+
+        response = await self.request(
+            route,
+            query_params,
+            headers,
+            max_retries=max_retries,
+            files=files,
+            json=json,
+            reason=reason,
+            priority=priority,
+        )
+
+        try:
+            body = cached.body if cached and response.status == 304 else await response.read()
+        finally:
+            response.release()
+
+        if cache is not None:
+            etag = response.headers.get("ETag") or (cached.etag if cached and response.status == 304 else None)
+            cache.set(route, query_params or {}, body, etag, generation)
+
+        return self._codec.loads(body) if body else None
+
+    async def request_json(
+        self,
+        route: RouteProto,
+        query_params: Optional[dict[str, str | int]] = None,
+        headers: Optional[dict[str, str]] = None,
+        *,
+        max_retries: Optional[int] = None,
+        files: UnsetOr[list[File]] = UNSET,
+        json: UnsetOr[Any] = UNSET,
+        reason: Optional[str] = None,
+        coalesce: Optional[bool] = None,
+        priority: int = 0,
+    ) -> Any:
+        """Make a request to the Discord API and decode its JSON body with the client's codec.
+
+        The response is always released, so its connection goes back to the pool.
+
+        When coalescing, a GET request made while an identical one (same route, query parameters and headers)
+        is in flight waits for that request instead of sending its own, and receives the same decoded body.
+        The body is shared between callers, so it should not be mutated.
+
+        GET responses are served from the client's cache while they are fresh, and revalidated with
+        If-None-Match when they have expired but had an ETag.
+
+        Args:
+            route (RouteProto): The route to request.
+            query_params (Optional[dict[str, str  |  int]], optional): Query parameters to send with the request. Defaults to {}.
+            headers (Optional[dict[str, str]], optional): Headers to send with the request. Defaults to {}.
+            max_retries (Optional[int], optional): The maximum number of retries for this request. Defaults to the HTTP client default.
+            files (UnsetOr[list[File]], optional): Files to send with the request. Defaults to UNSET.
+            json (UnsetOr[Any], optional): JSON data to send with the request. Defaults to UNSET.
+            reason (Optional[str], optional): An audit log reason for this request. Defaults to None.
+            coalesce (Optional[bool], optional): Whether to coalesce this request with identical in-flight GET requests.\
+                Defaults to the HTTP client default.
+            priority (int, optional): The priority of the request while waiting on ratelimits. Defaults to 0.
+
+        Returns:
+            Any: The decoded body, or None if the response has no body.
+        """
+
+        if coalesce is None:
+            coalesce = self._coalesce
+
+        if not coalesce or route.method != "GET" or files or json is not UNSET:
+            return await self._request_json(
+                route,
+                query_params,
+                headers,
+                max_retries=max_retries,
+                files=files,
+                json=json,
+                reason=reason,
+                priority=priority,
+            )
+
+        key = (
+            route.method,
+            route.url,
+            tuple(sorted((query_params or {}).items())),
+            tuple(sorted((headers or {}).items())),
+            reason,
+        )
+
+        if (task := self._inflight.get(key)) is None:
+            task = self._inflight[key] = create_task(
+                self._request_json(
+                    route,
+                    query_params,
+                    headers,
+                    max_retries=max_retries,
+                    files=files,
+                    json=json,
+                    reason=reason,
+                    priority=priority,
+                )
+            )
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shielded so that one caller being cancelled does not cancel the request for the others.
+        return await shield(task)
+
+    async def iter_chunked(
+        self,
+        route: RouteProto,
+        query_params: Optional[dict[str, str | int]] = None,
+        headers: Optional[dict[str, str]] = None,
+        *,
+        chunk_size: int = CHUNK_SIZE,
+        max_retries: Optional[int] = None,
+        priority: int = 0,
+    ) -> AsyncIterator[bytes]:
+        """Make a request to the Discord API and stream its body, for large payloads such as attachments.
+
+        The response is released when iteration finishes or is stopped early.
+
+        Args:
+            route (RouteProto): The route to request.
+            query_params (Optional[dict[str, str  |  int]], optional): Query parameters to send with the request. Defaults to {}.
+            headers (Optional[dict[str, str]], optional): Headers to send with the request. Defaults to {}.
+            chunk_size (int, optional): The maximum size of each chunk. Defaults to 64KiB.
+            max_retries (Optional[int], optional): The maximum number of retries for this request. Defaults to the HTTP client default.
+            priority (int, optional): The priority of the request while waiting on ratelimits. Defaults to 0.
+
+        Yields:
+            bytes: The chunks of the body.
+        """
+
+        response = await self.request(route, query_params, headers, max_retries=max_retries, priority=priority)
+
+        try:
+            async for chunk in response.content.iter_chunked(chunk_size):
+                yield chunk
+        finally:
+            response.release()
@@ -0,0 +1,589 @@
+from asyncio import sleep
+from hashlib import sha1
+from time import monotonic
+from typing import Any, Final, Optional, Type
+
+from orx.proto.http import (
+    BucketProto,
+    RatelimitStoreProto,
+    RedisClientProto,
+    RouteProto,
+)
+
+STATE_TTL: Final[float] = 10
+POLL_INTERVAL: Final[float] = 0.05
+
+_NOW = """
+-- Writing after TIME needs effects replication, which is the default from Redis 5,
+-- and replicate_commands is not available in every Redis implementation.
+if redis.replicate_commands then
+    redis.replicate_commands()
+end
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+"""
+
+ACQUIRE_SCRIPT = (
+    _NOW
+    + """
+local locked = redis.call("PTTL", KEYS[3])
+if locked > 0 then
+    return locked
+end
+
+local state = redis.call("HMGET", KEYS[1], "limit", "remaining", "reset")
+local limit = tonumber(state[1]) or 1
+local remaining = tonumber(state[2]) or limit
+local reset = tonumber(state[3])
+
+if reset and reset <= now then
+    remaining = limit
+    reset = nil
+end
+
+if remaining <= 0 then
+    return reset and (reset - now) or tonumber(ARGV[4])
+end
+
+local rate = tonumber(ARGV[1])
+if rate > 0 then
+    local window = redis.call("HMGET", KEYS[2], "count", "reset")
+    local count = tonumber(window[1]) or 0
+    local window_reset = tonumber(window[2])
+
+    if not window_reset or window_reset <= now then
+        count = 0
+        window_reset = now + tonumber(ARGV[2])
+    end
+
+    if count >= rate then
+        return window_reset - now
+    end
+
+    redis.call("HSET", KEYS[2], "count", count + 1, "reset", window_reset)
+    redis.call("PEXPIREAT", KEYS[2], window_reset)
+end
+
+redis.call("HSET", KEYS[1], "limit", limit, "remaining", remaining - 1)
+redis.call("HINCRBY", KEYS[1], "holders", 1)
+if reset then
+    redis.call("PEXPIREAT", KEYS[1], reset + tonumber(ARGV[3]))
+else
+    redis.call("HDEL", KEYS[1], "reset")
+    redis.call("PEXPIRE", KEYS[1], ARGV[3])
+end
+
+return 0
+"""
+)
+
+RELEASE_SCRIPT = """
+local state = redis.call("HMGET", KEYS[1], "limit", "remaining", "reset", "holders")
+if not state[2] then
+    return 0
+end
+
+redis.call("HSET", KEYS[1], "holders", math.max((tonumber(state[4]) or 0) - 1, 0))
+
+if not state[3] then
+    redis.call("HSET", KEYS[1], "remaining", math.min(tonumber(state[2]) + 1, tonumber(state[1]) or 1))
+end
+return 0
+"""
+
+UPDATE_SCRIPT = (
+    _NOW
+    + """
+local state = redis.call("HMGET", KEYS[1], "limit", "remaining", "reset", "holders")
+local remaining = tonumber(ARGV[2])
+local current = tonumber(state[2])
+local reset = tonumber(state[3])
+
+if reset and reset <= now then
+    current = tonumber(state[1]) or current
+    reset = nil
+end
+
+-- A new window's count is only trusted while no other request is in flight, since the
+-- server may already have counted requests whose responses have not arrived yet.
+if current and (reset or (tonumber(state[4]) or 0) > 1) then
+    remaining = math.min(current, remaining)
+end
+
+reset = now + tonumber(ARGV[3])
+redis.call("HSET", KEYS[1], "limit", ARGV[1], "remaining", remaining, "reset", reset)
+redis.call("PEXPIREAT", KEYS[1], reset + tonumber(ARGV[4]))
+return 0
+"""
+)
+
+DEFER_SCRIPT = (
+    _NOW
+    + """
+local reset = now + tonumber(ARGV[1])
+redis.call("HSET", KEYS[1], "remaining", 0, "reset", reset)
+redis.call("PEXPIREAT", KEYS[1], reset + tonumber(ARGV[2]))
+return 0
+"""
+)
+
+LOCK_SCRIPT = """
+redis.call("SET", KEYS[1], "1", "PX", ARGV[1])
+return 0
+"""
+
+
+def _ms(seconds: float) -> int:
+    return max(int(seconds * 1000), 1)
+
+
+class RedisStore:
+    __slots__ = (
+        "_redis",
+        "_prefix",
+        "_state_ttl",
+        "_poll_interval",
+        "_loaded",
+    )
+
+    def __init__(
+        self,
+        redis: RedisClientProto,
+        *,
+        prefix: str = "orx:ratelimit",
+        state_ttl: float = STATE_TTL,
+        poll_interval: float = POLL_INTERVAL,
+    ) -> None:
+        """A ratelimit store backed by Redis, shared by every process using the same token.
+
+        Each operation is a single Lua script run atomically on the server, using the
+        server's clock so that processes do not need synchronised clocks.
+
+        Args:
+            redis (RedisClientProto): An async Redis client, such as redis.asyncio.Redis.
+            prefix (str, optional): The prefix for all keys. Defaults to "orx:ratelimit".
+            state_ttl (float, optional): How long bucket state is kept after its window ends. Defaults to 10.
+            poll_interval (float, optional): How often to retry a bucket whose reset is not yet known. Defaults to 0.05.
+        """
+
+        self._redis = redis
+        self._prefix = prefix
+        self._state_ttl = state_ttl
+        self._poll_interval = poll_interval
+
+        self._loaded: set[str] = set()
+
+    async def _run(self, script: str, keys: list[str], *args: Any) -> Any:
+        digest = sha1(script.encode()).hexdigest()
+
+        if digest in self._loaded:
+            try:
+                return await self._redis.evalsha(digest, len(keys), *keys, *args)
+            except Exception as e:
+                if "NOSCRIPT" not in str(e):
+                    raise
+
+        result = await self._redis.eval(script, len(keys), *keys, *args)
+        self._loaded.add(digest)
+
+        return result
+
+    async def acquire(self, bucket: str, global_rate: int, global_per: float) -> float:
+        """Reserve a token on a bucket and the global ratelimit.
+
+        Args:
+            bucket (str): The bucket key.
+            global_rate (int): The number of requests allowed globally within global_per, or 0 for no limit.
+            global_per (float): The period of the global ratelimit.
+
+        Returns:
+            float: 0 if a token was reserved, otherwise how many seconds to wait before trying again.
+        """
+
+        wait = await self._run(
+            ACQUIRE_SCRIPT,
+            [f"{self._prefix}:{bucket}", f"{self._prefix}:global", f"{self._prefix}:global:lock"],
+            global_rate,
+            _ms(global_per),
+            _ms(self._state_ttl),
+            _ms(self._poll_interval),
+        )
+
+        return int(wait) / 1000
+
+    async def release(self, bucket: str) -> None:
+        """Release a token held on a bucket, returning it if the bucket's window is not known.
+
+        Args:
+            bucket (str): The bucket key.
+        """
+
+        await self._run(RELEASE_SCRIPT, [f"{self._prefix}:{bucket}"])
+
+    async def update(self, bucket: str, limit: int, remaining: int, reset_after: float) -> None:
+        """Update a bucket from the ratelimit headers of a response.
+
+        Args:
+            bucket (str): The bucket key.
+            limit (int): The value of the X-RateLimit-Limit header.
+            remaining (int): The value of the X-RateLimit-Remaining header.
+            reset_after (float): The value of the X-RateLimit-Reset-After header.
+        """
+
+        await self._run(
+            UPDATE_SCRIPT,
+            [f"{self._prefix}:{bucket}"],
+            limit,
+            remaining,
+            _ms(reset_after),
+            _ms(self._state_ttl),
+        )
+
+    async def defer(self, bucket: str, unlock_after: float) -> None:
+        """Stop handing out tokens on a bucket for a set period.
+
+        Args:
+            bucket (str): The bucket key.
+            unlock_after (float): After how many seconds to unlock the bucket.
+        """
+
+        await self._run(DEFER_SCRIPT, [f"{self._prefix}:{bucket}"], _ms(unlock_after), _ms(self._state_ttl))
+
+    async def lock_global(self, unlock_after: float) -> None:
+        """Set the global lock.
+
+        Args:
+            unlock_after (float): After how many seconds to unlock the global lock.
+        """
+
+        await self._run(LOCK_SCRIPT, [f"{self._prefix}:global:lock"], _ms(unlock_after))
+
+
+class _MemoryBucket:
+    __slots__ = (
+        "limit",
+        "remaining",
+        "reset",
+        "expires",
+        "holders",
+    )
+
+    def __init__(self) -> None:
+        self.limit = 1
+        self.remaining = 1
+        self.reset: Optional[float] = None
+        self.expires: Optional[float] = None
+        self.holders = 0
+
+
+class MemoryStore:
+    __slots__ = (
+        "_buckets",
+        "_window_count",
+        "_window_reset",
+        "_locked_until",
+        "_state_ttl",
+        "_poll_interval",
+        "_next_sweep",
+    )
+
+    def __init__(self, *, state_ttl: float = STATE_TTL, poll_interval: float = POLL_INTERVAL) -> None:
+        """An in-process ratelimit store with the same semantics as RedisStore.
+
+        Useful for tests, or for sharing one ratelimit state between several HTTP clients in one process.
+        Bucket state expires state_ttl seconds after its window ends, as it does in Redis, and expired
+        buckets are swept every state_ttl seconds.
+
+        Args:
+            state_ttl (float, optional): How long bucket state is kept after its window ends. Defaults to 10.
+            poll_interval (float, optional): How often to retry a bucket whose reset is not yet known. Defaults to 0.05.
+        """
+
+        self._buckets: dict[str, _MemoryBucket] = {}
+
+        self._window_count = 0
+        self._window_reset: Optional[float] = None
+        self._locked_until = 0.0
+
+        self._state_ttl = state_ttl
+        self._poll_interval = poll_interval
+        self._next_sweep = monotonic() + state_ttl
+
+    def sweep(self) -> int:
+        """Evict all expired buckets.
+
+        Returns:
+            int: The number of buckets evicted.
+        """
+
+        now = monotonic()
+        self._next_sweep = now + self._state_ttl
+
+        # A bucket which has never been updated holds no more than a fresh one would.
+        expired = [key for key, state in self._buckets.items() if state.expires is None or state.expires <= now]
+
+        for key in expired:
+            del self._buckets[key]
+
+        return len(expired)
+
+    def _get(self, bucket: str, now: float) -> _MemoryBucket:
+        if now >= self._next_sweep:
+            self.sweep()
+
+        state = self._buckets.get(bucket)
+
+        if state is None or (state.expires is not None and state.expires <= now):
+            state = self._buckets[bucket] = _MemoryBucket()
+
+        return state
+
+    async def acquire(self, bucket: str, global_rate: int, global_per: float) -> float:
+        """Reserve a token on a bucket and the global ratelimit.
+
+        Args:
+            bucket (str): The bucket key.
+            global_rate (int): The number of requests allowed globally within global_per, or 0 for no limit.
+            global_per (float): The period of the global ratelimit.
+
+        Returns:
+            float: 0 if a token was reserved, otherwise how many seconds to wait before trying again.
+        """
+
+        now = monotonic()
+
+        if self._locked_until > now:
+            return self._locked_until - now
+
+        state = self._get(bucket, now)
+
+        if state.reset is not None and state.reset <= now:
+            state.remaining = state.limit
+            state.reset = None
+
+        if state.remaining <= 0:
+            return state.reset - now if state.reset is not None else self._poll_interval
+
+        if global_rate > 0:
+            if self._window_reset is None or self._window_reset <= now:
+                self._window_count = 0
+                self._window_reset = now + global_per
+
+            if self._window_count >= global_rate:
+                return self._window_reset - now
+
+            self._window_count += 1
+
+        state.remaining -= 1
+        state.holders += 1
+        state.expires = (state.reset if state.reset is not None else now) + self._state_ttl
+
+        return 0
+
+    async def release(self, bucket: str) -> None:
+        """Release a token held on a bucket, returning it if the bucket's window is not known.
+
+        Args:
+            bucket (str): The bucket key.
+        """
+
+        if not (state := self._buckets.get(bucket)):
+            return
+
+        state.holders = max(state.holders - 1, 0)
+
+        if state.reset is None:
+            state.remaining = min(state.remaining + 1, state.limit)
+
+    async def update(self, bucket: str, limit: int, remaining: int, reset_after: float) -> None:
+        """Update a bucket from the ratelimit headers of a response.
+
+        Args:
+            bucket (str): The bucket key.
+            limit (int): The value of the X-RateLimit-Limit header.
+            remaining (int): The value of the X-RateLimit-Remaining header.
+            reset_after (float): The value of the X-RateLimit-Reset-After header.
+        """
+
+        now = monotonic()
+        state = self._get(bucket, now)
+
+        if state.reset is not None and state.reset <= now:
+            state.remaining = state.limit
+            state.reset = None
+
+        if state.reset is not None or state.holders > 1:
+            # A new window's count is only trusted while no other request is in flight, since the
+            # server may already have counted requests whose responses have not arrived yet.
+            remaining = min(state.remaining, remaining)
+
+        state.limit = limit
+        state.remaining = remaining
+        state.reset = now + reset_after
+        state.expires = state.reset + self._state_ttl
+
+    async def defer(self, bucket: str, unlock_after: float) -> None:
+        """Stop handing out tokens on a bucket for a set period.
+
+        Args:
+            bucket (str): The bucket key.
+            unlock_after (float): After how many seconds to unlock the bucket.
+        """
+
+        now = monotonic()
+        state = self._get(bucket, now)
+
+        state.remaining = 0
+        state.reset = now + unlock_after
+        state.expires = state.reset + self._state_ttl
+
+    async def lock_global(self, unlock_after: float) -> None:
+        """Set the global lock.
+
+        Args:
+            unlock_after (float): After how many seconds to unlock the global lock.
+        """
+
+        self._locked_until = monotonic() + unlock_after
+
+
+class DistributedBucket:
+    __slots__ = (
+        "_ratelimiter",
+        "_route",
+        "_held",
+    )
+
+    def __init__(self, ratelimiter: "DistributedRatelimiter", route: RouteProto) -> None:
+        """A handle on a bucket held in a shared ratelimit store.
+
+        Args:
+            ratelimiter (DistributedRatelimiter): The ratelimiter the bucket belongs to.
+            route (RouteProto): The route being requested.
+        """
+
+        self._ratelimiter = ratelimiter
+        self._route = route
+        self._held: Optional[str] = None
+
+    async def __aenter__(self) -> "DistributedBucket":
+        limiter = self._ratelimiter
+
+        while True:
+            # The key is looked up on every attempt so waiters follow newly discovered bucket hashes.
+            key = limiter.key(self._route)
+            wait = await limiter.store.acquire(key, limiter.global_rate, limiter.global_per)
+
+            if wait <= 0:
+                self._held = key
+                return self
+
+            await sleep(wait)
+
+    async def __aexit__(self, exc_type: Type[BaseException], exc_val: BaseException, exc_tb: BaseException) -> None:
+        if self._held:
+            await self._ratelimiter.store.release(self._held)
+            self._held = None
+
+    async def set_rate(self, rate: int, per: float) -> None:
+        """Set the rate of the bucket.
+
+        Args:
+            rate (int): The new number of requests allowed within a period.
+            per (float): The new period of the bucket.
+        """
+
+        await self._ratelimiter.store.update(self._ratelimiter.key(self._route), rate, rate, per)
+
+    async def update(self, limit: int, remaining: int, reset_after: float) -> None:
+        """Update the bucket from the ratelimit headers of a response.
+
+        Args:
+            limit (int): The value of the X-RateLimit-Limit header.
+            remaining (int): The value of the X-RateLimit-Remaining header.
+            reset_after (float): The value of the X-RateLimit-Reset-After header.
+        """
+
+        await self._ratelimiter.store.update(self._ratelimiter.key(self._route), limit, remaining, reset_after)
+
+    async def defer(self, unlock_after: float) -> None:
+        """Stop handing out tokens for a set period.
+
+        Args:
+            unlock_after (float): After how many seconds to unlock the bucket.
+        """
+
+        await self._ratelimiter.store.defer(self._ratelimiter.key(self._route), unlock_after)
+
+
+class DistributedRatelimiter:
+    __slots__ = (
+        "store",
+        "global_rate",
+        "global_per",
+        "_hashes",
+    )
+
+    def __init__(self, store: RatelimitStoreProto, *, global_rate: Optional[int] = 50, global_per: float = 1) -> None:
+        """A ratelimiter for HTTP requests whose state is shared between processes through a store.
+
+        Args:
+            store (RatelimitStoreProto): The store to keep ratelimit state in.
+            global_rate (Optional[int], optional): The number of requests allowed across all routes within\
+                global_per, or None to only respect the global lock. Defaults to 50.
+            global_per (float, optional): The period of the global ratelimit. Defaults to 1.
+        """
+
+        self.store = store
+        self.global_rate = global_rate or 0
+        self.global_per = global_per
+
+        self._hashes: dict[str, str] = {}
+
+    def key(self, route: RouteProto) -> str:
+        """Get the store key of the bucket for a route.
+
+        Args:
+            route (RouteProto): The route.
+
+        Returns:
+            str: The bucket key.
+        """
+
+        if bucket_hash := self._hashes.get(f"{route.method} {route.path}"):
+            return f"{bucket_hash}:{route.major}"
+        return route.bucket
+
+    async def acquire(self, route: RouteProto, *, priority: int = 0) -> BucketProto:
+        """Get the ratelimit bucket for a given route.
+
+        Waiters poll the shared store, so requests are not ordered by priority across processes.
+
+        Args:
+            route (RouteProto): The route to get the bucket for.
+            priority (int, optional): The priority of the request, which is not used by this ratelimiter. Defaults to 0.
+
+        Returns:
+            BucketProto: The bucket, to be entered before making a request.
+        """
+
+        return DistributedBucket(self, route)
+
+    async def set_bucket_hash(self, route: RouteProto, bucket_hash: str) -> None:
+        """Record the Discord bucket hash (X-RateLimit-Bucket) of a route.
+
+        Args:
+            route (RouteProto): The route the hash was returned for.
+            bucket_hash (str): The bucket hash.
+        """
+
+        self._hashes[f"{route.method} {route.path}"] = bucket_hash
+
+    async def set_global_lock(self, unlock_after: float) -> None:
+        """Set the global lock after hitting the global limit.
+
+        Args:
+            unlock_after (float): After how many seconds to unlock the global lock.
+        """
+
+        await self.store.lock_global(unlock_after)
@@ -0,0 +1,484 @@
+from asyncio import (
+    Event,
+    Future,
+    Lock,
+    Queue,
+    StreamReader,
+    StreamWriter,
+    Task,
+    create_task,
+    get_running_loop,
+    open_connection,
+    wait_for,
+)
+from json import loads as json_loads
+from ssl import SSLContext, create_default_context
+from typing import Any, AsyncIterator, Callable, Final, Mapping, Optional
+from urllib.parse import urlencode, urlsplit
+
+from aiohttp import FormData
+from multidict import CIMultiDict, CIMultiDictProxy
+
+try:
+    from h2.config import H2Configuration  # type: ignore
+    from h2.connection import H2Connection  # type: ignore
+    from h2.events import (  # type: ignore
+        ConnectionTerminated,
+        DataReceived,
+        RemoteSettingsChanged,
+        ResponseReceived,
+        StreamEnded,
+        StreamReset,
+        WindowUpdated,
+    )
+    from h2.exceptions import ProtocolError  # type: ignore
+except ImportError:
+    H2Connection = None
+
+READ_SIZE: Final[int] = 64 * 1024
+REQUEST_TIMEOUT: Final[float] = 30
+
+
+class _Buffer:
+    __slots__ = ("data",)
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+
+    async def write(self, chunk: bytes) -> None:
+        self.data += chunk
+
+
+async def _encode_body(data: Any) -> tuple[bytes, Optional[str]]:
+    if data is None:
+        return b"", None
+
+    if isinstance(data, str):
+        return data.encode(), None
+
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data), None
+
+    if isinstance(data, FormData):
+        payload = data()
+        buffer = _Buffer()
+        await payload.write(buffer)  # type: ignore
+
+        return bytes(buffer.data), payload.content_type
+
+    raise TypeError(f"Cannot send a body of type {type(data).__name__} over HTTP/2")
+
+
+class _StreamState:
+    __slots__ = (
+        "headers",
+        "chunks",
+        "ended",
+        "released",
+    )
+
+    def __init__(self) -> None:
+        self.headers: Future[list[tuple[str, str]]] = get_running_loop().create_future()
+        self.chunks: Queue[bytes | Exception | None] = Queue()
+        self.ended = False
+        self.released = False
+
+    def fail(self, exc: Exception) -> None:
+        if not self.headers.done():
+            self.headers.set_exception(exc)
+
+        self.chunks.put_nowait(exc)
+
+
+class H2Body:
+    __slots__ = (
+        "_connection",
+        "_stream_id",
+        "_state",
+        "_done",
+    )
+
+    def __init__(self, connection: "_H2Connection", stream_id: int, state: _StreamState) -> None:
+        self._connection = connection
+        self._stream_id = stream_id
+        self._state = state
+        self._done = False
+
+    async def iter_chunked(self, n: int) -> AsyncIterator[bytes]:
+        """Iterate over the body in chunks of at most n bytes.
+
+        Args:
+            n (int): The maximum chunk size.
+
+        Yields:
+            bytes: The chunks of the body.
+        """
+
+        while not self._done:
+            chunk = await self._state.chunks.get()
+
+            if chunk is None:
+                self._done = True
+                return
+
+            if isinstance(chunk, Exception):
+                self._done = True
+                raise chunk
+
+            # Data is only acknowledged once it is read, so a slow reader applies backpressure to the server.
+            self._connection.acknowledge(self._stream_id, len(chunk))
+
+            for i in range(0, len(chunk), n):
+                yield chunk[i : i + n]
+
+    def close(self) -> None:
+        if not self._done:
+            self._done = True
+            self._connection.release(self._stream_id, self._state)
+
+
+class H2Response:
+    __slots__ = (
+        "status",
+        "headers",
+        "content",
+        "_body",
+    )
+
+    def __init__(self, status: int, headers: CIMultiDictProxy[str], content: H2Body) -> None:
+        """A response received over HTTP/2, with the subset of aiohttp's ClientResponse that Orx uses."""
+
+        self.status = status
+        self.headers = headers
+        self.content = content
+        self._body: Optional[bytes] = None
+
+    def __repr__(self) -> str:
+        return f"<H2Response status={self.status}>"
+
+    async def read(self) -> bytes:
+        if self._body is None:
+            self._body = b"".join([chunk async for chunk in self.content.iter_chunked(READ_SIZE)])
+
+        return self._body
+
+    async def json(self, *, loads: Callable[[str], Any] = json_loads) -> Any:
+        return loads((await self.read()).decode())
+
+    def release(self) -> None:
+        self.content.close()
+
+
+class _H2Connection:
+    __slots__ = (
+        "closed",
+        "_reader",
+        "_writer",
+        "_conn",
+        "_streams",
+        "_window",
+        "_freed",
+        "_task",
+    )
+
+    def __init__(self, reader: StreamReader, writer: StreamWriter) -> None:
+        self.closed = False
+
+        self._reader = reader
+        self._writer = writer
+        self._conn = H2Connection(config=H2Configuration(client_side=True, header_encoding="utf-8"))  # type: ignore
+        self._streams: dict[int, _StreamState] = {}
+        self._window = Event()
+        self._freed = Event()
+
+        self._conn.initiate_connection()  # type: ignore
+        self._flush()
+
+        self._task: Task[None] = create_task(self._read())
+
+    def _flush(self) -> None:
+        if data := self._conn.data_to_send():  # type: ignore
+            self._writer.write(data)  # type: ignore
+
+    async def _read(self) -> None:
+        error: Exception = ConnectionError("HTTP/2 connection closed")
+
+        try:
+            while data := await self._reader.read(READ_SIZE):
+                for event in self._conn.receive_data(data):  # type: ignore
+                    self._handle(event)
+
+                self._flush()
+        except Exception as e:
+            error = e
+        finally:
+            self.closed = True
+            self._window.set()
+            self._freed.set()
+
+            for state in self._streams.values():
+                state.fail(error)
+
+            self._streams.clear()
+
+    def _handle(self, event: Any) -> None:
+        state = self._streams.get(getattr(event, "stream_id", 0) or 0)
+
+        if isinstance(event, ResponseReceived) and state:  # type: ignore
+            state.headers.set_result(event.headers)  # type: ignore
+        elif isinstance(event, DataReceived):  # type: ignore
+            if state and not state.released:
+                state.chunks.put_nowait(event.data)  # type: ignore
+                unread = event.flow_controlled_length - len(event.data)  # type: ignore
+            else:
+                # Nothing will read this data, but it still counts against the connection's window.
+                unread = event.flow_controlled_length  # type: ignore
+
+            if unread:
+                self.acknowledge(event.stream_id, unread)  # type: ignore
+        elif isinstance(event, StreamEnded) and state:  # type: ignore
+            state.ended = True
+            state.chunks.put_nowait(None)
+            self._finish(event.stream_id)  # type: ignore
+        elif isinstance(event, StreamReset) and state:  # type: ignore
+            state.fail(ConnectionError(f"HTTP/2 stream reset with error code {event.error_code}"))  # type: ignore
+            self._finish(event.stream_id)  # type: ignore
+        elif isinstance(event, (WindowUpdated, RemoteSettingsChanged)):  # type: ignore
+            self._window.set()
+            self._freed.set()
+        elif isinstance(event, ConnectionTerminated):  # type: ignore
+            self.closed = True
+
+    def _finish(self, stream_id: int) -> None:
+        if self._streams.pop(stream_id, None):
+            self._freed.set()
+
+    def acknowledge(self, stream_id: int, length: int) -> None:
+        if self.closed:
+            return
+
+        self._conn.acknowledge_received_data(length, stream_id)  # type: ignore
+        self._flush()
+
+    def release(self, stream_id: int, state: _StreamState) -> None:
+        state.released = True
+        unread = 0
+
+        while not state.chunks.empty():
+            if isinstance(chunk := state.chunks.get_nowait(), bytes):
+                unread += len(chunk)
+
+        # Buffered data will never be read, so it is credited back now to keep the connection's window open.
+        if unread:
+            self.acknowledge(stream_id, unread)
+
+        if not state.ended:
+            self._cancel(stream_id)
+
+    def _cancel(self, stream_id: int) -> None:
+        if not self.closed and stream_id in self._streams:
+            try:
+                self._conn.reset_stream(stream_id)  # type: ignore
+            except ProtocolError:  # type: ignore
+                # The stream was never opened, as sending its headers failed.
+                pass
+
+            self._flush()
+
+        self._finish(stream_id)
+
+    async def _send_body(self, stream_id: int, body: bytes) -> None:
+        view = memoryview(body)
+
+        while view:
+            size = min(self._conn.local_flow_control_window(stream_id), self._conn.max_outbound_frame_size)  # type: ignore
+
+            if size <= 0:
+                self._window.clear()
+                await self._window.wait()
+
+                if self.closed:
+                    raise ConnectionError("HTTP/2 connection closed")
+
+                continue
+
+            self._conn.send_data(stream_id, view[:size])  # type: ignore
+            view = view[size:]
+
+            self._flush()
+            await self._writer.drain()
+
+        self._conn.end_stream(stream_id)  # type: ignore
+
+    async def request(self, headers: list[tuple[str, str]], body: bytes) -> H2Response:
+        # Open at most as many streams as the server allows at once, queueing the rest.
+        while not self.closed and len(self._streams) >= self._conn.remote_settings.max_concurrent_streams:  # type: ignore
+            self._freed.clear()
+            await self._freed.wait()
+
+        if self.closed:
+            raise ConnectionError("HTTP/2 connection closed")
+
+        stream_id: int = self._conn.get_next_available_stream_id()  # type: ignore
+        state = self._streams[stream_id] = _StreamState()
+
+        try:
+            self._conn.send_headers(stream_id, headers, end_stream=not body)  # type: ignore
+            self._flush()
+
+            if body:
+                await self._send_body(stream_id, body)
+
+            self._flush()
+            await self._writer.drain()
+
+            response_headers = await state.headers
+        except BaseException:
+            state.released = True
+            self._cancel(stream_id)
+            raise
+
+        status = 0
+        result: CIMultiDict[str] = CIMultiDict()
+
+        for name, value in response_headers:
+            if name == ":status":
+                status = int(value)
+            elif not name.startswith(":"):
+                result.add(name, value)
+
+        return H2Response(status, CIMultiDictProxy(result), H2Body(self, stream_id, state))
+
+    async def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._conn.close_connection()  # type: ignore
+            self._flush()
+
+        self._task.cancel()
+        self._writer.close()
+
+
+class H2Transport:
+    __slots__ = (
+        "_ssl",
+        "_connections",
+        "_lock",
+        "_timeout",
+    )
+
+    def __init__(self, *, ssl: Optional[SSLContext] = None, timeout: Optional[float] = REQUEST_TIMEOUT) -> None:
+        """An HTTP/2 transport which multiplexes concurrent requests over one connection per origin.
+
+        HTTPS origins negotiate HTTP/2 with ALPN, and HTTP origins use HTTP/2 with prior knowledge.
+        This requires the optional h2 package.
+
+        Args:
+            ssl (Optional[SSLContext], optional): The SSL context for HTTPS origins, which must offer "h2" with\
+                set_alpn_protocols. It is used as given. Defaults to the system defaults, offering "h2".
+            timeout (Optional[float], optional): How long to wait in seconds for a connection and the response\
+                headers before abandoning the request, or None to wait indefinitely. Defaults to 30.
+
+        Raises:
+            RuntimeError: h2 is not installed.
+        """
+
+        if H2Connection is None:
+            raise RuntimeError("The h2 package must be installed to use H2Transport")
+
+        if ssl is None:
+            ssl = create_default_context()
+            ssl.set_alpn_protocols(["h2"])
+
+        self._ssl = ssl
+        self._connections: dict[tuple[str, str, int], _H2Connection] = {}
+        self._lock = Lock()
+        self._timeout = timeout
+
+    async def _connection(self, scheme: str, host: str, port: int) -> _H2Connection:
+        key = (scheme, host, port)
+
+        async with self._lock:
+            connection = self._connections.get(key)
+
+            if connection is None or connection.closed:
+                reader, writer = await open_connection(host, port, ssl=self._ssl if scheme == "https" else None)
+
+                if (
+                    scheme == "https"
+                    and (protocol := writer.get_extra_info("ssl_object").selected_alpn_protocol()) != "h2"
+                ):
+                    writer.close()
+                    raise ConnectionError(f"{host} negotiated {protocol or 'no protocol'} instead of HTTP/2")
+
+                connection = self._connections[key] = _H2Connection(reader, writer)
+
+        return connection
+
+    async def _send(self, scheme: str, host: str, port: int, headers: list[tuple[str, str]], body: bytes) -> H2Response:
+        connection = await self._connection(scheme, host, port)
+
+        return await connection.request(headers, body)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: Optional[Mapping[str, str | int]] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        data: Any = None,
+    ) -> H2Response:
+        """Send a request.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The URL to request.
+            params (Optional[Mapping[str, str | int]], optional): Query parameters. Defaults to None.
+            headers (Optional[Mapping[str, str]], optional): Request headers. Defaults to None.
+            data (Any, optional): The request body, as a string, bytes or FormData. Defaults to None.
+
+        Raises:
+            ConnectionError: The connection closed, or an HTTPS origin did not negotiate HTTP/2.
+            TimeoutError: The response headers were not received within the timeout.
+
+        Returns:
+            H2Response: The response.
+        """
+
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        query = "&".join(filter(None, (parts.query, urlencode(params or {}))))
+
+        if query:
+            path += f"?{query}"
+
+        body, content_type = await _encode_body(data)
+
+        request_headers = [
+            (":method", method),
+            (":scheme", parts.scheme),
+            (":authority", parts.netloc),
+            (":path", path),
+        ]
+        request_headers.extend((name.lower(), value) for name, value in (headers or {}).items())
+
+        if content_type:
+            request_headers.append(("content-type", content_type))
+
+        if body:
+            request_headers.append(("content-length", str(len(body))))
+
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+
+        return await wait_for(
+            self._send(parts.scheme, parts.hostname or "", port, request_headers, body), self._timeout
+        )
+
+    async def close(self) -> None:
+        """Close all open connections."""
+
+        for connection in self._connections.values():
+            await connection.close()
+
+        self._connections.clear()
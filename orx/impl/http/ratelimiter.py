@@ -1,112 +1,512 @@
-from asyncio import Event, Lock, create_task, sleep
-from typing import Type
+from asyncio import Future, get_running_loop
+from collections import OrderedDict
+from dataclasses import dataclass
+from heapq import heappop, heappush
+from itertools import count, islice
+from typing import Final, Mapping, Optional, Type
 
-from orx.proto.http import BucketProto
+from orx.impl.errors import RequestShed
+from orx.impl.scheduler import ScheduledCall, get_scheduler
+from orx.proto.http import BucketProto, RouteProto
+
+EVICTION_SCAN: Final[int] = 64
+
+# Waiters are ordered by priority, then by arrival across all buckets, so merged queues stay fair.
+_sequence = count()
+
+
+def _shed(waiter: Future["Bucket"]) -> None:
+    if not waiter.done():
+        waiter.set_exception(RequestShed("The request waited on a ratelimit past its deadline"))
 
 
 class Bucket:
     __slots__ = (
         "_rate",
         "_per",
-        "_lock",
-        "_deferred",
+        "_remaining",
+        "_reset_at",
+        "_waiters",
+        "_handle",
+        "_redirect",
+        "_parent",
+        "_holders",
     )
 
-    def __init__(self, rate: int, per: int) -> None:
-        """A ratelimiting bucket.
+    def __init__(self, rate: int, per: float, parent: Optional["Bucket"] = None) -> None:
+        """A token bucket for ratelimiting requests.
+
+        Up to `rate` requests may hold a token at once; further callers are parked
+        until the bucket resets or tokens are returned, and served highest priority first.
 
         Args:
             rate (int): The number of requests allowed within a period.
-            per (int): The period of the bucket.
+            per (float): The period of the bucket.
+            parent (Optional[Bucket], optional): A bucket that must also grant a token for each request,\
+                such as the global ratelimit. Defaults to None.
         """
 
         self._rate = rate
         self._per = per
 
-        self._deferred = False
+        self._remaining = rate
+        self._reset_at: Optional[float] = None
 
-        self._lock = Lock()
+        self._waiters: list[tuple[int, int, Future[Bucket]]] = []
+        self._handle: Optional[ScheduledCall] = None
+
+        self._redirect: Optional[Bucket] = None
+        self._parent = parent
+
+        # The number of requests which hold a token and have not exited yet.
+        self._holders = 0
 
     async def __aenter__(self) -> "Bucket":
-        await self._lock.acquire()
-        return self
+        return await self.enter()
+
+    async def enter(self, priority: int = 0, deadline: Optional[float] = None) -> "Bucket":
+        """Wait for a token from the bucket and its parent.
+
+        Args:
+            priority (int, optional): The priority of the request; higher priorities are served first. Defaults to 0.
+            deadline (Optional[float], optional): The loop time after which to stop waiting. Defaults to None.
+
+        Raises:
+            RequestShed: The deadline passed before a token was granted.
+
+        Returns:
+            Bucket: The bucket which granted the token, to be exited after the request.
+        """
+
+        bucket = await self._acquire(priority, deadline)
+
+        if bucket._parent:
+            try:
+                await bucket._parent._acquire(priority, deadline)
+            except BaseException:
+                bucket._release()
+                raise
+
+        bucket._holders += 1
+
+        return bucket
 
     async def __aexit__(self, exc_type: Type[BaseException], exc_val: BaseException, exc_tb: BaseException) -> None:
-        if not self._deferred:
-            self._lock.release()
+        bucket = self._resolve()
+        bucket._holders = max(bucket._holders - 1, 0)
+
+        if bucket._reset_at is None:
+            # No ratelimit information arrived for this request (it errored, or the route
+            # is not ratelimited), so the token it held was never spent.
+            bucket._release()
+
+    async def _acquire(self, priority: int = 0, deadline: Optional[float] = None) -> "Bucket":
+        if self._redirect:
+            return await self._resolve()._acquire(priority, deadline)
+
+        self._refill()
+
+        if self._remaining > 0 and not self._waiters:
+            self._spend()
+            return self
+
+        waiter: Future[Bucket] = get_running_loop().create_future()
+        heappush(self._waiters, (-priority, next(_sequence), waiter))
+
+        shed = get_scheduler().call_at(deadline, lambda: _shed(waiter)) if deadline is not None else None
+
+        self._wake()
+
+        try:
+            # Waiters may be migrated to another bucket, so the result is whichever bucket granted the token.
+            return await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled() and not waiter.exception():
+                # The token was handed to us just before we were cancelled, so give it back.
+                waiter.result()._release()
+            raise
+        finally:
+            if shed:
+                shed.cancel()
+
+    def _resolve(self) -> "Bucket":
+        bucket = self
+        while bucket._redirect:
+            bucket = bucket._redirect
+        return bucket
+
+    @property
+    def idle(self) -> bool:
+        """Whether the bucket holds no state worth keeping: no waiters, no tokens in use and no window pending."""
+
+        if self._redirect:
+            return True
+
+        self._refill()
+
+        if any(not waiter.done() for _, _, waiter in self._waiters):
+            return False
+
+        self._waiters.clear()
+
+        return self._holders == 0 and self._reset_at is None and self._remaining >= self._rate and self._handle is None
 
-    async def _unlock(self, after: float) -> None:
-        await sleep(after)
+    def _merge_into(self, bucket: "Bucket") -> None:
+        self._redirect = bucket
 
-        self._lock.release()
-        self._deferred = False
+        bucket._holders += self._holders
+        self._holders = 0
 
-    async def set_rate(self, rate: int, per: int) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+        for entry in self._waiters:
+            heappush(bucket._waiters, entry)
+
+        self._waiters.clear()
+
+        bucket._wake()
+
+    def _refill(self) -> None:
+        if self._reset_at is not None and self._reset_at <= get_running_loop().time():
+            self._remaining = self._rate
+            self._reset_at = None
+
+    def _spend(self) -> None:
+        self._remaining -= 1
+
+    def _release(self) -> None:
+        self._remaining = min(self._remaining + 1, self._rate)
+        self._wake()
+
+    def _wake(self) -> None:
+        self._refill()
+
+        while self._remaining > 0 and self._waiters:
+            _, _, waiter = heappop(self._waiters)
+
+            if waiter.done():
+                continue
+
+            self._spend()
+            waiter.set_result(self)
+
+        if self._waiters and self._reset_at is not None:
+            self._schedule(self._reset_at)
+
+    def _schedule(self, when: float) -> None:
+        if self._handle is not None:
+            if self._handle.when <= when and not self._handle.cancelled:
+                return
+            self._handle.cancel()
+
+        self._handle = get_scheduler().call_at(when, self._on_reset)
+
+    def _on_reset(self) -> None:
+        self._handle = None
+        self._wake()
+
+    async def set_rate(self, rate: int, per: float) -> None:
         """Set the rate of the bucket.
 
         Args:
             rate (int): The new number of requests allowed within a period.
-            per (int): The new period of the bucket.
+            per (float): The new period of the bucket.
         """
 
+        if self._redirect:
+            return await self._resolve().set_rate(rate, per)
+
+        self._remaining = max(self._remaining + rate - self._rate, 0)
+
         self._rate = rate
         self._per = per
 
+        self._wake()
+
+    async def update(self, limit: int, remaining: int, reset_after: float) -> None:
+        """Update the bucket from the ratelimit headers of a response.
+
+        Args:
+            limit (int): The value of the X-RateLimit-Limit header.
+            remaining (int): The value of the X-RateLimit-Remaining header.
+            reset_after (float): The value of the X-RateLimit-Reset-After header.
+        """
+
+        if self._redirect:
+            return await self._resolve().update(limit, remaining, reset_after)
+
+        now = get_running_loop().time()
+
+        self._refill()
+
+        if self._reset_at is None and self._holders <= 1:
+            # A new window has started and no other request is in flight, so the server's count is authoritative.
+            # Otherwise the server may already have counted requests whose responses have not arrived yet.
+            self._remaining = remaining
+        else:
+            # Other requests in this window may still be in flight, so never hand out more than we know of.
+            self._remaining = min(self._remaining, remaining)
+
+        self._rate = limit
+        self._per = reset_after
+        self._reset_at = now + reset_after
+
+        self._wake()
+
     async def defer(self, unlock_after: float) -> None:
-        """Defer unlocking the bucket for a set period.
+        """Stop handing out tokens for a set period.
 
         Args:
             unlock_after (float): After how many seconds to unlock the bucket.
         """
 
-        self._deferred = True
-        create_task(self._unlock(unlock_after))
+        if self._redirect:
+            return await self._resolve().defer(unlock_after)
+
+        self._remaining = 0
+        self._reset_at = get_running_loop().time() + unlock_after
+
+        self._schedule(self._reset_at)
+
+
+class GlobalBucket(Bucket):
+    __slots__ = ("_unlimited",)
+
+    def __init__(self, rate: Optional[int], per: float) -> None:
+        """A bucket for the global ratelimit.
+
+        Unlike route buckets, the window starts when the first token is spent rather
+        than being reported by Discord, so it can limit requests proactively.
+
+        Args:
+            rate (Optional[int]): The number of requests allowed within a period, or None to only\
+                limit requests while the global lock is set.
+            per (float): The period of the bucket.
+        """
+
+        super().__init__(rate or 1, per)
+
+        self._unlimited = rate is None
+
+    def _spend(self) -> None:
+        if self._unlimited:
+            return
+
+        self._remaining -= 1
+
+        if self._reset_at is None:
+            self._reset_at = get_running_loop().time() + self._per
+
+
+class _BucketEntry:
+    __slots__ = (
+        "_bucket",
+        "_priority",
+        "_timeout",
+        "_entered",
+    )
+
+    def __init__(self, bucket: Bucket, priority: int, timeout: Optional[float]) -> None:
+        self._bucket = bucket
+        self._priority = priority
+        self._timeout = timeout
+        self._entered: Optional[Bucket] = None
+
+    async def __aenter__(self) -> Bucket:
+        deadline = get_running_loop().time() + self._timeout if self._timeout is not None else None
+        self._entered = await self._bucket.enter(self._priority, deadline)
+
+        return self._entered
+
+    async def __aexit__(self, exc_type: Type[BaseException], exc_val: BaseException, exc_tb: BaseException) -> None:
+        if self._entered:
+            await self._entered.__aexit__(exc_type, exc_val, exc_tb)
+            self._entered = None
+
+    async def set_rate(self, rate: int, per: float) -> None:
+        await self._bucket.set_rate(rate, per)
+
+    async def update(self, limit: int, remaining: int, reset_after: float) -> None:
+        await self._bucket.update(limit, remaining, reset_after)
+
+    async def defer(self, unlock_after: float) -> None:
+        await self._bucket.defer(unlock_after)
+
+
+@dataclass(frozen=True, slots=True)
+class RatelimiterStats:
+    """A snapshot of a ratelimiter's state."""
+
+    buckets: int
+    hashes: int
+    evicted: int
 
 
 class Ratelimiter:
     __slots__ = (
         "_buckets",
+        "_hashes",
         "_global",
+        "_max_buckets",
+        "_sweep_interval",
+        "_next_sweep",
+        "_evicted",
+        "_deadlines",
     )
 
-    def __init__(self) -> None:
-        """A ratelimiter for HTTP requests."""
+    def __init__(
+        self,
+        *,
+        global_rate: Optional[int] = 50,
+        global_per: float = 1,
+        max_buckets: Optional[int] = None,
+        sweep_interval: float = 60,
+        deadlines: Optional[Mapping[int, float]] = None,
+    ) -> None:
+        """A ratelimiter for HTTP requests.
 
-        self._buckets: dict[str, BucketProto] = {}
+        Idle buckets are swept every sweep_interval seconds, and the least recently
+        used idle buckets are evicted whenever there are more than max_buckets.
 
-        self._global = Event()
-        self._global.set()
+        Contended buckets, and the global ratelimit, serve waiting requests highest priority first.
+        Requests at a priority with a deadline are shed if they wait on ratelimits for longer than it.
 
-    async def acquire(self, bucket: str) -> BucketProto:
-        """Acquire a ratelimit lock on a given bucket.
+        Args:
+            global_rate (Optional[int], optional): The number of requests allowed across all routes within\
+                global_per, or None to only respect the global lock. Defaults to 50.
+            global_per (float, optional): The period of the global ratelimit. Defaults to 1.
+            max_buckets (Optional[int], optional): The number of buckets to keep before evicting idle ones. Defaults to None.
+            sweep_interval (float, optional): The interval at which idle buckets are swept. Defaults to 60.
+            deadlines (Optional[Mapping[int, float]], optional): The longest requests of each priority may wait\
+                before being shed, in seconds. Defaults to {}.
+        """
+
+        self._buckets: OrderedDict[str, Bucket] = OrderedDict()
+        self._hashes: dict[str, str] = {}
+
+        self._global = GlobalBucket(global_rate, global_per)
+
+        self._max_buckets = max_buckets
+        self._sweep_interval = sweep_interval
+        self._next_sweep: Optional[float] = None
+        self._evicted = 0
+        self._deadlines = deadlines or {}
+
+    @property
+    def stats(self) -> RatelimiterStats:
+        """The current bucket statistics of the ratelimiter."""
+
+        return RatelimiterStats(len(self._buckets), len(self._hashes), self._evicted)
+
+    def sweep(self) -> int:
+        """Evict all idle buckets.
+
+        Returns:
+            int: The number of buckets evicted.
+        """
+
+        idle = [key for key, bucket in self._buckets.items() if bucket.idle]
+
+        for key in idle:
+            del self._buckets[key]
+
+        self._evicted += len(idle)
+
+        return len(idle)
+
+    def _evict(self) -> None:
+        now = get_running_loop().time()
+
+        if self._next_sweep is None:
+            self._next_sweep = now + self._sweep_interval
+        elif now >= self._next_sweep:
+            self._next_sweep = now + self._sweep_interval
+            self.sweep()
+
+        if self._max_buckets is None or len(self._buckets) <= self._max_buckets:
+            return
+
+        excess = len(self._buckets) - self._max_buckets
+
+        # Buckets are kept in least recently used order, so only the coldest few are checked here
+        # and anything idle further in is left for the next sweep.
+        coldest = islice(self._buckets.items(), excess + EVICTION_SCAN)
+        idle = [key for key, bucket in coldest if bucket.idle][:excess]
+
+        for key in idle:
+            del self._buckets[key]
+
+        self._evicted += len(idle)
+
+    def _key(self, route: RouteProto) -> str:
+        if bucket_hash := self._hashes.get(f"{route.method} {route.path}"):
+            return f"{bucket_hash}:{route.major}"
+        return route.bucket
+
+    async def acquire(self, route: RouteProto, *, priority: int = 0) -> BucketProto:
+        """Get the ratelimit bucket for a given route.
+
+        Routes are grouped by their Discord bucket hash once it is known,
+        and by their own bucket key until then.
 
         Args:
-            bucket (str): The bucket to acquire the lock on.
+            route (RouteProto): The route to get the bucket for.
+            priority (int, optional): The priority of the request; higher priorities are served first. Defaults to 0.
+
+        Raises:
+            RequestShed: When entered, the request's priority deadline passed before it was granted a token.
 
         Returns:
-            BucketProto: The acquired bucket.
+            BucketProto: The bucket, to be entered before making a request.
         """
 
-        if bucket not in self._buckets:
-            self._buckets[bucket] = Bucket(rate=1, per=1)
-        return self._buckets[bucket]
+        key = self._key(route)
 
-    async def _unlock_global(self, after: float) -> None:
-        await sleep(after)
-        self._global.set()
+        if not (bucket := self._buckets.get(key)):
+            self._evict()
+
+            bucket = self._buckets[key] = Bucket(rate=1, per=1, parent=self._global)
+        else:
+            self._buckets.move_to_end(key)
+
+        return _BucketEntry(bucket, priority, self._deadlines.get(priority))
+
+    async def set_bucket_hash(self, route: RouteProto, bucket_hash: str) -> None:
+        """Record the Discord bucket hash (X-RateLimit-Bucket) of a route.
+
+        The route's provisional bucket is moved under the hash, or merged with
+        the existing bucket for the same hash and major parameters, along with
+        any requests waiting on it.
+
+        Args:
+            route (RouteProto): The route the hash was returned for.
+            bucket_hash (str): The bucket hash.
+        """
+
+        self._hashes[f"{route.method} {route.path}"] = bucket_hash
+
+        provisional = self._buckets.pop(route.bucket, None)
+
+        if provisional is None:
+            return
+
+        key = f"{bucket_hash}:{route.major}"
+        bucket = self._buckets.get(key)
+
+        if bucket is None:
+            self._buckets[key] = provisional
+        elif bucket is not provisional:
+            provisional._merge_into(bucket)  # type: ignore[reportPrivateUsage]
 
     async def set_global_lock(self, unlock_after: float) -> None:
         """Set the global lock after hitting the global limit.
 
+        No request on any route is let through until the lock expires.
+
         Args:
             unlock_after (float): After how many seconds to unlock the global lock.
-
-        Raises:
-            RuntimeError: The global lock is already locked.
         """
 
-        if not self._global.is_set():
-            raise RuntimeError("Global lock is already locked.")
-
-        self._global.clear()
-        create_task(self._unlock_global(unlock_after))
+        await self._global.defer(unlock_after)
@@ -4,7 +4,9 @@ from typing import Optional
 class Route:
     __slots__ = (
         "method",
+        "path",
         "url",
+        "major",
         "bucket",
     )
 
@@ -29,6 +31,7 @@ class Route:
         """
 
         self.method = method
+        self.path = path
         self.url = path.format(
             guild_id=guild_id,
             channel_id=channel_id,
@@ -40,4 +43,5 @@ class Route:
         if webhook_id:
             webhook_bucket = f"{webhook_id}:{webhook_token}"
 
-        self.bucket = f"{path}-{guild_id}:{channel_id}:{webhook_bucket}"
+        self.major = f"{guild_id}:{channel_id}:{webhook_bucket}"
+        self.bucket = f"{method} {path}-{self.major}"
@@ -0,0 +1,49 @@
+from typing import Any, Callable, Mapping, Optional, cast
+
+from aiohttp import ClientSession
+
+from orx.proto.http import ResponseProto
+
+
+class AiohttpTransport:
+    __slots__ = ("_session",)
+
+    def __init__(self, session: Callable[[], ClientSession]) -> None:
+        """An HTTP/1.1 transport which sends requests on an aiohttp ClientSession.
+
+        Args:
+            session (Callable[[], ClientSession]): A function returning the session to use, called per request\
+                so that a closed session can be replaced.
+        """
+
+        self._session = session
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: Optional[Mapping[str, str | int]] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        data: Any = None,
+    ) -> ResponseProto:
+        """Send a request.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The URL to request.
+            params (Optional[Mapping[str, str | int]], optional): Query parameters. Defaults to None.
+            headers (Optional[Mapping[str, str]], optional): Request headers. Defaults to None.
+            data (Any, optional): The request body, as a string, bytes or FormData. Defaults to None.
+
+        Returns:
+            ResponseProto: The response.
+        """
+
+        response = await self._session().request(method, url, params=params, headers=headers, data=data)
+
+        # ClientResponse.headers is a cached property, which type checkers do not match against a property.
+        return cast(ResponseProto, response)
+
+    async def close(self) -> None:
+        """Close the transport. The session is owned by the HTTP client, so this does nothing."""
@@ -0,0 +1,151 @@
+from asyncio import AbstractEventLoop, TimerHandle, get_running_loop
+from heapq import heapify, heappop, heappush
+from itertools import count
+from typing import Callable, Optional
+from weakref import WeakKeyDictionary
+
+
+class ScheduledCall:
+    __slots__ = (
+        "when",
+        "callback",
+        "cancelled",
+        "_scheduler",
+    )
+
+    def __init__(self, scheduler: "Scheduler", when: float, callback: Callable[[], None]) -> None:
+        """A callback scheduled to run at a deadline.
+
+        Args:
+            scheduler (Scheduler): The scheduler the call belongs to.
+            when (float): The loop time to run the callback at.
+            callback (Callable[[], None]): The callback to run.
+        """
+
+        self.when = when
+        self.callback = callback
+        self.cancelled = False
+
+        self._scheduler = scheduler
+
+    def cancel(self) -> None:
+        """Cancel the call if it has not run yet."""
+
+        if not self.cancelled:
+            self.cancelled = True
+            self._scheduler._cancelled += 1  # type: ignore[reportPrivateUsage]
+
+
+class Scheduler:
+    __slots__ = (
+        "_loop",
+        "_heap",
+        "_counter",
+        "_handle",
+        "_cancelled",
+    )
+
+    def __init__(self, loop: AbstractEventLoop) -> None:
+        """A deadline scheduler shared by everything running on an event loop.
+
+        Deadlines are kept in a single heap with one loop timer armed for the earliest
+        of them, so scheduling a callback costs a heap entry rather than a task or timer.
+
+        Args:
+            loop (AbstractEventLoop): The event loop to run callbacks on.
+        """
+
+        self._loop = loop
+        self._heap: list[tuple[float, int, ScheduledCall]] = []
+        self._counter = count()
+        self._handle: Optional[TimerHandle] = None
+        self._cancelled = 0
+
+    def __len__(self) -> int:
+        return len(self._heap) - self._cancelled
+
+    def call_at(self, when: float, callback: Callable[[], None]) -> ScheduledCall:
+        """Schedule a callback to run at a loop time.
+
+        Args:
+            when (float): The loop time to run the callback at.
+            callback (Callable[[], None]): The callback to run.
+
+        Returns:
+            ScheduledCall: The scheduled call, which can be cancelled.
+        """
+
+        call = ScheduledCall(self, when, callback)
+        heappush(self._heap, (when, next(self._counter), call))
+
+        if self._handle is None or when < self._handle.when():
+            self._arm()
+
+        return call
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> ScheduledCall:
+        """Schedule a callback to run after a delay.
+
+        Args:
+            delay (float): The number of seconds to wait before running the callback.
+            callback (Callable[[], None]): The callback to run.
+
+        Returns:
+            ScheduledCall: The scheduled call, which can be cancelled.
+        """
+
+        return self.call_at(self._loop.time() + delay, callback)
+
+    def _arm(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+        if self._heap:
+            self._handle = self._loop.call_at(self._heap[0][0], self._run)
+
+    def _run(self) -> None:
+        self._handle = None
+        now = self._loop.time()
+
+        while self._heap and self._heap[0][0] <= now:
+            _, _, call = heappop(self._heap)
+
+            if call.cancelled:
+                self._cancelled -= 1
+                continue
+
+            # Mark the call as finished so cancelling it afterwards is a no-op.
+            call.cancelled = True
+
+            try:
+                call.callback()
+            except Exception as e:
+                self._loop.call_exception_handler(
+                    {"message": "Error in scheduled callback", "exception": e, "handle": call}
+                )
+
+        if self._cancelled > len(self._heap) // 2:
+            self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+            self._cancelled = 0
+            heapify(self._heap)
+
+        self._arm()
+
+
+_schedulers: WeakKeyDictionary[AbstractEventLoop, Scheduler] = WeakKeyDictionary()
+
+
+def get_scheduler() -> Scheduler:
+    """Get the scheduler for the running event loop.
+
+    Returns:
+        Scheduler: The scheduler.
+    """
+
+    loop = get_running_loop()
+
+    if (scheduler := _schedulers.get(loop)) is None:
+        scheduler = _schedulers[loop] = Scheduler(loop)
+
+    return scheduler
@@ -1,10 +1,18 @@
 from .client import GatewayClientProto
-from .ratelimiter import GatewayRatelimiterProto
+from .dispatcher import DispatcherProto
+from .ratelimiter import GatewayRatelimiterProto, IdentifyRatelimiterProto
+from .router import RouterProto
+from .session import SessionSnapshot, SessionStoreProto
 from .shard import Command, ShardProto
 
 __all__ = (
     "Command",
+    "DispatcherProto",
     "GatewayClientProto",
     "GatewayRatelimiterProto",
+    "IdentifyRatelimiterProto",
+    "RouterProto",
+    "SessionSnapshot",
+    "SessionStoreProto",
     "ShardProto",
 )
@@ -1,8 +1,23 @@
-from typing import Any, Callable, Coroutine, Optional, Protocol, Type
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Collection,
+    Coroutine,
+    Iterable,
+    Literal,
+    Optional,
+    Protocol,
+    Type,
+)
 
+from orx.impl.codec import JSONCodec
 from orx.proto.http import HTTPClientProto
 
-from .ratelimiter import GatewayRatelimiterProto
+from .dispatcher import DispatcherProto
+from .ratelimiter import GatewayRatelimiterProto, IdentifyRatelimiterProto
+from .router import RouterProto
+from .session import SessionStoreProto
 from .shard import ShardProto
 
 
@@ -18,15 +33,45 @@ class GatewayClientProto(Protocol):
         shard_cls: Optional[Type[ShardProto]] = None,
         shard_ids: Optional[list[int]] = None,
         shard_count: Optional[int] = None,
+        *,
+        compress: bool = False,
+        codec: Optional[JSONCodec] = None,
+        encoding: Literal["json", "etf"] = "json",
+        lazy: bool = False,
+        identify_ratelimiter: Optional[IdentifyRatelimiterProto] = None,
+        session_store: Optional[SessionStoreProto] = None,
+        dispatcher: Optional[DispatcherProto] = None,
+        router: Optional[RouterProto] = None,
     ) -> None:
         ...
 
-    def add_dispatch_hook(self, event: str, hook: Callable[..., Coroutine[Any, Any, None]]) -> None:
+    def add_dispatch_hook(
+        self,
+        event: str,
+        hook: Callable[..., Optional[Coroutine[Any, Any, None]]],
+        *,
+        guild_ids: Optional[Collection[int | str]] = None,
+        channel_ids: Optional[Collection[int | str]] = None,
+        predicate: Optional[Callable[[Any], bool]] = None,
+    ) -> None:
         ...
 
     def get_shard(self, id: int) -> ShardProto:
         ...
 
+    def get_guild_shard(self, guild_id: int | str) -> ShardProto:
+        ...
+
+    def request_members(
+        self,
+        guild_ids: Iterable[int | str],
+        *,
+        concurrency: int = 8,
+        limit: int = 0,
+        timeout: float = 30,
+    ) -> AsyncIterator[tuple[str, Any]]:
+        ...
+
     async def start(self, *, fail_early: bool = False, wait: bool = True) -> None:
         ...
 
@@ -0,0 +1,9 @@
+from typing import Any, Callable, Protocol, Sequence
+
+
+class DispatcherProto(Protocol):
+    async def dispatch(self, callbacks: Sequence[Callable[..., Any]], event: Any) -> None:
+        ...
+
+    async def close(self) -> None:
+        ...
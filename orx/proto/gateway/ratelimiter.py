@@ -7,3 +7,8 @@ class GatewayRatelimiterProto(Protocol):
 
     async def acquire(self) -> None:
         ...
+
+
+class IdentifyRatelimiterProto(Protocol):
+    async def acquire(self, shard_id: int) -> None:
+        ...
@@ -0,0 +1,20 @@
+from typing import Any, Callable, Collection, Optional, Protocol, Sequence
+
+
+class RouterProto(Protocol):
+    def add(
+        self,
+        event: str,
+        hook: Callable[..., Any],
+        *,
+        guild_ids: Optional[Collection[int | str]] = None,
+        channel_ids: Optional[Collection[int | str]] = None,
+        predicate: Optional[Callable[[Any], bool]] = None,
+    ) -> None:
+        ...
+
+    def wants(self, event: Optional[str]) -> bool:
+        ...
+
+    def route(self, event: Any) -> Sequence[Callable[..., Any]]:
+        ...
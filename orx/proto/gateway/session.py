@@ -0,0 +1,16 @@
+from typing import Optional, Protocol, TypedDict
+
+
+class SessionSnapshot(TypedDict):
+    session_id: str
+    sequence: int
+    resume_url: Optional[str]
+    shard_count: int
+
+
+class SessionStoreProto(Protocol):
+    async def load(self) -> dict[int, SessionSnapshot]:
+        ...
+
+    async def save(self, snapshots: dict[int, SessionSnapshot]) -> None:
+        ...
@@ -1,5 +1,5 @@
 from asyncio import Event
-from typing import Any, Callable, Coroutine, Protocol, Type, Union
+from typing import Any, AsyncIterator, Literal, Optional, Protocol, Type, Union
 
 from discord_typings.gateway import (
     HeartbeatCommand,
@@ -10,8 +10,13 @@ from discord_typings.gateway import (
     VoiceUpdateCommand,
 )
 
+from orx.impl.codec import JSONCodec
+
 from ..http import HTTPClientProto
-from .ratelimiter import GatewayRatelimiterProto
+from .dispatcher import DispatcherProto
+from .ratelimiter import GatewayRatelimiterProto, IdentifyRatelimiterProto
+from .router import RouterProto
+from .session import SessionSnapshot
 
 Command = Union[
     ResumeCommand,
@@ -26,8 +31,9 @@ Command = Union[
 class ShardProto(Protocol):
     id: int
     latency: float | None
-    callbacks: dict[str, list[Callable[..., Coroutine[Any, Any, None]]]]
+    router: RouterProto
     ready: Event
+    identified: Event
 
     def __init__(
         self,
@@ -36,14 +42,39 @@ class ShardProto(Protocol):
         token: str,
         intents: int,
         ratelimiter_cls: Type[GatewayRatelimiterProto],
+        *,
+        compress: bool = False,
+        codec: Optional[JSONCodec] = None,
+        encoding: Literal["json", "etf"] = "json",
+        lazy: bool = False,
+        identify_ratelimiter: Optional[IdentifyRatelimiterProto] = None,
+        dispatcher: Optional[DispatcherProto] = None,
+        router: Optional[RouterProto] = None,
     ) -> None:
         ...
 
     async def connect(self, url: str, http: HTTPClientProto) -> None:
         ...
 
-    async def close(self) -> None:
+    async def close(self, *, resumable: bool = False) -> None:
+        ...
+
+    def snapshot(self) -> Optional[SessionSnapshot]:
+        ...
+
+    def restore(self, snapshot: SessionSnapshot) -> None:
         ...
 
     async def send(self, data: Command) -> None:
         ...
+
+    def request_members(
+        self,
+        guild_id: int | str,
+        *,
+        query: str = "",
+        limit: int = 0,
+        user_ids: Optional[list[int | str]] = None,
+        timeout: float = 30,
+    ) -> AsyncIterator[Any]:
+        ...
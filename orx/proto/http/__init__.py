@@ -1,10 +1,20 @@
+from .cache import CachedResponseProto, ResponseCacheProto
 from .client import HTTPClientProto
 from .ratelimiter import BucketProto, RatelimiterProto
 from .route import RouteProto
+from .store import RatelimitStoreProto, RedisClientProto
+from .transport import ResponseProto, StreamProto, TransportProto
 
 __all__ = (
     "BucketProto",
+    "CachedResponseProto",
     "HTTPClientProto",
     "RatelimiterProto",
+    "RatelimitStoreProto",
+    "RedisClientProto",
+    "ResponseCacheProto",
+    "ResponseProto",
     "RouteProto",
+    "StreamProto",
+    "TransportProto",
 )
@@ -0,0 +1,36 @@
+from typing import Optional, Protocol
+
+from .route import RouteProto
+
+
+class CachedResponseProto(Protocol):
+    body: bytes
+    etag: Optional[str]
+
+    @property
+    def fresh(self) -> bool:
+        ...
+
+
+class ResponseCacheProto(Protocol):
+    def get(self, route: RouteProto, query_params: dict[str, str | int]) -> Optional[CachedResponseProto]:
+        ...
+
+    def generation(self) -> int:
+        ...
+
+    def set(
+        self,
+        route: RouteProto,
+        query_params: dict[str, str | int],
+        body: bytes,
+        etag: Optional[str],
+        generation: Optional[int] = None,
+    ) -> None:
+        ...
+
+    def invalidate(self, url: str) -> None:
+        ...
+
+    def clear(self) -> None:
+        ...
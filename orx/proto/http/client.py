@@ -1,11 +1,14 @@
-from typing import TYPE_CHECKING, Any, Optional, Protocol
+from typing import TYPE_CHECKING, Any, AsyncIterator, Optional, Protocol
 
-from aiohttp import ClientResponse, ClientWebSocketResponse
+from aiohttp import ClientWebSocketResponse
 
+from orx.impl.codec import JSONCodec
 from orx.impl.types import UNSET, UnsetOr
 
+from .cache import ResponseCacheProto
 from .ratelimiter import RatelimiterProto
 from .route import RouteProto
+from .transport import ResponseProto, TransportProto
 
 if TYPE_CHECKING:
     from orx.impl.http.file import File
@@ -22,6 +25,14 @@ class HTTPClientProto(Protocol):
         default_headers: Optional[dict[str, str]] = None,
         max_retries: Optional[int] = None,
         ratelimiter: Optional[RatelimiterProto] = None,
+        codec: Optional[JSONCodec] = None,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 30,
+        dns_cache_ttl: Optional[int] = 300,
+        transport: Optional[TransportProto] = None,
+        coalesce: bool = False,
+        cache: Optional[ResponseCacheProto] = None,
     ) -> None:
         ...
 
@@ -38,7 +49,35 @@ class HTTPClientProto(Protocol):
         files: UnsetOr[list[File]] = UNSET,
         json: UnsetOr[Any] = UNSET,
         reason: Optional[str] = None,
-    ) -> ClientResponse:
+        priority: int = 0,
+    ) -> ResponseProto:
+        ...
+
+    async def request_json(
+        self,
+        route: RouteProto,
+        query_params: Optional[dict[str, str | int]] = None,
+        headers: Optional[dict[str, str]] = None,
+        *,
+        max_retries: Optional[int] = None,
+        files: UnsetOr[list[File]] = UNSET,
+        json: UnsetOr[Any] = UNSET,
+        reason: Optional[str] = None,
+        coalesce: Optional[bool] = None,
+        priority: int = 0,
+    ) -> Any:
+        ...
+
+    def iter_chunked(
+        self,
+        route: RouteProto,
+        query_params: Optional[dict[str, str | int]] = None,
+        headers: Optional[dict[str, str]] = None,
+        *,
+        chunk_size: int = 64 * 1024,
+        max_retries: Optional[int] = None,
+        priority: int = 0,
+    ) -> AsyncIterator[bytes]:
         ...
 
     async def close(self) -> None:
@@ -1,17 +1,19 @@
 from typing import Protocol, Type
 
+from .route import RouteProto
 
-class BucketProto(Protocol):
-    def __init__(self, rate: int, per: int) -> None:
-        ...
 
+class BucketProto(Protocol):
     async def __aenter__(self) -> "BucketProto":
         ...
 
     async def __aexit__(self, exc_type: Type[BaseException], exc_val: BaseException, exc_tb: BaseException) -> None:
         ...
 
-    async def set_rate(self, rate: int, per: int) -> None:
+    async def set_rate(self, rate: int, per: float) -> None:
+        ...
+
+    async def update(self, limit: int, remaining: int, reset_after: float) -> None:
         ...
 
     async def defer(self, unlock_after: float) -> None:
@@ -19,7 +21,10 @@ class BucketProto(Protocol):
 
 
 class RatelimiterProto(Protocol):
-    async def acquire(self, bucket: str) -> BucketProto:
+    async def acquire(self, route: RouteProto, *, priority: int = 0) -> BucketProto:
+        ...
+
+    async def set_bucket_hash(self, route: RouteProto, bucket_hash: str) -> None:
         ...
 
     async def set_global_lock(self, unlock_after: float) -> None:
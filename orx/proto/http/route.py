@@ -3,7 +3,9 @@ from typing import Optional, Protocol
 
 class RouteProto(Protocol):
     bucket: str
+    major: str
     method: str
+    path: str
     url: str
 
     def __init__(
@@ -0,0 +1,26 @@
+from typing import Any, Protocol
+
+
+class RedisClientProto(Protocol):
+    async def eval(self, script: str, numkeys: int, *keys_and_args: Any) -> Any:
+        ...
+
+    async def evalsha(self, sha: str, numkeys: int, *keys_and_args: Any) -> Any:
+        ...
+
+
+class RatelimitStoreProto(Protocol):
+    async def acquire(self, bucket: str, global_rate: int, global_per: float) -> float:
+        ...
+
+    async def release(self, bucket: str) -> None:
+        ...
+
+    async def update(self, bucket: str, limit: int, remaining: int, reset_after: float) -> None:
+        ...
+
+    async def defer(self, bucket: str, unlock_after: float) -> None:
+        ...
+
+    async def lock_global(self, unlock_after: float) -> None:
+        ...
@@ -0,0 +1,45 @@
+from typing import Any, AsyncIterator, Callable, Mapping, Optional, Protocol
+
+
+class StreamProto(Protocol):
+    def iter_chunked(self, n: int) -> AsyncIterator[bytes]:
+        ...
+
+
+class ResponseProto(Protocol):
+    @property
+    def status(self) -> int:
+        ...
+
+    @property
+    def headers(self) -> Mapping[str, str]:
+        ...
+
+    @property
+    def content(self) -> StreamProto:
+        ...
+
+    async def read(self) -> bytes:
+        ...
+
+    async def json(self, *, loads: Callable[[str], Any] = ...) -> Any:
+        ...
+
+    def release(self) -> Any:
+        ...
+
+
+class TransportProto(Protocol):
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: Optional[Mapping[str, str | int]] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        data: Any = None,
+    ) -> ResponseProto:
+        ...
+
+    async def close(self) -> None:
+        ...
@@ -0,0 +1,140 @@
+from asyncio import Queue, get_running_loop, sleep
+from typing import Any, Optional
+
+from aiohttp import WSMsgType
+
+from orx.impl.codec import DEFAULT_CODEC
+from orx.impl.gateway import etf
+
+
+class Response:
+    def __init__(self, status: int, headers: dict[str, str], body: Any = None) -> None:
+        self.status = status
+        self.headers = headers
+        self._body = DEFAULT_CODEC.dumps(body).encode() if body is not None else b""
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def json(self, *, loads: Any = DEFAULT_CODEC.loads) -> Any:
+        return loads(self._body)
+
+    def release(self) -> None:
+        pass
+
+
+class Message:
+    def __init__(self, type: WSMsgType, data: Any) -> None:
+        self.type = type
+        self.data = data
+
+
+def text(payload: dict[str, Any]) -> Message:
+    return Message(WSMsgType.TEXT, DEFAULT_CODEC.dumps(payload))
+
+
+def binary(payload: dict[str, Any]) -> Message:
+    return Message(WSMsgType.BINARY, etf.dumps(payload))
+
+
+def hello(interval: float = 45000) -> dict[str, Any]:
+    return {"op": 10, "d": {"heartbeat_interval": interval}, "s": None, "t": None}
+
+
+def dispatch(t: str, s: int, d: Any) -> dict[str, Any]:
+    return {"t": t, "s": s, "op": 0, "d": d}
+
+
+class FakeSocket:
+    def __init__(self, *messages: Message, close_code: int = 1000) -> None:
+        self.closed = False
+        self.close_code: Optional[int] = close_code
+        self.sent: list[Any] = []
+        self._queue: Queue[Optional[Message]] = Queue()
+
+        for message in messages:
+            self._queue.put_nowait(message)
+
+    def feed(self, message: Optional[Message]) -> None:
+        self._queue.put_nowait(message)
+
+    def __aiter__(self) -> "FakeSocket":
+        return self
+
+    async def __anext__(self) -> Message:
+        message = await self._queue.get()
+
+        if message is None:
+            self.closed = True
+            raise StopAsyncIteration
+
+        return message
+
+    async def close(self, code: int = 1000) -> None:
+        if not self.closed:
+            self.closed = True
+            self.close_code = code
+            self._queue.put_nowait(None)
+
+    async def send_str(self, data: str) -> None:
+        self.sent.append(DEFAULT_CODEC.loads(data))
+
+    async def send_bytes(self, data: bytes) -> None:
+        self.sent.append(etf.loads(data))
+
+
+class FakeHTTP:
+    def __init__(self, *sockets: FakeSocket) -> None:
+        self.sockets = list(sockets)
+        self.urls: list[str] = []
+
+    async def spawn_websocket(self, url: str, **kwargs: Any) -> FakeSocket:
+        self.urls.append(url)
+        return self.sockets.pop(0)
+
+
+class WindowedServer:
+    """A transport which ratelimits like Discord: `limit` requests per window, starting at the first request."""
+
+    def __init__(self, limit: int, per: float, latency: float) -> None:
+        self.limit = limit
+        self.per = per
+        self.latency = latency
+
+        self.sent = 0
+        self.ratelimited = 0
+
+        self._window_end: Optional[float] = None
+        self._count = 0
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> Response:
+        now = get_running_loop().time()
+        self.sent += 1
+
+        if self._window_end is None or self._window_end <= now:
+            self._window_end = now + self.per
+            self._count = 0
+
+        self._count += 1
+        count = self._count
+        window_end = self._window_end
+
+        await sleep(self.latency)
+
+        reset_after = max(window_end - get_running_loop().time(), 0)
+
+        headers = {
+            "X-RateLimit-Bucket": "bucket",
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(max(self.limit - count, 0)),
+            "X-RateLimit-Reset-After": str(reset_after),
+        }
+
+        if count > self.limit:
+            self.ratelimited += 1
+            return Response(429, headers | {"Via": "1.1 google"}, {"retry_after": reset_after, "global": False})
+
+        return Response(200, headers)
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,47 @@
+from typing import Any
+
+from orx.impl.cache import Cache
+
+
+def role(id: int) -> dict[str, Any]:
+    return {"id": str(id), "name": "role", "permissions": "0", "position": 0, "color": 0}
+
+
+def guild(id: int) -> dict[str, Any]:
+    return {
+        "id": str(id),
+        "name": "guild",
+        "channels": [{"id": str(id * 10), "type": 0}],
+        "roles": [role(id * 10 + 1)],
+        "members": [{"user": {"id": "1"}, "roles": []}],
+    }
+
+
+def test_evicted_guild_drops_its_entities() -> None:
+    cache = Cache(max_guilds=1)
+
+    cache._guild_create(guild(1))
+    cache._guild_create(guild(2))
+
+    assert cache.get_guild(1) is None
+    assert cache.get_channel(10) is None
+    assert cache.get_role(11) is None
+    assert cache.get_member(1, 1) is None
+
+    assert cache.get_channel(20) is not None
+    assert cache.get_role(21) is not None
+
+
+def test_guild_entities_are_not_cached_without_guilds() -> None:
+    cache = Cache(guilds=False)
+
+    cache._guild_create(guild(1))
+    cache._channel_set({"id": "12", "type": 0, "guild_id": "1"})
+    cache._role_set({"guild_id": "1", "role": role(13)})
+    cache._channel_set({"id": "14", "type": 1})
+
+    assert len(cache._channels) == 1
+    assert len(cache._roles) == 0
+
+    # DM channels have no guild to be dropped with, so they are still cached.
+    assert cache.get_channel(14) is not None
@@ -0,0 +1,69 @@
+from asyncio import Event, run, sleep, wait_for
+from typing import Any, Optional
+
+from orx.impl.gateway import GatewayClient, MemorySessionStore
+from orx.proto.gateway import SessionSnapshot
+
+
+class Gateway:
+    async def request_json(self, route: Any) -> Any:
+        return {
+            "url": "wss://gateway",
+            "shards": 2,
+            "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1},
+        }
+
+
+class ReconnectingShard:
+    def __init__(self, id: int, *args: Any, **kwargs: Any) -> None:
+        self.id = id
+        self.ready = Event()
+        self.identified = Event()
+        self.connected = False
+        self.restored: Optional[SessionSnapshot] = None
+
+    def restore(self, snapshot: SessionSnapshot) -> None:
+        self.restored = snapshot
+
+    async def connect(self, url: str, http: Any) -> None:
+        self.connected = True
+
+        # The shard sends its identify but keeps reconnecting without ever reaching READY.
+        self.identified.set()
+
+        while True:
+            await sleep(1)
+
+
+def test_bucket_moves_on_once_identified() -> None:
+    async def main() -> None:
+        client = GatewayClient("token", 0, Gateway(), shard_cls=ReconnectingShard)  # type: ignore
+
+        await wait_for(client.start(wait=False), 1)
+
+        assert all(shard.connected for shard in client.shards.values())  # type: ignore
+        assert len(client.shards) == 2
+
+        for task in client._shard_tasks.values():
+            task.cancel()
+
+    run(main())
+
+
+def test_sessions_are_only_restored_for_the_same_shard_count() -> None:
+    async def main() -> None:
+        store = MemorySessionStore()
+        current = SessionSnapshot(session_id="a", sequence=1, resume_url=None, shard_count=2)
+        stale = SessionSnapshot(session_id="b", sequence=1, resume_url=None, shard_count=4)
+        await store.save({0: current, 1: stale})
+
+        client = GatewayClient("token", 0, Gateway(), shard_cls=ReconnectingShard, session_store=store)  # type: ignore
+        await wait_for(client.start(wait=False), 1)
+
+        assert client.shards[0].restored == current  # type: ignore
+        assert client.shards[1].restored is None  # type: ignore
+
+        for task in client._shard_tasks.values():
+            task.cancel()
+
+    run(main())
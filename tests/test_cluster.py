@@ -0,0 +1,59 @@
+import os
+from threading import Thread
+from time import monotonic, sleep
+
+import pytest
+
+from orx.impl.gateway import Cluster
+from orx.impl.gateway.cluster import _Worker
+from orx.impl.http.ratelimiter import Ratelimiter
+
+
+def unlimited() -> Ratelimiter:
+    return Ratelimiter(global_rate=None)
+
+
+def test_exited_workers_are_reaped() -> None:
+    cluster = Cluster("token", 0, restart_delay=60)
+    context = cluster._context
+
+    process = context.Process(target=sleep, args=(0,))
+    process.start()
+
+    worker = _Worker([0], process=process)
+    cluster._workers = [worker]
+    cluster._running = True
+
+    supervisor = Thread(target=cluster._supervise, args=(1,))
+    supervisor.start()
+
+    deadline = monotonic() + 10
+    while worker.process is not None and monotonic() < deadline:
+        sleep(0.01)
+
+    cluster.stop()
+    supervisor.join()
+
+    assert worker.process is None
+    assert worker.restart_at is not None
+
+    # The supervisor has already waited on the process, so there is no zombie left to reap.
+    with pytest.raises(ChildProcessError):
+        os.waitpid(process.pid, os.WNOHANG)  # type: ignore
+
+
+def test_workers_share_the_global_ratelimit() -> None:
+    cluster = Cluster("token", 0)
+    cluster._workers = [_Worker([0]), _Worker([1]), _Worker([2])]
+
+    ratelimiter = cluster._worker_ratelimiter()()
+
+    assert isinstance(ratelimiter, Ratelimiter)
+    assert ratelimiter._global._rate == 16
+
+
+def test_workers_use_the_given_ratelimiter() -> None:
+    cluster = Cluster("token", 0, ratelimiter=unlimited)
+    cluster._workers = [_Worker([0]), _Worker([1])]
+
+    assert cluster._worker_ratelimiter() is unlimited
@@ -0,0 +1,37 @@
+from asyncio import Event, TimeoutError, run, sleep, wait_for
+from typing import Any
+
+import pytest
+
+from orx.impl.gateway import GuildLaneDispatcher
+from orx.impl.gateway.event import GatewayEvent
+
+
+def event(guild_id: str) -> GatewayEvent:
+    return GatewayEvent(None, 0, {"op": 0, "s": 1, "t": "MESSAGE_CREATE", "d": {"guild_id": guild_id}}, 1, "MESSAGE_CREATE")  # type: ignore
+
+
+def test_close_keeps_the_queue_bound() -> None:
+    async def main() -> None:
+        dispatcher = GuildLaneDispatcher(workers=2, max_queue=4)
+        blocker = Event()
+
+        async def block(event: Any) -> None:
+            await blocker.wait()
+
+        # Two coroutines are running on workers and two are queued when the dispatcher is closed.
+        for guild_id in "1122":
+            await dispatcher.dispatch([block], event(guild_id))
+
+        await sleep(0.01)
+        await dispatcher.close()
+
+        for guild_id in "1234":
+            await wait_for(dispatcher.dispatch([block], event(guild_id)), 1)
+
+        with pytest.raises(TimeoutError):
+            await wait_for(dispatcher.dispatch([block], event("5")), 0.1)
+
+        await dispatcher.close()
+
+    run(main())
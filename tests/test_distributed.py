@@ -0,0 +1,131 @@
+from asyncio import gather, run, sleep
+from typing import Any
+
+import pytest
+from fakes import WindowedServer
+
+from orx.impl.http import (
+    DistributedRatelimiter,
+    HTTPClient,
+    MemoryStore,
+    RedisStore,
+    Route,
+)
+from orx.proto.http import RatelimitStoreProto
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request: Any) -> RatelimitStoreProto:
+    if request.param == "memory":
+        return MemoryStore()
+
+    # The Redis store's Lua scripts are run by fakeredis, which uses lupa to execute them.
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+
+    return RedisStore(fakeredis.FakeAsyncRedis())
+
+
+def test_acquire_waits_for_reset(store: RatelimitStoreProto) -> None:
+    async def main() -> None:
+        assert await store.acquire("bucket", 0, 1) == 0
+        await store.update("bucket", 2, 0, 0.1)
+
+        assert 0 < await store.acquire("bucket", 0, 1) <= 0.1
+
+        await sleep(0.11)
+        assert await store.acquire("bucket", 0, 1) == 0
+
+    run(main())
+
+
+def test_release_returns_tokens_of_unknown_windows(store: RatelimitStoreProto) -> None:
+    async def main() -> None:
+        assert await store.acquire("bucket", 0, 1) == 0
+        assert await store.acquire("bucket", 0, 1) > 0
+
+        await store.release("bucket")
+        assert await store.acquire("bucket", 0, 1) == 0
+
+    run(main())
+
+
+def test_global_limits(store: RatelimitStoreProto) -> None:
+    async def main() -> None:
+        assert await store.acquire("a", 1, 0.1) == 0
+        assert await store.acquire("b", 1, 0.1) > 0
+
+        await sleep(0.11)
+        await store.lock_global(0.1)
+        assert await store.acquire("c", 1, 0.1) > 0
+
+        await sleep(0.11)
+        assert await store.acquire("c", 1, 0.1) == 0
+
+    run(main())
+
+
+def test_defer(store: RatelimitStoreProto) -> None:
+    async def main() -> None:
+        await store.defer("bucket", 0.1)
+        assert await store.acquire("bucket", 0, 1) > 0
+
+        await sleep(0.11)
+        assert await store.acquire("bucket", 0, 1) == 0
+
+    run(main())
+
+
+def test_new_window_is_not_trusted_while_in_flight(store: RatelimitStoreProto) -> None:
+    async def main() -> None:
+        assert await store.acquire("bucket", 0, 1) == 0
+        await store.update("bucket", 5, 4, 0.05)
+        await store.release("bucket")
+
+        await sleep(0.06)
+
+        # Three requests are sent in the new window, and the first response has only been counted by itself.
+        for _ in range(3):
+            assert await store.acquire("bucket", 0, 1) == 0
+
+        await store.update("bucket", 5, 4, 1)
+
+        granted = 0
+        while await store.acquire("bucket", 0, 1) == 0:
+            granted += 1
+
+        assert granted == 2
+
+    run(main())
+
+
+def test_concurrent_requests_are_not_ratelimited(store: RatelimitStoreProto) -> None:
+    async def main() -> None:
+        server = WindowedServer(5, 0.5, 0.1)
+        ratelimiter = DistributedRatelimiter(store, global_rate=None)
+        http = HTTPClient("token", transport=server, ratelimiter=ratelimiter)
+        route = Route("GET", "/channels/{channel_id}/messages", channel_id=1)
+
+        await gather(*[http.request(route) for _ in range(20)])
+
+        assert server.ratelimited == 0
+        assert server.sent == 20
+
+    run(main())
+
+
+def test_memory_store_evicts_expired_buckets() -> None:
+    async def main() -> None:
+        store = MemoryStore(state_ttl=0.05)
+
+        for index in range(100):
+            assert await store.acquire(f"bucket:{index}", 0, 1) == 0
+            await store.update(f"bucket:{index}", 5, 4, 0)
+
+        await sleep(0.1)
+        assert await store.acquire("other", 0, 1) == 0
+
+        # Only the bucket touched after the others expired is left.
+        assert len(store._buckets) == 1
+
+    run(main())
@@ -0,0 +1,195 @@
+from asyncio import create_task, run, sleep, wait_for
+from struct import pack
+from typing import Any
+from zlib import Z_SYNC_FLUSH, compress, compressobj
+
+import pytest
+from aiohttp import WSMsgType
+from fakes import FakeHTTP, FakeSocket, Message, dispatch, hello
+
+from orx.impl.errors import ETFError
+from orx.impl.gateway import GatewayRatelimiter, Shard, etf
+
+
+def atom(name: str, tag: int = etf.SMALL_ATOM_UTF8_EXT) -> bytes:
+    raw = name.encode()
+
+    if tag in (etf.ATOM_EXT, etf.ATOM_UTF8_EXT):
+        return bytes((tag,)) + pack(">H", len(raw)) + raw
+
+    return bytes((tag, len(raw))) + raw
+
+
+def binary(value: bytes) -> bytes:
+    return bytes((etf.BINARY_EXT,)) + pack(">I", len(value)) + value
+
+
+def small_big(value: int) -> bytes:
+    raw = value.to_bytes((value.bit_length() + 7) // 8, "little")
+    return bytes((etf.SMALL_BIG_EXT, len(raw), 0)) + raw
+
+
+def term_map(*pairs: tuple[bytes, bytes]) -> bytes:
+    return bytes((etf.MAP_EXT,)) + pack(">I", len(pairs)) + b"".join(key + value for key, value in pairs)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        None,
+        True,
+        False,
+        0,
+        255,
+        256,
+        -1,
+        2**31 - 1,
+        -(2**31),
+        2**31,
+        -(2**63),
+        1234567890123456789,
+        2**2100,
+        -(2**2100),
+        1.5,
+        -0.25,
+        "",
+        "hello",
+        "héllo \U0001f600",
+        b"\xff\xfe",
+        [],
+        [1, "two", None, [3.0]],
+        {"a": 1, "b": {"c": [True, False, None]}},
+        {1: "integer key"},
+    ],
+    ids=repr,
+)
+def test_round_trip(value: Any) -> None:
+    assert etf.loads(etf.dumps(value)) == value
+
+
+def test_tuples_are_encoded_as_lists() -> None:
+    assert etf.loads(etf.dumps((1, 2))) == [1, 2]
+
+
+def test_atoms() -> None:
+    for tag in (etf.ATOM_EXT, etf.SMALL_ATOM_EXT, etf.ATOM_UTF8_EXT, etf.SMALL_ATOM_UTF8_EXT):
+        assert etf.loads(bytes((etf.VERSION,)) + atom("nil", tag)) is None
+        assert etf.loads(bytes((etf.VERSION,)) + atom("true", tag)) is True
+        assert etf.loads(bytes((etf.VERSION,)) + atom("false", tag)) is False
+        assert etf.loads(bytes((etf.VERSION,)) + atom("guild_create", tag)) == "guild_create"
+
+
+def test_decode_only_terms() -> None:
+    version = bytes((etf.VERSION,))
+
+    string = bytes((etf.STRING_EXT,)) + pack(">H", 3) + b"\x01\x02\x03"
+    assert etf.loads(version + string) == [1, 2, 3]
+
+    old_float = bytes((etf.FLOAT_EXT,)) + b"1.50000000000000000000e+00".ljust(31, b"\x00")
+    assert etf.loads(version + old_float) == 1.5
+
+    small_tuple = bytes((etf.SMALL_TUPLE_EXT, 2, etf.SMALL_INTEGER_EXT, 1, etf.SMALL_INTEGER_EXT, 2))
+    assert etf.loads(version + small_tuple) == (1, 2)
+
+    large_tuple = bytes((etf.LARGE_TUPLE_EXT,)) + pack(">I", 1) + bytes((etf.SMALL_INTEGER_EXT, 7))
+    assert etf.loads(version + large_tuple) == (7,)
+
+    nil = bytes((etf.NIL_EXT,))
+    assert etf.loads(version + nil) == []
+
+    # The tail of an improper list is dropped.
+    improper = bytes((etf.LIST_EXT,)) + pack(">I", 1) + bytes((etf.SMALL_INTEGER_EXT, 1, etf.SMALL_INTEGER_EXT, 2))
+    assert etf.loads(version + improper) == [1]
+
+
+def test_compressed_payload() -> None:
+    term = etf.dumps({"key": "value"})[1:]
+    payload = bytes((etf.VERSION, etf.COMPRESSED)) + pack(">I", len(term)) + compress(term)
+
+    assert etf.loads(payload) == {"key": "value"}
+
+
+def test_discord_payload() -> None:
+    # Discord encodes map keys as atoms, snowflakes as big integers, and strings as binaries.
+    payload = bytes((etf.VERSION,)) + term_map(
+        (atom("op"), bytes((etf.SMALL_INTEGER_EXT, 0))),
+        (atom("s"), bytes((etf.INTEGER_EXT,)) + pack(">i", 1000)),
+        (atom("t"), atom("MESSAGE_CREATE")),
+        (
+            atom("d"),
+            term_map(
+                (atom("id"), small_big(1071234567890123456)),
+                (atom("guild_id"), small_big(81384788765712384)),
+                (atom("content"), binary("héllo".encode())),
+                (atom("tts"), atom("false")),
+                (atom("pinned"), atom("true")),
+                (atom("edited_timestamp"), atom("nil")),
+                (atom("author"), term_map((atom("id"), small_big(80351110224678912)))),
+            ),
+        ),
+    )
+
+    assert etf.loads(payload) == {
+        "op": 0,
+        "s": 1000,
+        "t": "MESSAGE_CREATE",
+        "d": {
+            "id": 1071234567890123456,
+            "guild_id": 81384788765712384,
+            "content": "héllo",
+            "tts": False,
+            "pinned": True,
+            "edited_timestamp": None,
+            "author": {"id": 80351110224678912},
+        },
+    }
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [b"", b"\x83", b"\x00\x61\x01", b"\x83\x6d\x00\x00\x00\x05ab", b"\x83\xff", b"\x83\x50\x00\x00\x00\x01ab"],
+    ids=["empty", "no term", "bad version", "truncated", "unknown tag", "bad compression"],
+)
+def test_malformed_payloads(payload: bytes) -> None:
+    with pytest.raises(ETFError):
+        etf.loads(payload)
+
+
+def test_unencodable_type() -> None:
+    with pytest.raises(ETFError):
+        etf.dumps({"set": {1, 2}})
+
+
+def test_zlib_stream() -> None:
+    async def main() -> None:
+        received: list[Any] = []
+
+        deflate = compressobj()
+        frames: list[Message] = []
+
+        for payload in (hello(), dispatch("MESSAGE_CREATE", 1, {"id": 1071234567890123456, "guild_id": 1})):
+            data = deflate.compress(etf.dumps(payload)) + deflate.flush(Z_SYNC_FLUSH)
+            middle = len(data) // 2
+
+            # Each payload is split across two frames, and only the second ends with the flush suffix.
+            frames.append(Message(WSMsgType.BINARY, data[:middle]))
+            frames.append(Message(WSMsgType.BINARY, data[middle:]))
+
+        socket = FakeSocket(*frames)
+        shard = Shard(0, 1, "token", 0, GatewayRatelimiter, compress=True, encoding="etf")
+        shard.router.add("MESSAGE_CREATE", lambda event: received.append(event.d), guild_ids=[1])
+
+        task = create_task(shard.connect("wss://gateway", FakeHTTP(socket)))
+
+        for _ in range(100):
+            if received:
+                break
+            await sleep(0.01)
+
+        assert received == [{"id": 1071234567890123456, "guild_id": 1}]
+        assert socket.sent[0]["op"] == 2
+
+        await shard.close()
+        await wait_for(task, 1)
+
+    run(main())
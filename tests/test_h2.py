@@ -0,0 +1,190 @@
+from asyncio import (
+    StreamReader,
+    StreamWriter,
+    TimeoutError,
+    create_task,
+    gather,
+    run,
+    sleep,
+    start_server,
+    wait_for,
+)
+from json import dumps
+from ssl import PROTOCOL_TLS_CLIENT, SSLContext
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+import pytest
+
+from orx.impl.errors import OrxError
+from orx.impl.http import H2Transport, HTTPClient, Route
+
+pytest.importorskip("h2")
+
+from h2.config import H2Configuration  # noqa: E402
+from h2.connection import H2Connection  # noqa: E402
+from h2.events import DataReceived, RequestReceived, StreamEnded  # noqa: E402
+
+
+class H2Server:
+    def __init__(self, handler: Callable[[dict[str, str], bytes], tuple[int, bytes]], delay: float) -> None:
+        self.handler = handler
+        self.delay = delay
+        self.connections = 0
+        self.requests = 0
+
+    async def serve(self, reader: StreamReader, writer: StreamWriter) -> None:
+        self.connections += 1
+
+        conn = H2Connection(H2Configuration(client_side=False, header_encoding="utf-8"))
+        conn.initiate_connection()
+        writer.write(conn.data_to_send())
+
+        requests: dict[int, tuple[dict[str, str], bytearray]] = {}
+
+        async def respond(stream_id: int) -> None:
+            headers, body = requests.pop(stream_id)
+            status, payload = self.handler(headers, bytes(body))
+
+            # Respond concurrently, so requests only finish together if they were multiplexed.
+            await sleep(self.delay)
+
+            conn.send_headers(stream_id, [(":status", str(status)), ("content-length", str(len(payload)))])
+            view = payload
+
+            while view:
+                size = min(conn.local_flow_control_window(stream_id), conn.max_outbound_frame_size)
+
+                if size <= 0:
+                    await sleep(0.01)
+                    continue
+
+                conn.send_data(stream_id, view[:size])
+                view = view[size:]
+                writer.write(conn.data_to_send())
+
+            conn.end_stream(stream_id)
+            writer.write(conn.data_to_send())
+
+        while data := await reader.read(65536):
+            for event in conn.receive_data(data):
+                if isinstance(event, RequestReceived):
+                    self.requests += 1
+                    requests[event.stream_id] = (dict(event.headers), bytearray())
+                elif isinstance(event, DataReceived):
+                    requests[event.stream_id][1].extend(event.data)
+                    conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, StreamEnded):
+                    create_task(respond(event.stream_id))
+
+            writer.write(conn.data_to_send())
+
+
+def serve(
+    handler: Callable[[dict[str, str], bytes], tuple[int, bytes]],
+    test: Callable[[HTTPClient, H2Server], Awaitable[Any]],
+    *,
+    delay: float = 0.05,
+    transport: Optional[H2Transport] = None,
+    **options: Any,
+) -> None:
+    async def main() -> None:
+        server = H2Server(handler, delay)
+        listener = await start_server(server.serve, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        url = f"http://127.0.0.1:{port}/api"
+
+        async with HTTPClient("token", api_url=url, transport=transport or H2Transport(), **options) as http:
+            await wait_for(test(http, server), 10)
+
+        listener.close()
+
+    run(main())
+
+
+def echo(headers: dict[str, str], body: bytes) -> tuple[int, bytes]:
+    return 200, dumps({"path": headers[":path"], "length": len(body), "auth": headers.get("authorization")}).encode()
+
+
+def test_concurrent_requests_share_one_connection() -> None:
+    async def test(http: HTTPClient, server: H2Server) -> None:
+        routes = [Route("GET", "/channels/{channel_id}", channel_id=i) for i in range(50)]
+        results = await gather(*[http.request_json(route, {"limit": 1}) for route in routes])
+
+        assert results[3] == {"path": "/api/channels/3?limit=1", "length": 0, "auth": "Bot token"}
+        assert server.connections == 1
+
+    serve(echo, test)
+
+
+def test_large_bodies_respect_flow_control() -> None:
+    def handler(headers: dict[str, str], body: bytes) -> tuple[int, bytes]:
+        if headers[":method"] == "GET":
+            return 200, b"x" * 300_000
+        return echo(headers, body)
+
+    async def test(http: HTTPClient, server: H2Server) -> None:
+        sent = await http.request_json(Route("POST", "/upload"), json={"data": "x" * 200_000})
+        received = b"".join([chunk async for chunk in http.iter_chunked(Route("GET", "/download"))])
+
+        assert sent["length"] > 200_000
+        assert len(received) == 300_000
+
+    serve(handler, test)
+
+
+def test_released_bodies_do_not_exhaust_the_connection_window() -> None:
+    def handler(headers: dict[str, str], body: bytes) -> tuple[int, bytes]:
+        if headers[":path"].startswith("/api/fail"):
+            return 500, b"x" * 16_384
+        if headers[":path"].startswith("/api/large"):
+            return 200, b"x" * 60_000
+        return 200, b'{"ok": true}'
+
+    async def test(http: HTTPClient, server: H2Server) -> None:
+        # The default connection window is 64KiB, so a handful of unread bodies would use it up.
+        for _ in range(5):
+            with pytest.raises(OrxError):
+                await http.request(Route("GET", "/fail"), max_retries=1)
+
+        for _ in range(3):
+            async for _ in http.iter_chunked(Route("GET", "/large"), chunk_size=1024):
+                break
+
+        assert await http.request_json(Route("GET", "/ok")) == {"ok": True}
+        assert server.connections == 1
+
+    serve(handler, test)
+
+
+def test_ssl_context_is_not_modified() -> None:
+    class Context(SSLContext):
+        def set_alpn_protocols(self, alpn_protocols: Iterable[str]) -> None:
+            raise AssertionError("The context was modified")
+
+    H2Transport(ssl=Context(PROTOCOL_TLS_CLIENT))
+
+
+def test_default_headers_are_sent() -> None:
+    def handler(headers: dict[str, str], body: bytes) -> tuple[int, bytes]:
+        return 200, dumps({"agent": headers.get("user-agent"), "extra": headers.get("x-extra")}).encode()
+
+    async def test(http: HTTPClient, server: H2Server) -> None:
+        assert await http.request_json(Route("GET", "/agent")) == {"agent": "orx-test", "extra": None}
+        assert await http.request_json(Route("GET", "/agent"), headers={"User-Agent": "other", "X-Extra": "1"}) == {
+            "agent": "other",
+            "extra": "1",
+        }
+
+    serve(handler, test, default_headers={"User-Agent": "orx-test"})
+
+
+def test_stalled_responses_time_out() -> None:
+    async def test(http: HTTPClient, server: H2Server) -> None:
+        with pytest.raises(TimeoutError):
+            await http.request(Route("GET", "/stalled"))
+
+        # The abandoned stream is reset, so it no longer counts towards the server's concurrency limit.
+        (connection,) = http._transport._connections.values()  # type: ignore
+        assert not connection._streams  # type: ignore
+
+    serve(echo, test, delay=1, transport=H2Transport(timeout=0.1))
@@ -0,0 +1,109 @@
+from typing import Optional
+
+import pytest
+
+from orx.impl.cache import Cache
+from orx.impl.cache import members as members_module
+from orx.impl.cache.members import MemberStore
+from orx.impl.cache.records import CachedMember
+
+JOINED = "2021-06-01T12:30:15+00:00"
+
+
+@pytest.fixture(autouse=True)
+def small_merges(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(members_module, "MERGE_MIN", 4)
+
+
+def member(user_id: int, nick: Optional[str] = None, roles: tuple[int, ...] = (), flags: int = 0) -> CachedMember:
+    return CachedMember(1, user_id, nick, roles, JOINED, flags)
+
+
+def fill(store: MemberStore, user_ids: range) -> None:
+    for user_id in user_ids:
+        store.set(user_id, member(user_id, roles=(user_id % 3,)))
+
+
+def test_add_and_get() -> None:
+    store = MemberStore(1)
+
+    # Added in reverse so that merging has to sort them.
+    fill(store, range(20, 0, -1))
+
+    assert len(store) == 20
+    assert list(store._ids) == sorted(store._ids)
+
+    for user_id in range(1, 21):
+        assert store.get(user_id) == member(user_id, roles=(user_id % 3,))
+
+    assert store.get(21) is None
+
+
+def test_update() -> None:
+    store = MemberStore(1)
+    fill(store, range(1, 9))
+
+    # One member has been merged into the columns, and the other is still pending.
+    store.set(9, member(9, nick="pending"))
+    store.set(1, member(1, nick="merged", roles=(5, 4), flags=2))
+    store.set(9, member(9, roles=(4, 5), flags=1))
+
+    assert store.get(1) == member(1, nick="merged", roles=(4, 5), flags=2)
+    assert store.get(9) == member(9, roles=(4, 5), flags=1)
+    assert len(store) == 9
+
+    # Role lists are interned regardless of their order.
+    assert store._role_sets.count((4, 5)) == 1
+
+
+def test_remove_and_reuse() -> None:
+    store = MemberStore(1)
+    fill(store, range(1, 9))
+    store.set(9, member(9, nick="pending"))
+
+    assert store.pop(4) == member(4, roles=(1,))
+    assert store.pop(9) == member(9, nick="pending")
+    assert store.pop(4) is None
+    assert store.get(4) is None
+    assert len(store) == 7
+
+    # A removed member can be stored again, and the members around it are unaffected.
+    store.set(4, member(4, nick="again", flags=3))
+    store.set(9, member(9))
+
+    assert store.get(4) == member(4, nick="again", flags=3)
+    assert store.get(9) == member(9)
+    assert store.get(3) == member(3, roles=(0,))
+    assert store.get(5) == member(5, roles=(2,))
+    assert len(store) == 9
+
+
+def test_iteration() -> None:
+    store = MemberStore(1)
+    fill(store, range(1, 9))
+    store.set(9, member(9, nick="pending"))
+
+    assert sorted(store, key=lambda member: member.user_id) == [
+        *(member(user_id, roles=(user_id % 3,)) for user_id in range(1, 9)),
+        member(9, nick="pending"),
+    ]
+
+
+def test_members_are_kept_per_guild() -> None:
+    cache = Cache(columnar_members=True)
+
+    for guild_id in (1, 2):
+        cache._guild_create({"id": str(guild_id), "name": "guild"})
+
+        for user_id in range(guild_id * 10, guild_id * 10 + 6):
+            cache._member_set({"user": {"id": str(user_id)}, "roles": [], "joined_at": JOINED}, guild_id)
+
+    assert sorted(member.user_id for member in cache.get_guild_members(1)) == list(range(10, 16))
+    assert sorted(member.user_id for member in cache.get_guild_members(2)) == list(range(20, 26))
+    assert all(member.guild_id == 2 for member in cache.get_guild_members(2))
+    assert cache.get_member(1, 20) is None
+
+    cache._guild_delete({"id": "1"})
+
+    assert cache.get_guild_members(1) == []
+    assert len(cache.get_guild_members(2)) == 6
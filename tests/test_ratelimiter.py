@@ -0,0 +1,38 @@
+from asyncio import gather, run, sleep
+
+from fakes import WindowedServer
+
+from orx.impl.http import HTTPClient, Route
+from orx.impl.http.ratelimiter import Ratelimiter
+
+
+def test_concurrent_requests_are_not_ratelimited() -> None:
+    async def main() -> None:
+        server = WindowedServer(5, 0.5, 0.1)
+        http = HTTPClient("token", transport=server, ratelimiter=Ratelimiter(global_rate=None))
+        route = Route("GET", "/channels/{channel_id}/messages", channel_id=1)
+
+        await gather(*[http.request(route) for _ in range(20)])
+
+        assert server.ratelimited == 0
+        assert server.sent == 20
+
+    run(main())
+
+
+def test_held_bucket_is_not_swept() -> None:
+    async def main() -> None:
+        ratelimiter = Ratelimiter()
+        route = Route("GET", "/channels/{channel_id}", channel_id=1)
+
+        async with await ratelimiter.acquire(route) as bucket:
+            await bucket.update(1, 0, 0.01)
+
+            # The window ends while the request is still in flight.
+            await sleep(0.02)
+
+            assert ratelimiter.sweep() == 0
+
+        assert ratelimiter.sweep() == 1
+
+    run(main())
@@ -0,0 +1,41 @@
+from asyncio import create_task, run, sleep
+from typing import Any
+
+from fakes import Response
+
+from orx.impl.http import HTTPClient, ResponseCache, Route
+
+
+class Server:
+    """A transport serving one channel, where reads see the channel as it was when they arrived."""
+
+    def __init__(self) -> None:
+        self.name = "old"
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> Response:
+        if method == "GET":
+            name = self.name
+            await sleep(0.05)
+            return Response(200, {}, {"name": name})
+
+        self.name = "new"
+        return Response(200, {}, {"name": self.name})
+
+    async def close(self) -> None:
+        pass
+
+
+def test_in_flight_get_does_not_cache_stale_body() -> None:
+    async def main() -> None:
+        http = HTTPClient("token", transport=Server(), cache=ResponseCache(default_ttl=60))
+        route = Route("GET", "/channels/{channel_id}", channel_id=1)
+
+        read = create_task(http.request_json(route))
+        await sleep(0.01)
+
+        await http.request_json(Route("PATCH", "/channels/{channel_id}", channel_id=1))
+
+        assert (await read)["name"] == "old"
+        assert (await http.request_json(route))["name"] == "new"
+
+    run(main())
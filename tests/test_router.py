@@ -0,0 +1,76 @@
+from asyncio import create_task, get_running_loop, run, sleep, wait_for
+from typing import Any, Callable
+
+import pytest
+from fakes import FakeHTTP, FakeSocket, Message, binary, dispatch, hello, text
+
+from orx.impl.gateway import GatewayRatelimiter, Shard
+from orx.impl.gateway.router import Router
+
+
+@pytest.mark.parametrize(
+    "encode, guild_id, channel_id",
+    [(text, "1", "2"), (binary, 1, 2)],
+    ids=["json", "etf"],
+)
+def test_filters_match_in_every_encoding(
+    encode: Callable[[dict[str, Any]], Message], guild_id: int | str, channel_id: int | str
+) -> None:
+    async def main() -> None:
+        received: list[str] = []
+
+        router = Router()
+        router.add("MESSAGE_CREATE", lambda event: received.append("guild"), guild_ids=[1])
+        router.add("MESSAGE_CREATE", lambda event: received.append("channel"), channel_ids=["2"])
+        router.add("MESSAGE_CREATE", lambda event: received.append("other"), guild_ids=[3])
+
+        message = {"id": "5", "guild_id": guild_id, "channel_id": channel_id}
+        socket = FakeSocket(encode(hello()), encode(dispatch("MESSAGE_CREATE", 1, message)))
+        shard = Shard(
+            0, 1, "token", 0, GatewayRatelimiter, encoding="etf" if encode is binary else "json", router=router
+        )
+
+        task = create_task(shard.connect("wss://gateway", FakeHTTP(socket)))
+
+        for _ in range(100):
+            if len(received) == 2:
+                break
+            await sleep(0.01)
+
+        assert received == ["guild", "channel"]
+
+        await shard.close()
+        await wait_for(task, 1)
+
+    run(main())
+
+
+def test_raising_predicate_skips_only_its_hook() -> None:
+    async def main() -> None:
+        received: list[str] = []
+        errors: list[BaseException] = []
+
+        get_running_loop().set_exception_handler(lambda loop, context: errors.append(context["exception"]))
+
+        router = Router()
+        router.add("MESSAGE_CREATE", lambda event: received.append("author"), predicate=lambda d: d["author"])
+        router.add("MESSAGE_CREATE", lambda event: received.append("all"))
+
+        socket = FakeSocket(text(hello()), text(dispatch("MESSAGE_CREATE", 1, {"id": "5"})))
+        shard = Shard(0, 1, "token", 0, GatewayRatelimiter, router=router)
+
+        task = create_task(shard.connect("wss://gateway", FakeHTTP(socket)))
+
+        for _ in range(100):
+            if received:
+                break
+            await sleep(0.01)
+
+        assert received == ["all"]
+        assert isinstance(errors[0], KeyError)
+        assert not task.done()
+
+        await shard.close()
+        await wait_for(task, 1)
+
+    run(main())
@@ -0,0 +1,40 @@
+from asyncio import run
+from pathlib import Path
+
+import pytest
+
+from orx.impl.gateway import FileSessionStore
+from orx.proto.gateway import SessionSnapshot
+
+SNAPSHOT = SessionSnapshot(session_id="a", sequence=10, resume_url="wss://resume", shard_count=2)
+
+
+def test_file_store_round_trip(tmp_path: Path) -> None:
+    async def main() -> None:
+        store = FileSessionStore(tmp_path / "sessions.json")
+
+        assert await store.load() == {}
+
+        await store.save({1: SNAPSHOT})
+        assert await store.load() == {1: SNAPSHOT}
+
+    run(main())
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"not json",
+        b"[]",
+        b'{"0": 5}',
+        b'{"zero": {"session_id": "a", "sequence": 10, "resume_url": null, "shard_count": 2}}',
+        b'{"0": {"session_id": "a", "sequence": "10", "resume_url": null, "shard_count": 2}}',
+        b'{"0": {"session_id": "a", "sequence": 10, "resume_url": null}}',
+    ],
+    ids=["invalid", "list", "not a snapshot", "bad shard id", "bad field", "missing field"],
+)
+def test_file_store_ignores_malformed_files(tmp_path: Path, content: bytes) -> None:
+    path = tmp_path / "sessions.json"
+    path.write_bytes(content)
+
+    assert run(FileSessionStore(path).load()) == {}
@@ -0,0 +1,125 @@
+from asyncio import Event, create_task, run, sleep, wait_for
+
+import pytest
+from fakes import FakeHTTP, FakeSocket, dispatch, hello, text
+
+from orx.impl.errors import GatewayReconnect
+from orx.impl.gateway import GatewayRatelimiter, Shard
+from orx.impl.gateway import shard as shard_module
+
+
+@pytest.fixture(autouse=True)
+def fast_reconnect(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(shard_module, "RECONNECT_BASE", 0.01)
+
+
+class SlowIdentify:
+    def __init__(self) -> None:
+        self.release = Event()
+        self.acquired = 0
+
+    async def acquire(self, shard_id: int) -> None:
+        await self.release.wait()
+        self.acquired += 1
+
+
+def test_identify_slot_is_acquired_before_connecting() -> None:
+    async def main() -> None:
+        socket = FakeSocket(text(hello(10)), text(dispatch("READY", 1, {"session_id": "a"})))
+        http = FakeHTTP(socket)
+        limiter = SlowIdentify()
+        shard = Shard(0, 1, "token", 0, GatewayRatelimiter, identify_ratelimiter=limiter)
+
+        task = create_task(shard.connect("wss://gateway", http))
+        await sleep(0.05)
+
+        # No socket is opened, and so none can time out, while the shard waits for its slot.
+        assert http.urls == []
+
+        limiter.release.set()
+        await wait_for(shard.ready.wait(), 1)
+
+        assert limiter.acquired == 1
+        assert socket.sent[0]["op"] == 2
+
+        await shard.close()
+        await wait_for(task, 1)
+
+    run(main())
+
+
+def test_closed_socket_reconnects() -> None:
+    async def main() -> None:
+        first = FakeSocket(text(hello()))
+        second = FakeSocket(text(hello()), text(dispatch("READY", 1, {"session_id": "a"})))
+        http = FakeHTTP(first, second)
+        shard = Shard(0, 1, "token", 0, GatewayRatelimiter)
+
+        await first.close(4000)
+
+        task = create_task(shard.connect("wss://gateway", http))
+        await wait_for(shard.ready.wait(), 1)
+
+        assert not task.done()
+        assert len(http.urls) == 2
+
+        await shard.close()
+        await wait_for(task, 1)
+
+    run(main())
+
+
+def test_send_raises_reconnect_once_closed() -> None:
+    async def main() -> None:
+        socket = FakeSocket()
+        shard = Shard(0, 1, "token", 0, GatewayRatelimiter)
+        shard._socket = socket  # type: ignore
+
+        await socket.close(4000)
+
+        with pytest.raises(GatewayReconnect):
+            await shard.send({"op": 1, "d": None})  # type: ignore
+
+    run(main())
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_resumed_sets_ready(lazy: bool) -> None:
+    async def main() -> None:
+        socket = FakeSocket(text(hello()), text(dispatch("RESUMED", 11, None)))
+        shard = Shard(0, 1, "token", 0, GatewayRatelimiter, lazy=lazy)
+        shard.restore({"session_id": "a", "sequence": 10, "resume_url": "wss://resume"})
+
+        task = create_task(shard.connect("wss://gateway", FakeHTTP(socket)))
+        await wait_for(shard.ready.wait(), 1)
+
+        assert socket.sent[0]["op"] == 6
+
+        await shard.close()
+        await wait_for(task, 1)
+
+    run(main())
+
+
+def test_close_while_waiting_to_identify() -> None:
+    async def main() -> None:
+        socket = FakeSocket(text(hello(10)), text(dispatch("READY", 1, {"session_id": "a"})))
+        http = FakeHTTP(socket)
+        limiter = SlowIdentify()
+        shard = Shard(0, 1, "token", 0, GatewayRatelimiter, identify_ratelimiter=limiter)
+
+        task = create_task(shard.connect("wss://gateway", http))
+        await sleep(0.05)
+
+        await shard.close()
+        await wait_for(task, 1)
+
+        # The shard neither took its identify slot nor connected.
+        limiter.release.set()
+        await sleep(0.05)
+
+        assert limiter.acquired == 0
+        assert http.urls == []
+        assert socket.sent == []
+
+    run(main())